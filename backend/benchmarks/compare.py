@@ -0,0 +1,122 @@
+"""Compare two load-test result files and flag regressions.
+
+Usage (from the backend directory)::
+
+    python -m benchmarks.compare baseline.json candidate.json --tolerance 0.10
+
+Exits with status 1 when any tracked metric regresses past the tolerance.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Any, List
+
+# metric -> True when higher is better
+TRACKED_METRICS = {
+    "throughput_rps": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+}
+
+
+def load_result(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _relative_change(old: float, new: float) -> float:
+    if old == 0:
+        return 0.0 if new == 0 else float("inf")
+    return (new - old) / old
+
+
+def _compare_block(scope: str, old: Dict[str, Any], new: Dict[str, Any], tolerance: float,
+                   error_rate_tolerance: float) -> List[Dict[str, Any]]:
+    rows = []
+    for metric, higher_is_better in TRACKED_METRICS.items():
+        if metric not in old or metric not in new:
+            continue
+        change = _relative_change(old[metric], new[metric])
+        regressed = -change > tolerance if higher_is_better else change > tolerance
+        rows.append({
+            "scope": scope,
+            "metric": metric,
+            "baseline": old[metric],
+            "candidate": new[metric],
+            "change": change,
+            "regression": regressed,
+        })
+    if "error_rate" in old and "error_rate" in new:
+        delta = new["error_rate"] - old["error_rate"]
+        rows.append({
+            "scope": scope,
+            "metric": "error_rate",
+            "baseline": old["error_rate"],
+            "candidate": new["error_rate"],
+            "change": delta,
+            "regression": delta > error_rate_tolerance,
+        })
+    return rows
+
+
+def compare_results(baseline: Dict[str, Any], candidate: Dict[str, Any], tolerance: float = 0.10,
+                    error_rate_tolerance: float = 0.01, rss_tolerance: float = 0.20) -> List[Dict[str, Any]]:
+    """Return one row per compared metric, with ``regression`` set where it got worse"""
+    rows = _compare_block("overall", baseline["summary"], candidate["summary"], tolerance, error_rate_tolerance)
+    for endpoint, old in baseline.get("endpoints", {}).items():
+        new = candidate.get("endpoints", {}).get(endpoint)
+        if new is None:
+            rows.append({"scope": endpoint, "metric": "count", "baseline": old["count"],
+                         "candidate": 0, "change": -1.0, "regression": True})
+            continue
+        rows.extend(_compare_block(endpoint, old, new, tolerance, error_rate_tolerance))
+
+    old_workers = [w for w in baseline.get("workers", []) if w["role"] == "worker"] or baseline.get("workers", [])
+    new_workers = [w for w in candidate.get("workers", []) if w["role"] == "worker"] or candidate.get("workers", [])
+    if old_workers and new_workers:
+        old_peak = max(w["rss_peak_kb"] for w in old_workers)
+        new_peak = max(w["rss_peak_kb"] for w in new_workers)
+        change = _relative_change(old_peak, new_peak)
+        rows.append({"scope": "workers", "metric": "rss_peak_kb", "baseline": old_peak,
+                     "candidate": new_peak, "change": change, "regression": change > rss_tolerance})
+    return rows
+
+
+def format_rows(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'scope':<16} {'metric':<14} {'baseline':>12} {'candidate':>12} {'change':>9}"]
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        lines.append(f"{row['scope']:<16} {row['metric']:<14} {row['baseline']:>12.2f} "
+                     f"{row['candidate']:>12.2f} {row['change']:>+8.1%}{flag}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two load-test result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed relative throughput/latency regression (default 10%%)")
+    parser.add_argument("--error-rate-tolerance", type=float, default=0.01,
+                        help="allowed absolute error-rate increase (default 1 point)")
+    parser.add_argument("--rss-tolerance", type=float, default=0.20,
+                        help="allowed relative peak worker RSS growth (default 20%%)")
+    parser.add_argument("--json", action="store_true", help="print machine-readable rows")
+    args = parser.parse_args(argv)
+
+    rows = compare_results(load_result(args.baseline), load_result(args.candidate), args.tolerance,
+                           args.error_rate_tolerance, args.rss_tolerance)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(format_rows(rows))
+    regressions = [r for r in rows if r["regression"]]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) detected", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
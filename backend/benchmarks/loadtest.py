@@ -0,0 +1,414 @@
+"""Mixed-traffic load test for the FastAPI app.
+
+Starts the OpenRouter/Adzuna stubs and the API under uvicorn, drives auth,
+chat, jobs and scheduling traffic at a fixed concurrency and writes a JSON
+result file that ``benchmarks.compare`` can diff against a previous run.
+
+Example (from the backend directory)::
+
+    python -m benchmarks.loadtest --workers 2 --concurrency 32 --duration 30 \\
+        --output results/run.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = "chat=4,jobs=3,schedule=2,auth=1"
+
+JOB_QUERIES = [("data analyst", "Bangalore"), ("software engineer", "Pune"),
+               ("product manager", "Mumbai"), (None, None), ("hr", "Delhi")]
+CHAT_PROMPTS = [
+    "How do I restart my career after a two year break?",
+    "Can you review the structure of my resume?",
+    "What questions should I ask at the end of an interview?",
+    "How do I negotiate a higher salary offer?",
+]
+MENTORS = ["Anita Rao", "Meera Iyer", "Kavya Nair", "Priya Shah"]
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}' in mix (expected one of {sorted(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# --- Process memory sampling ---
+def _read_rss_kb(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def _child_pids(pid: int) -> List[int]:
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(c) for c in f.read().split())
+    except OSError:
+        pass
+    return children
+
+
+class RSSSampler(threading.Thread):
+    """Samples RSS of the server process tree (Linux only)"""
+
+    def __init__(self, root_pid: int, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.root_pid = root_pid
+        self.interval = interval
+        self.samples: Dict[int, Dict[str, Any]] = {}
+        self._stopped = threading.Event()
+
+    def sample(self):
+        pids = [self.root_pid]
+        index = 0
+        while index < len(pids):
+            pids.extend(_child_pids(pids[index]))
+            index += 1
+        for pid in pids:
+            rss = _read_rss_kb(pid)
+            if rss is None:
+                continue
+            entry = self.samples.setdefault(pid, {
+                "pid": pid,
+                "role": "master" if pid == self.root_pid else "worker",
+                "rss_peak_kb": 0,
+                "rss_sum_kb": 0,
+                "count": 0,
+            })
+            entry["rss_peak_kb"] = max(entry["rss_peak_kb"], rss)
+            entry["rss_last_kb"] = rss
+            entry["rss_sum_kb"] += rss
+            entry["count"] += 1
+
+    def run(self):
+        while not self._stopped.is_set():
+            self.sample()
+            self._stopped.wait(self.interval)
+
+    def stop(self) -> List[Dict[str, Any]]:
+        self._stopped.set()
+        self.join(timeout=5)
+        report = []
+        single_process = len(self.samples) == 1
+        for entry in self.samples.values():
+            report.append({
+                "pid": entry["pid"],
+                # Without --workers uvicorn serves requests from the root process itself
+                "role": "worker" if single_process else entry["role"],
+                "rss_peak_kb": entry["rss_peak_kb"],
+                "rss_last_kb": entry.get("rss_last_kb", 0),
+                "rss_mean_kb": round(entry["rss_sum_kb"] / max(entry["count"], 1)),
+            })
+        return sorted(report, key=lambda e: (e["role"] != "master", e["pid"]))
+
+
+# --- Traffic ---
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[Tuple[float, int, bool]]] = {}
+
+    def add(self, endpoint: str, latency_ms: float, status: int, ok: bool):
+        self.samples.setdefault(endpoint, []).append((latency_ms, status, ok))
+
+
+async def _timed(recorder: Recorder, endpoint: str, call, ok_check=None, accept=()):
+    start = time.perf_counter()
+    try:
+        response = await call()
+    except httpx.HTTPError:
+        recorder.add(endpoint, (time.perf_counter() - start) * 1000, 0, False)
+        return None
+    latency_ms = (time.perf_counter() - start) * 1000
+    ok = response.status_code < 400 or response.status_code in accept
+    if ok and ok_check is not None:
+        ok = ok_check(response)
+    recorder.add(endpoint, latency_ms, response.status_code, ok)
+    return response
+
+
+async def op_auth(client: httpx.AsyncClient, rng: random.Random, recorder: Recorder):
+    email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+    password = "bench-password"
+    register = await _timed(recorder, "auth.register", lambda: client.post(
+        "/api/auth/register", json={"email": email, "password": password, "full_name": "Bench User"}))
+    if register is None or register.status_code >= 400:
+        return
+    await _timed(recorder, "auth.login", lambda: client.post(
+        "/api/auth/token", data={"username": email, "password": password}))
+
+
+async def op_chat(client: httpx.AsyncClient, rng: random.Random, recorder: Recorder):
+    payload = {"messages": [], "user_input": rng.choice(CHAT_PROMPTS)}
+    await _timed(recorder, "chat", lambda: client.post("/api/chat", json=payload),
+                 ok_check=lambda r: r.json().get("status") == "success")
+
+
+async def op_jobs(client: httpx.AsyncClient, rng: random.Random, recorder: Recorder):
+    query, location = rng.choice(JOB_QUERIES)
+    params = {k: v for k, v in (("query", query), ("location", location)) if v}
+    await _timed(recorder, "jobs", lambda: client.get("/api/jobs", params=params))
+
+
+async def op_schedule(client: httpx.AsyncClient, rng: random.Random, recorder: Recorder):
+    day = datetime.now(timezone.utc).date() + timedelta(days=rng.randint(1, 60))
+    payload = {
+        "mentorName": rng.choice(MENTORS),
+        "date": day.isoformat(),
+        "time": f"{rng.randint(9, 17):02d}:{rng.choice(['00', '30'])}",
+    }
+    # A double-booking (409) is an expected business outcome, not a server error
+    await _timed(recorder, "schedule.book", lambda: client.post("/api/schedule-session", json=payload),
+                 accept=(409,))
+    await _timed(recorder, "schedule.list", lambda: client.get("/api/scheduled-sessions"))
+
+
+OPERATIONS = {
+    "auth": op_auth,
+    "chat": op_chat,
+    "jobs": op_jobs,
+    "schedule": op_schedule,
+}
+
+
+async def drive(base_url: str, concurrency: int, duration: float, mix: Dict[str, float],
+                seed: int, timeout: float) -> Tuple[Recorder, float]:
+    recorder = Recorder()
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        deadline = start + duration
+
+        async def user(index: int):
+            rng = random.Random(seed + index)
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                await OPERATIONS[name](client, rng, recorder)
+
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return recorder, elapsed
+
+
+def summarize(recorder: Recorder, elapsed: float) -> Dict[str, Any]:
+    endpoints = {}
+    total = errors = 0
+    all_latencies = []
+    for endpoint, samples in sorted(recorder.samples.items()):
+        latencies = [s[0] for s in samples]
+        failures = sum(1 for s in samples if not s[2])
+        statuses: Dict[str, int] = {}
+        for _, status, _ in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        endpoints[endpoint] = {
+            "count": len(samples),
+            "errors": failures,
+            "error_rate": failures / len(samples),
+            "throughput_rps": len(samples) / elapsed,
+            "mean_ms": sum(latencies) / len(latencies),
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": max(latencies),
+            "status_counts": statuses,
+        }
+        total += len(samples)
+        errors += failures
+        all_latencies.extend(latencies)
+    return {
+        "summary": {
+            "requests": total,
+            "errors": errors,
+            "error_rate": errors / total if total else 0.0,
+            "duration_s": elapsed,
+            "throughput_rps": total / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(all_latencies, 50),
+            "p95_ms": percentile(all_latencies, 95),
+            "p99_ms": percentile(all_latencies, 99),
+        },
+        "endpoints": endpoints,
+    }
+
+
+# --- Process management ---
+def _wait_for_http(url: str, proc: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Process exited early with code {proc.returncode}: {url}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def _stop(proc: Optional[subprocess.Popen]):
+    if proc is None or proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    openrouter_port, adzuna_port, api_port = free_port(), free_port(), free_port()
+    data_dir = tempfile.mkdtemp(prefix="asha-bench-")
+    stubs = server = None
+    try:
+        stubs = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.stubs",
+             "--openrouter-port", str(openrouter_port), "--adzuna-port", str(adzuna_port),
+             "--latency-ms", str(args.llm_latency_ms), "--jitter-ms", str(args.llm_jitter_ms),
+             "--error-429-rate", str(args.llm_429_rate), "--jobs-latency-ms", str(args.jobs_latency_ms),
+             "--seed", str(args.seed)],
+            cwd=BACKEND_DIR, stdout=subprocess.DEVNULL,
+        )
+        _wait_for_http(f"http://127.0.0.1:{openrouter_port}/_stats", stubs)
+
+        env = dict(os.environ)
+        env.update({
+            "OPENROUTER_API_KEY": "bench-key",
+            "OPENROUTER_API_URL": f"http://127.0.0.1:{openrouter_port}/api/v1/chat/completions",
+            "ADZUNA_API_URL": f"http://127.0.0.1:{adzuna_port}/v1/api/jobs",
+        })
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR,
+             "--host", "127.0.0.1", "--port", str(api_port), "--workers", str(args.workers),
+             "--log-level", "warning", "--no-access-log"],
+            cwd=data_dir, env=env, stdout=subprocess.DEVNULL if args.quiet else None,
+        )
+        base_url = f"http://127.0.0.1:{api_port}"
+        _wait_for_http(f"{base_url}/api/scheduled-sessions", server)
+
+        sampler = RSSSampler(server.pid)
+        sampler.start()
+        if args.warmup > 0:
+            asyncio.run(drive(base_url, args.concurrency, args.warmup, mix, args.seed + 10_000, args.timeout))
+        recorder, elapsed = asyncio.run(drive(base_url, args.concurrency, args.duration, mix,
+                                              args.seed, args.timeout))
+        workers = sampler.stop()
+        upstream = {
+            "openrouter": httpx.get(f"http://127.0.0.1:{openrouter_port}/_stats").json(),
+        }
+    finally:
+        _stop(server)
+        _stop(stubs)
+
+    result = summarize(recorder, elapsed)
+    result["meta"] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "workers": args.workers,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "mix": mix,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "llm_429_rate": args.llm_429_rate,
+            "jobs_latency_ms": args.jobs_latency_ms,
+            "seed": args.seed,
+        },
+    }
+    result["workers"] = workers
+    result["upstream"] = upstream
+    return result
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Load-test the ASHA API against local upstream stubs")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured run length in seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured warm-up in seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation weights, e.g. chat=4,jobs=3")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--llm-429-rate", type=float, default=0.0)
+    parser.add_argument("--jobs-latency-ms", type=float, default=80.0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request client timeout")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", default="loadtest-result.json")
+    parser.add_argument("--quiet", action="store_true", help="silence server stdout")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    result = run(args)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    summary = result["summary"]
+    print(f"{summary['requests']} requests in {summary['duration_s']:.1f}s "
+          f"({summary['throughput_rps']:.1f} req/s), error rate {summary['error_rate']:.2%}, "
+          f"p50 {summary['p50_ms']:.1f}ms p95 {summary['p95_ms']:.1f}ms p99 {summary['p99_ms']:.1f}ms")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Micro-benchmarks for functions on the request path
@@ -0,0 +1,130 @@
+"""Timing fixture and baseline bookkeeping for the micro-benchmarks.
+
+The suite is opt-in because the 100k datasets take a while to build::
+
+    ASHA_BENCHMARKS=1 python -m pytest benchmarks/micro              # compare with baselines
+    ASHA_BENCHMARKS=1 ASHA_BENCH_SAVE=1 python -m pytest benchmarks/micro   # record new baselines
+
+``ASHA_BENCH_TOLERANCE`` (default 0.25) is the allowed relative slowdown of
+the median call time; ``ASHA_BENCH_BASELINE`` points at another baseline file
+and ``ASHA_BENCH_OUTPUT`` writes this run's numbers to a JSON file.
+"""
+import json
+import os
+import platform
+import time
+from typing import Any, Callable, Dict, Optional
+
+import pytest
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+ENABLED = os.getenv("ASHA_BENCHMARKS") == "1"
+SAVE = os.getenv("ASHA_BENCH_SAVE") == "1"
+TOLERANCE = float(os.getenv("ASHA_BENCH_TOLERANCE", "0.25"))
+BASELINE_PATH = os.getenv("ASHA_BENCH_BASELINE", BASELINE_FILE)
+OUTPUT_PATH = os.getenv("ASHA_BENCH_OUTPUT")
+
+# Below this the timer resolution and scheduler noise dominate the comparison
+NOISE_FLOOR_NS = 2_000
+
+_results: Dict[str, Dict[str, Any]] = {}
+
+
+def _load_baselines() -> Dict[str, Any]:
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f).get("benchmarks", {})
+
+
+class Bench:
+    """Times a callable and checks the median against the stored baseline"""
+
+    def __init__(self, name: str, baselines: Dict[str, Any]):
+        self.name = name
+        self.baselines = baselines
+
+    def __call__(self, func: Callable, *args, rounds: int = 5, min_round_time: float = 0.05,
+                 max_iterations: int = 100_000, setup: Optional[Callable] = None, **kwargs) -> Dict[str, Any]:
+        """Median per-call time over ``rounds``; ``setup`` (untimed) runs before every call,
+        so a function that changes its own input is always timed on the same state"""
+        def timed_round(iterations: int) -> int:
+            if setup is None:
+                start = time.perf_counter_ns()
+                for _ in range(iterations):
+                    func(*args, **kwargs)
+                return time.perf_counter_ns() - start
+            elapsed = 0
+            for _ in range(iterations):
+                setup()
+                start = time.perf_counter_ns()
+                func(*args, **kwargs)
+                elapsed += time.perf_counter_ns() - start
+            return elapsed
+
+        # Calibrate: how many calls make one round long enough to time reliably
+        iterations = 1
+        while True:
+            elapsed = timed_round(iterations)
+            if elapsed >= min_round_time * 1e9 or iterations >= max_iterations:
+                break
+            iterations = min(iterations * 10, max_iterations)
+
+        per_call = sorted(timed_round(iterations) / iterations for _ in range(rounds))
+
+        stats = {
+            "median_ns": per_call[len(per_call) // 2],
+            "min_ns": per_call[0],
+            "max_ns": per_call[-1],
+            "iterations": iterations,
+            "rounds": rounds,
+        }
+        _results[self.name] = stats
+        self._check(stats)
+        return stats
+
+    def _check(self, stats: Dict[str, Any]):
+        baseline = self.baselines.get(self.name)
+        if SAVE or baseline is None:
+            return
+        allowed = max(baseline["median_ns"] * (1 + TOLERANCE), NOISE_FLOOR_NS)
+        if stats["median_ns"] > allowed:
+            pytest.fail(
+                f"{self.name} regressed: median {stats['median_ns'] / 1e3:.1f}us vs baseline "
+                f"{baseline['median_ns'] / 1e3:.1f}us (tolerance {TOLERANCE:.0%})",
+                pytrace=False,
+            )
+
+
+@pytest.fixture(scope="session")
+def baselines() -> Dict[str, Any]:
+    return _load_baselines()
+
+
+@pytest.fixture
+def bench(request, baselines) -> Bench:
+    return Bench(request.node.name, baselines)
+
+
+def _machine() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not _results:
+        return
+    if SAVE:
+        existing = _load_baselines()
+        existing.update(_results)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({"machine": _machine(), "benchmarks": dict(sorted(existing.items()))}, f, indent=2)
+            f.write("\n")
+    if OUTPUT_PATH:
+        with open(OUTPUT_PATH, "w") as f:
+            json.dump({"machine": _machine(), "benchmarks": _results}, f, indent=2)
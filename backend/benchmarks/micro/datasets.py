@@ -0,0 +1,138 @@
+"""Deterministic synthetic datasets for the micro-benchmarks.
+
+Every generator takes a ``size`` (number of records, or characters for the
+text generators) and always returns the same data for the same size.
+"""
+import random
+from typing import Dict, Any, List
+
+SIZES = [10, 10_000, 100_000]
+
+WORDS = ("career resume interview salary mentor skills growth return work remote "
+         "leadership analyst engineer manager flexible team project negotiate offer").split()
+
+
+def _rng(size: int, salt: str) -> random.Random:
+    return random.Random(f"{salt}:{size}")
+
+
+def _sentence(rng: random.Random, n_words: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)).capitalize() + "."
+
+
+def make_response_text(size: int) -> str:
+    """An LLM reply of roughly ``size`` characters full of markdown to strip"""
+    rng = _rng(size, "response")
+    parts = []
+    length = 0
+    while length < size:
+        kind = rng.randrange(6)
+        if kind == 0:
+            part = f"## {_sentence(rng, 4)}\n"
+        elif kind == 1:
+            part = f"* **{rng.choice(WORDS)}**: {_sentence(rng)}\n"
+        elif kind == 2:
+            part = f"Use `{rng.choice(WORDS)}` and _{rng.choice(WORDS)}_   here.\n\n\n"
+        elif kind == 3:
+            part = f"```\n{_sentence(rng, 6)}\n```\n"
+        else:
+            part = _sentence(rng) + "  " + _sentence(rng) + "\n"
+        parts.append(part)
+        length += len(part)
+    return "".join(parts)[:size]
+
+
+def make_messages(size: int) -> List[Dict[str, str]]:
+    rng = _rng(size, "messages")
+    return [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": _sentence(rng),
+            "timestamp": f"2026-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}",
+        }
+        for i in range(size)
+    ]
+
+
+def user_email(index: int) -> str:
+    return f"user{index}@example.com"
+
+
+def make_users(size: int) -> Dict[str, Dict[str, Any]]:
+    return {
+        user_email(i): {
+            "email": user_email(i),
+            "full_name": f"User {i}",
+            "hashed_password": "$2b$12$" + f"{i:053d}",
+            "disabled": False,
+        }
+        for i in range(size)
+    }
+
+
+def make_sessions(size: int) -> List[Dict[str, Any]]:
+    rng = _rng(size, "sessions")
+    return [
+        {
+            "mentorName": f"Mentor {rng.randrange(max(size // 20, 1))}",
+            "date": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "time": f"{rng.randint(8, 19):02d}:{rng.choice(['00', '30'])}",
+            "status": "scheduled",
+        }
+        for _ in range(size)
+    ]
+
+
+def conversation_id(index: int) -> str:
+    return f"conv-{index}"
+
+
+def make_conversations(size: int, messages_per_conversation: int = 2) -> Dict[str, Any]:
+    """Contents of conversation_memory.json with ``size`` conversations"""
+    rng = _rng(size, "conversations")
+    return {
+        "conversations": [
+            {
+                "id": conversation_id(i),
+                "messages": [
+                    {
+                        "role": "user" if m % 2 == 0 else "assistant",
+                        "content": _sentence(rng),
+                        "timestamp": "2026-01-01T00:00:00",
+                        "metadata": {},
+                    }
+                    for m in range(messages_per_conversation)
+                ],
+            }
+            for i in range(size)
+        ]
+    }
+
+
+def make_documents(size: int) -> List[Dict[str, Any]]:
+    rng = _rng(size, "documents")
+    return [
+        {"content": _sentence(rng, 30), "source": f"doc-{i % 50}", "type": "text"}
+        for i in range(size)
+    ]
+
+
+MENTOR_SKILLS = ("data science", "python", "sql", "product management", "ux design", "cybersecurity",
+                 "leadership", "career break", "salary negotiation", "interviews", "finance", "react")
+
+
+def make_mentors(size: int) -> List[Dict[str, Any]]:
+    rng = _rng(size, "mentors")
+    days = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+    return [
+        {
+            "id": f"mentor-{i}",
+            "name": f"Mentor {i}",
+            "headline": _sentence(rng, 5),
+            "bio": _sentence(rng, 20),
+            "skills": rng.sample(MENTOR_SKILLS, 3),
+            "availability": {rng.choice(days): [f"{h:02d}:00-{h + 2:02d}:00"] for h in (rng.randint(7, 20),)},
+        }
+        for i in range(size)
+    ]
+
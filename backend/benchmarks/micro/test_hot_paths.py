@@ -0,0 +1,189 @@
+import json
+import shutil
+import zlib
+
+import numpy as np
+import pytest
+from chromadb.api.types import EmbeddingFunction
+
+import data_storage
+from embeddings import HashingEmbeddingService
+from memory import ConversationMemory
+from services.chatbot import ChatbotService
+from benchmarks.micro import datasets
+from benchmarks.micro.conftest import ENABLED
+from benchmarks.micro.datasets import SIZES
+
+pytestmark = pytest.mark.skipif(not ENABLED, reason="set ASHA_BENCHMARKS=1 to run the micro-benchmarks")
+
+
+@pytest.fixture(scope="module")
+def chatbot():
+    return ChatbotService()
+
+
+@pytest.fixture
+def storage_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_storage, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(data_storage, "USERS_FILE", str(tmp_path / "users.json"))
+    monkeypatch.setattr(data_storage, "SESSIONS_FILE", str(tmp_path / "sessions.json"))
+    return tmp_path
+
+
+def _write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+# --- ChatbotService ---
+@pytest.mark.parametrize("size", SIZES)
+def test_clean_response(bench, chatbot, size):
+    text = datasets.make_response_text(size)
+    bench(chatbot._clean_response, text)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_format_messages(bench, chatbot, size):
+    messages = datasets.make_messages(size)
+    bench(chatbot._format_messages, messages)
+
+
+# --- data_storage ---
+@pytest.mark.parametrize("size", SIZES)
+def test_get_user(bench, storage_dir, size):
+    _write_json(data_storage.USERS_FILE, datasets.make_users(size))
+    bench(data_storage.get_user, datasets.user_email(size // 2), rounds=3)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_save_session(bench, storage_dir, size):
+    seed_file = str(storage_dir / "sessions.seed.json")
+    _write_json(seed_file, {"sessions": datasets.make_sessions(size)})
+    session = {"mentorName": "Mentor Bench", "date": "2026-06-01", "time": "10:00", "status": "scheduled"}
+
+    def reset():
+        shutil.copyfile(seed_file, data_storage.SESSIONS_FILE)
+
+    bench(data_storage.save_session, session, rounds=3, setup=reset, max_iterations=1_000)
+
+
+# --- ConversationMemory ---
+@pytest.fixture
+def memory_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_memory_add_message(bench, memory_dir, size):
+    # Turns are indexed on a background thread; the cheap embedder keeps model loading out of the timings
+    memory = ConversationMemory(embedding_service=HashingEmbeddingService())
+    seed_file = str(memory_dir / "memory.seed.json")
+    _write_json(seed_file, datasets.make_conversations(size))
+
+    def reset():
+        memory.flush()
+        shutil.copyfile(seed_file, memory.memory_file)
+
+    bench(memory.add_message, datasets.conversation_id(size // 2), "user", "Any openings in Pune?",
+          rounds=3, setup=reset, max_iterations=1_000)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_memory_get_context(bench, memory_dir, size):
+    memory = ConversationMemory()
+    _write_json(memory.memory_file, datasets.make_conversations(size))
+    bench(memory.get_context, datasets.conversation_id(size // 2), rounds=3)
+
+
+# --- EmbeddingService ---
+@pytest.fixture(scope="module")
+def embedding_service():
+    from embeddings import EmbeddingService
+    try:
+        return EmbeddingService()
+    except OSError as e:
+        pytest.skip(f"embedding model unavailable: {e}")
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_embedding_similarity(bench, embedding_service, size):
+    text = datasets.make_response_text(size)
+    bench(embedding_service.get_similarity, text, "How do I prepare for a product manager interview?", rounds=3)
+
+
+# --- VectorDB ---
+class HashEmbeddingFunction(EmbeddingFunction):
+    """Deterministic stand-in for the sentence-transformer so search cost is the index, not the model"""
+
+    DIM = 64
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            rng = np.random.default_rng(sum(map(ord, text)) * 2654435761 % 2**32)
+            vectors.append(rng.standard_normal(self.DIM).astype(np.float32))
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "asha-bench-hash"
+
+
+@pytest.fixture(scope="module")
+def vector_dbs(tmp_path_factory):
+    from vector_db import VectorDB
+
+    embedding_function = HashEmbeddingFunction()
+    built = {}
+
+    def get(size: int) -> VectorDB:
+        if size not in built:
+            path = str(tmp_path_factory.mktemp(f"vector_db_{size}"))
+            db = VectorDB(persist_directory=path, embedding_function=embedding_function)
+            documents = datasets.make_documents(size)
+            # add_documents numbers ids from zero, so load in batches through the collection directly
+            batch = 5_000
+            for start in range(0, size, batch):
+                chunk = documents[start:start + batch]
+                db.collection.add(
+                    ids=[str(start + i) for i in range(len(chunk))],
+                    documents=[d["content"] for d in chunk],
+                    metadatas=[{"source": d["source"], "type": d["type"]} for d in chunk],
+                )
+            built[size] = db
+        return built[size]
+
+    return get
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_vector_db_search(bench, vector_dbs, size):
+    db = vector_dbs(size)
+    bench(db.search, "how to negotiate salary for a remote analyst offer", rounds=3)
+
+
+# --- MentorCatalogue ---
+class HashEmbeddingService:
+    """Random unit vectors seeded by the text, at the sentence-transformer's width"""
+
+    model_name = "asha-bench-hash-384"
+
+    def get_embeddings(self, texts):
+        return np.array([np.random.default_rng(zlib.crc32(t.encode())).standard_normal(384) for t in texts],
+                        dtype=np.float32)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_mentor_match(bench, tmp_path, size):
+    from services.mentor_matching import MentorCatalogue, hours_mask
+
+    data_file = tmp_path / "mentors.json"
+    _write_json(str(data_file), {"mentors": datasets.make_mentors(size)})
+    catalogue = MentorCatalogue(str(data_file), embedding_service=HashEmbeddingService())
+    bench(catalogue.match, "move into data science after a career break", skills=["python"],
+          availability=hours_mask(["mon", "tue", "wed"], 18, 21), rounds=3)
+
@@ -0,0 +1,187 @@
+"""Multi-process stress test for the shared persistence layer.
+
+Every worker process behaves like a separate uvicorn worker pointed at the
+same data directory: it registers users (including the bcrypt hash the
+endpoint does), books mentor sessions, races the other workers for a shared
+contested slot, and appends turns to shared conversations. Afterwards the
+data is re-read from disk to prove no update was lost.
+
+Example (from the backend directory)::
+
+    python -m benchmarks.stress --workers 1 2 4 8 --ops 40
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Dict, Any, List
+
+BASE_DATE = "2027-01-04"
+MENTORS = 5
+CONVERSATIONS = 5
+
+
+def _slot(index: int):
+    """Day offset and HH:MM for the index-th hourly slot of a mentor"""
+    day, hour = divmod(index, 10)
+    return day, f"{8 + hour:02d}:00"
+
+
+def _date(day: int) -> str:
+    return (date.fromisoformat(BASE_DATE) + timedelta(days=day)).isoformat()
+
+
+def _worker(data_dir: str, worker_id: int, workers: int, ops: int, bcrypt_rounds: int,
+            start_event, results):
+    os.chdir(data_dir)
+    from passlib.context import CryptContext
+    from data_storage import create_user
+    from embeddings import HashingEmbeddingService
+    from memory import ConversationMemory
+    from scheduling import SessionStore, SchedulingConflict
+
+    pwd_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=bcrypt_rounds)
+    store = SessionStore()
+    # The model-free embedder keeps the workers about file contention, not model loading
+    memory = ConversationMemory(max_history=10**9, embedding_service=HashingEmbeddingService())
+    contested_wins = 0
+
+    start_event.wait()
+    started = time.perf_counter()
+    for i in range(ops):
+        email = f"stress-{worker_id}-{i}@example.com"
+        create_user(email, {
+            "email": email,
+            "full_name": f"Stress {worker_id}",
+            "hashed_password": pwd_context.hash("stress-password"),
+            "disabled": False,
+        })
+
+        # Unique slot per (worker, op), spread over shared mentors
+        slot = i * workers + worker_id
+        day, time_of_day = _slot(slot // MENTORS)
+        store.book(f"Mentor {slot % MENTORS}", _date(day), time_of_day)
+
+        # Every worker races for the same slot; exactly one may win it
+        day, time_of_day = _slot(i)
+        try:
+            store.book("Contested Mentor", _date(day), time_of_day)
+            contested_wins += 1
+        except SchedulingConflict:
+            pass
+
+        memory.add_message(f"stress-conv-{i % CONVERSATIONS}", "user", f"{worker_id}:{i}")
+    # Turns are indexed in the background; they must be on disk before the worker exits
+    memory.flush()
+    elapsed = time.perf_counter() - started
+    results.put({"worker": worker_id, "elapsed": elapsed, "contested_wins": contested_wins})
+
+
+def verify(data_dir: str, workers: int, ops: int) -> Dict[str, Any]:
+    """Re-read everything from disk and count what made it"""
+    cwd = os.getcwd()
+    os.chdir(data_dir)
+    try:
+        from data_storage import load_data, USERS_FILE
+        from embeddings import HashingEmbeddingService
+        from memory import ConversationMemory
+        from scheduling import SessionStore
+
+        users = load_data(USERS_FILE)
+        store = SessionStore()
+        contested = store.list_sessions(mentor="Contested Mentor", limit=10**9)["total"]
+        regular = sum(store.list_sessions(mentor=f"Mentor {m}", limit=10**9)["total"] for m in range(MENTORS))
+        memory = ConversationMemory(max_history=10**9, embedding_service=HashingEmbeddingService())
+        turns = [m["content"] for c in range(CONVERSATIONS)
+                 for m in memory.get_conversation(f"stress-conv-{c}")]
+        # Long-term index: one turn line and one vector row per message
+        indexed = aligned = 0
+        for c in range(CONVERSATIONS):
+            turns_file, vectors_file = memory._index_paths(f"stress-conv-{c}")
+            with open(turns_file, "rb") as f:
+                lines = f.read().count(b"\n")
+            indexed += lines
+            aligned += os.path.getsize(vectors_file) == lines * 4 * memory.embedding_service.dim
+    finally:
+        os.chdir(cwd)
+
+    expected = workers * ops
+    registered = sum(1 for email in users if email.startswith("stress-"))
+    return {
+        "users": registered,
+        "sessions": regular,
+        "contested_sessions": contested,
+        "memory_turns": len(turns),
+        "duplicate_turns": len(turns) - len(set(turns)),
+        "indexed_turns": indexed,
+        "aligned_indexes": aligned,
+        "expected": expected,
+        "expected_contested": ops,
+        "ok": (registered == expected and regular == expected and contested == ops
+               and len(turns) == expected and len(set(turns)) == expected
+               and indexed == expected and aligned == CONVERSATIONS),
+    }
+
+
+def run_stress(workers: int, ops: int, bcrypt_rounds: int = 12, data_dir: str = None) -> Dict[str, Any]:
+    data_dir = data_dir or tempfile.mkdtemp(prefix="asha-stress-")
+    context = multiprocessing.get_context("spawn")
+    start_event = context.Event()
+    results = context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(data_dir, w, workers, ops, bcrypt_rounds, start_event, results))
+        for w in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    start_event.set()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+        if process.exitcode != 0:
+            raise RuntimeError(f"stress worker exited with code {process.exitcode}")
+
+    wall = max(r["elapsed"] for r in reports)
+    check = verify(data_dir, workers, ops)
+    check["contested_wins"] = sum(r["contested_wins"] for r in reports)
+    check["ok"] = check["ok"] and check["contested_wins"] == ops
+    return {
+        "workers": workers,
+        "ops_per_worker": ops,
+        "elapsed_s": wall,
+        "throughput_ops": workers * ops / wall,
+        "verification": check,
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Hammer shared storage from several processes")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--ops", type=int, default=40, help="operations per worker")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12, help="cost of the registration hash")
+    parser.add_argument("--output", help="write the runs as JSON")
+    args = parser.parse_args(argv)
+
+    runs = []
+    baseline = None
+    print(f"{'workers':>7} {'ops/s':>9} {'speedup':>8}  verification  (cpus: {os.cpu_count()})")
+    for workers in args.workers:
+        run = run_stress(workers, args.ops, args.bcrypt_rounds)
+        baseline = baseline or run["throughput_ops"]
+        run["speedup"] = run["throughput_ops"] / baseline
+        runs.append(run)
+        status = "ok" if run["verification"]["ok"] else f"LOST UPDATES {run['verification']}"
+        print(f"{workers:>7} {run['throughput_ops']:>9.1f} {run['speedup']:>7.2f}x  {status}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(runs, f, indent=2)
+    return 0 if all(r["verification"]["ok"] for r in runs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""Local stand-ins for OpenRouter and Adzuna used by the load-test harness.
+
+Run with ``python -m benchmarks.stubs --openrouter-port 9101 --adzuna-port 9102``
+from the backend directory, then point the app at them with
+``OPENROUTER_API_URL`` and ``ADZUNA_API_URL``.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, Any
+
+from aiohttp import web
+
+LOREM = (
+    "We are looking for a motivated professional to join our growing team. "
+    "You will collaborate with cross-functional partners, own deliverables end to end "
+    "and mentor junior colleagues. Flexible hours and return-to-work support available. "
+)
+
+JOB_TITLES = ["Data Analyst", "Software Engineer", "Product Manager", "HR Business Partner",
+              "Marketing Lead", "UX Designer", "Business Analyst", "Content Strategist"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries"]
+CITIES = ["Bangalore", "Mumbai", "Delhi", "Pune", "Hyderabad", "Chennai"]
+
+
+class StubConfig:
+    def __init__(self, latency_ms: float = 200.0, jitter_ms: float = 50.0,
+                 error_429_rate: float = 0.0, tokens: int = 120,
+                 jobs_latency_ms: float = 80.0, jobs_per_page: int = 50,
+                 seed: int = 1234):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_429_rate = error_429_rate
+        self.tokens = tokens
+        self.jobs_latency_ms = jobs_latency_ms
+        self.jobs_per_page = jobs_per_page
+        self.rng = random.Random(seed)
+        self.counters: Dict[str, int] = {"chat": 0, "chat_429": 0, "chat_stream": 0, "jobs": 0}
+
+    def chat_delay(self) -> float:
+        return max(0.0, self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+
+
+def _completion_text(config: StubConfig, prompt: str) -> str:
+    words = (LOREM + prompt).split()
+    return " ".join(words[i % len(words)] for i in range(config.tokens))
+
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> Dict[str, int]:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+async def chat_completions(request: web.Request) -> web.StreamResponse:
+    """Emulate POST /api/v1/chat/completions, optionally streamed as SSE"""
+    config: StubConfig = request.app["config"]
+    body = await request.json()
+    messages = body.get("messages", [])
+    prompt = messages[-1]["content"] if messages else ""
+    prompt_tokens = sum(len(m.get("content", "").split()) for m in messages)
+    config.counters["chat"] += 1
+
+    await asyncio.sleep(config.chat_delay())
+
+    if config.error_429_rate and config.rng.random() < config.error_429_rate:
+        config.counters["chat_429"] += 1
+        return web.json_response(
+            {"error": {"code": 429, "message": "Rate limit exceeded (stub)"}},
+            status=429,
+            headers={"Retry-After": "1"},
+        )
+
+    max_tokens = int(body.get("max_tokens") or config.tokens)
+    text = _completion_text(config, prompt)
+    words = text.split()[:max_tokens]
+    created = int(time.time())
+
+    if body.get("stream"):
+        config.counters["chat_stream"] += 1
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        per_chunk_delay = config.chat_delay() / max(len(words), 1)
+        for word in words:
+            chunk = {
+                "id": "stub-stream",
+                "created": created,
+                "model": body.get("model"),
+                "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(per_chunk_delay)
+        final = {
+            "id": "stub-stream",
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "usage": _usage(prompt_tokens, len(words)),
+        }
+        await response.write(f"data: {json.dumps(final)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    return web.json_response({
+        "id": "stub-completion",
+        "object": "chat.completion",
+        "created": created,
+        "model": body.get("model"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": " ".join(words)},
+            "finish_reason": "stop",
+        }],
+        "usage": _usage(prompt_tokens, len(words)),
+    })
+
+
+def _job(config: StubConfig, index: int, what: str, where: str) -> Dict[str, Any]:
+    title = what.title() if what else JOB_TITLES[index % len(JOB_TITLES)]
+    city = where.title() if where else CITIES[index % len(CITIES)]
+    salary = 400000 + (index * 37919) % 1600000
+    return {
+        "id": f"stub-{index}",
+        "title": f"{title} {index}",
+        "company": {"display_name": COMPANIES[index % len(COMPANIES)]},
+        "location": {"display_name": city},
+        "description": LOREM * (3 + index % 4),
+        "salary_min": salary,
+        "salary_max": salary + 200000,
+        "salary_currency": "INR",
+        "created": "2026-01-01T00:00:00Z",
+        "redirect_url": f"https://jobs.example.com/{index}",
+        "contract_type": "permanent",
+        "category": {"label": "IT Jobs"},
+    }
+
+
+async def adzuna_search(request: web.Request) -> web.Response:
+    """Emulate the Adzuna job search endpoint"""
+    config: StubConfig = request.app["config"]
+    config.counters["jobs"] += 1
+    await asyncio.sleep(config.jobs_latency_ms / 1000.0)
+    per_page = min(int(request.query.get("results_per_page", config.jobs_per_page)), config.jobs_per_page)
+    what = request.query.get("what", "")
+    where = request.query.get("where", "")
+    results = [_job(config, i, what, where) for i in range(per_page)]
+    return web.json_response({"count": len(results), "results": results})
+
+
+async def stats(request: web.Request) -> web.Response:
+    return web.json_response(request.app["config"].counters)
+
+
+def create_openrouter_app(config: StubConfig) -> web.Application:
+    app = web.Application()
+    app["config"] = config
+    app.router.add_post("/api/v1/chat/completions", chat_completions)
+    app.router.add_get("/_stats", stats)
+    return app
+
+
+def create_adzuna_app(config: StubConfig) -> web.Application:
+    app = web.Application()
+    app["config"] = config
+    app.router.add_get("/_stats", stats)
+    app.router.add_get("/{tail:.*}", adzuna_search)
+    return app
+
+
+async def serve(config: StubConfig, host: str, openrouter_port: int, adzuna_port: int):
+    runners = []
+    for app, port in ((create_openrouter_app(config), openrouter_port),
+                      (create_adzuna_app(config), adzuna_port)):
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        runners.append(runner)
+    print(f"stubs ready openrouter={openrouter_port} adzuna={adzuna_port}", flush=True)
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenRouter / Adzuna stub servers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--openrouter-port", type=int, default=9101)
+    parser.add_argument("--adzuna-port", type=int, default=9102)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-429-rate", type=float, default=0.0)
+    parser.add_argument("--tokens", type=int, default=120)
+    parser.add_argument("--jobs-latency-ms", type=float, default=80.0)
+    parser.add_argument("--jobs-per-page", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_429_rate=args.error_429_rate,
+        tokens=args.tokens,
+        jobs_latency_ms=args.jobs_latency_ms,
+        jobs_per_page=args.jobs_per_page,
+        seed=args.seed,
+    )
+    try:
+        asyncio.run(serve(config, args.host, args.openrouter_port, args.adzuna_port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Run recorded or synthetic conversations through the chat pipeline in bulk.
+
+The input is a JSON-lines file with one conversation per line, either a
+single request::
+
+    {"id": "c1", "messages": [{"role": "user", "content": "..."}], "user_input": "..."}
+
+or a scripted conversation whose replies are fed back as history::
+
+    {"id": "c2", "turns": ["I am a data analyst in Pune", "What salary should I ask for?"]}
+
+Conversations run concurrently (``concurrency``), upstream calls are spaced
+to at most ``rate_limit`` per second, and one result line per conversation
+is appended to the output file as soon as it finishes, with its status and
+latency. The output doubles as the checkpoint: a rerun with the same output
+skips conversations that already succeeded and retries the rest, so an
+interrupted or cancelled run picks up where it stopped (for an ID that
+appears twice, the last line wins).
+
+Usage (from the backend directory)::
+
+    python -m chat_replay conversations.jsonl results.jsonl --concurrency 4 --rate-limit 2
+"""
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Set
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+REPLAY_DIR = os.path.join("data", "replays")
+
+# (messages, user_input) -> reply in the /api/chat shape
+ReplyFunction = Callable[[List[Dict[str, Any]], str], Awaitable[Dict[str, Any]]]
+
+
+def read_conversations(path: str) -> Iterator[Dict[str, Any]]:
+    """Conversations in the input file; a line that is not a JSON object becomes an item with an error"""
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                if not isinstance(item, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                yield {"id": f"line-{number}", "error": f"invalid input line: {e}"}
+                continue
+            item.setdefault("id", f"line-{number}")
+            item["id"] = str(item["id"])
+            yield item
+
+
+def completed_ids(output_path: str) -> Set[str]:
+    """IDs that already succeeded in an earlier run; drops a line torn by a crash mid-write"""
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, "rb") as f:
+        data = f.read()
+    complete = data[:data.rfind(b"\n") + 1]
+    if len(complete) < len(data):
+        os.truncate(output_path, len(complete))
+    status: Dict[str, str] = {}
+    for line in complete.splitlines():
+        try:
+            record = json.loads(line)
+            status[record["id"]] = record["status"]
+        except (ValueError, KeyError, TypeError):
+            continue
+    return {item_id for item_id, item_status in status.items() if item_status == "success"}
+
+
+class RateLimiter:
+    """Spaces acquisitions at least 1/rate seconds apart; no limit when rate is falsy"""
+
+    def __init__(self, rate: Optional[float]):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next)
+        # Reserved before sleeping, so concurrent callers queue up behind each other
+        self._next = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class ChatReplay:
+    def __init__(self, reply: ReplyFunction, input_path: str, output_path: str, concurrency: int = 4,
+                 rate_limit: Optional[float] = None):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.reply = reply
+        self.input_path = input_path
+        self.output_path = output_path
+        self.concurrency = concurrency
+        self.rate_limiter = RateLimiter(rate_limit)
+
+    async def _run_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        record: Dict[str, Any] = {"id": item["id"], "status": "error", "turns": []}
+        if "error" in item:
+            record.update(error=item["error"], latency_ms=0.0)
+            return record
+
+        turns = item["turns"] if "turns" in item else [item.get("user_input", "")]
+        messages = list(item.get("messages", []))
+        try:
+            if not isinstance(turns, list) or not turns:
+                raise ValueError("turns must be a non-empty list")
+            for user_input in turns:
+                await self.rate_limiter.acquire()
+                turn_started = time.perf_counter()
+                result = await self.reply(messages, str(user_input))
+                record["turns"].append({
+                    "user_input": user_input,
+                    "response": result["response"],
+                    "status": result["status"],
+                    "source": result.get("source"),
+                    "latency_ms": round((time.perf_counter() - turn_started) * 1000, 2),
+                })
+                messages = result["conversation_history"]
+                if result["status"] != "success":
+                    break
+            else:
+                record["status"] = "success"
+        except Exception as e:
+            record["error"] = str(e) or type(e).__name__
+        record["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return record
+
+    async def run(self, on_progress: Callable[[int, int], None] = None) -> Dict[str, Any]:
+        """Replay every conversation not already done; returns counts for this run"""
+        started = time.perf_counter()
+        os.makedirs(os.path.dirname(os.path.abspath(self.output_path)), exist_ok=True)
+        # Both read a whole file, so they run off the event loop
+        done_ids = await asyncio.to_thread(completed_ids, self.output_path)
+        total = await asyncio.to_thread(lambda: sum(1 for _ in read_conversations(self.input_path)))
+        items = read_conversations(self.input_path)
+        counts = {"succeeded": 0, "failed": 0, "skipped": 0}
+
+        with open(self.output_path, "a", encoding="utf-8") as out:
+            def finished(record: Optional[Dict[str, Any]]):
+                if record is None:
+                    counts["skipped"] += 1
+                else:
+                    out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                    out.flush()
+                    counts["succeeded" if record["status"] == "success" else "failed"] += 1
+                if on_progress:
+                    on_progress(sum(counts.values()), total)
+
+            async def worker():
+                # Workers pull from one shared iterator, so the input is never loaded whole
+                for item in items:
+                    finished(None if item["id"] in done_ids else await self._run_item(item))
+
+            workers = [asyncio.ensure_future(worker()) for _ in range(self.concurrency)]
+            try:
+                await asyncio.gather(*workers)
+            except BaseException:
+                # Stopping early is safe: finished conversations are already in the output
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                raise
+            finally:
+                items.close()
+
+        return dict(counts, total=total, output=self.output_path,
+                    seconds=round(time.perf_counter() - started, 3))
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay conversations from a JSON-lines file through the chat pipeline")
+    parser.add_argument("input", help="JSON-lines file with one conversation per line")
+    parser.add_argument("output", help="JSON-lines results file; rerunning with it resumes")
+    parser.add_argument("--concurrency", type=int, default=4, help="conversations in flight at once")
+    parser.add_argument("--rate-limit", type=float, help="most chat calls started per second")
+    args = parser.parse_args(argv)
+
+    from main import make_replay_reply
+    replay = ChatReplay(make_replay_reply(args.output), args.input, args.output, concurrency=args.concurrency,
+                        rate_limit=args.rate_limit)
+    result = asyncio.run(replay.run())
+    print(json.dumps(result, indent=2))
+    return 0 if result["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
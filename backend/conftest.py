@@ -0,0 +1,8 @@
+import os
+import sys
+
+# main.py and the services import each other as top-level modules (it is run
+# from the backend directory), so make that directory importable for tests.
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
@@ -47,7 +47,8 @@ class AICore:
     def process_query(self, conversation_id: str, query: str) -> Dict[str, Any]:
         """Process a user query and generate a response"""
         # Get conversation context
-        context = self.memory.get_context(conversation_id)
+        # The recent window plus earlier turns relevant to this query, within a fixed token budget
+        context = self.memory.get_context(conversation_id, query=query)
         
         # Get relevant knowledge from vector DB
         knowledge = self.vector_db.get_context(query)
@@ -99,4 +100,4 @@ class AICore:
     
     def clear_conversation(self, conversation_id: str):
         """Clear conversation history"""
-        self.memory.add_message(conversation_id, "system", "Conversation cleared") 
\ No newline at end of file
+        self.memory.clear(conversation_id) 
\ No newline at end of file
@@ -1,6 +1,15 @@
 import json
 import os
-from typing import Dict, Any
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 DATA_DIR = "data"
 USERS_FILE = os.path.join(DATA_DIR, "users.json")
@@ -9,7 +18,93 @@ SESSIONS_FILE = os.path.join(DATA_DIR, "sessions.json")
 def ensure_data_dir():
     """Ensure the data directory exists"""
     if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
+        os.makedirs(DATA_DIR, exist_ok=True)
+
+# --- Cross-process safety ---
+# Several uvicorn workers (or containers sharing a volume) read and write the
+# same files, so every read-modify-write holds an exclusive lock on a sidecar
+# ".lock" file and every write replaces the file atomically.
+_thread_locks: Dict[str, threading.RLock] = {}
+_thread_locks_guard = threading.Lock()
+
+@contextmanager
+def file_lock(file_path: str):
+    """Hold an exclusive lock for file_path across threads and processes"""
+    lock_path = file_path + ".lock"
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(lock_path, threading.RLock())
+    with thread_lock:
+        directory = os.path.dirname(lock_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(lock_path, "a+") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+                else:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+def atomic_write_json(file_path: str, data: Any, indent: Optional[int] = 2, fsync: bool = True):
+    """Write JSON to a temp file in the same directory and rename it into place.
+
+    Without fsync, readers still never see a partial file, but a power loss can
+    lose the write; fine for caches that are rebuilt on a miss.
+    """
+    directory = os.path.dirname(file_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=indent)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def file_signature(file_path: str) -> Optional[Tuple[int, int, int]]:
+    """Identity of the file's current contents; changes on every atomic replace"""
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+class FileCache:
+    """Parsed JSON kept in memory until another writer replaces the file"""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Tuple[int, int, int], Any]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, file_path: str, loader):
+        signature = file_signature(file_path)
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is not None and signature is not None and entry[0] == signature:
+                return entry[1]
+        data = loader(file_path)
+        if signature is not None and signature == file_signature(file_path):
+            with self._lock:
+                self._entries[file_path] = (signature, data)
+        return data
+
+    def invalidate(self, file_path: str):
+        with self._lock:
+            self._entries.pop(file_path, None)
+
+_cache = FileCache()
 
 def load_data(file_path: str) -> Dict[str, Any]:
     """Load data from a JSON file"""
@@ -25,19 +120,30 @@ def load_data(file_path: str) -> Dict[str, Any]:
 def save_data(file_path: str, data: Dict[str, Any]):
     """Save data to a JSON file"""
     ensure_data_dir()
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=2)
+    atomic_write_json(file_path, data)
+    _cache.invalidate(file_path)
 
 # User management functions
 def get_users() -> Dict[str, Dict[str, Any]]:
-    """Get all users"""
-    return load_data(USERS_FILE)
+    """Get all users (shared cache; treat as read-only)"""
+    return _cache.load(USERS_FILE, load_data)
 
 def save_user(email: str, user_data: Dict[str, Any]):
     """Save a user"""
-    users = get_users()
-    users[email] = user_data
-    save_data(USERS_FILE, users)
+    with file_lock(USERS_FILE):
+        users = load_data(USERS_FILE)
+        users[email] = user_data
+        save_data(USERS_FILE, users)
+
+def create_user(email: str, user_data: Dict[str, Any]) -> bool:
+    """Save a new user; returns False if the email is already registered"""
+    with file_lock(USERS_FILE):
+        users = load_data(USERS_FILE)
+        if email in users:
+            return False
+        users[email] = user_data
+        save_data(USERS_FILE, users)
+        return True
 
 def get_user(email: str) -> Dict[str, Any]:
     """Get a specific user"""
@@ -51,6 +157,7 @@ def get_sessions() -> list:
 
 def save_session(session_data: Dict[str, Any]):
     """Save a new session"""
-    sessions = get_sessions()
-    sessions.append(session_data)
-    save_data(SESSIONS_FILE, {"sessions": sessions}) 
\ No newline at end of file
+    with file_lock(SESSIONS_FILE):
+        sessions = get_sessions()
+        sessions.append(session_data)
+        save_data(SESSIONS_FILE, {"sessions": sessions})
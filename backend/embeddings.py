@@ -1,9 +1,33 @@
-from sentence_transformers import SentenceTransformer
-from typing import List
+from typing import List, Optional
+import os
+import re
+import threading
+import zlib
 import numpy as np
 
+try:
+    from .structured_logging import get_logger
+except ImportError:  # imported as a top-level module from the backend directory
+    from structured_logging import get_logger
+
+logger = get_logger("embeddings")
+
 class EmbeddingService:
+    # Cosine similarity above which two short texts ask the same thing
+    match_threshold = 0.80
+    # Minimum similarity to an intent centroid, and lead over the runner-up, to route a message
+    intent_thresholds = (0.45, 0.05)
+    # Minimum similarity for an earlier conversation turn to be recalled as context
+    recall_threshold = 0.35
+
     def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        # Imported here rather than at module level: it pulls in torch, which takes
+        # seconds, and processes that use the hashing embedder never need it
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError("sentence-transformers is not installed")
+        self.model_name = model_name
         self.model = SentenceTransformer(model_name)
         
     def get_embedding(self, text: str) -> np.ndarray:
@@ -18,4 +42,97 @@ class EmbeddingService:
         """Calculate similarity between two texts"""
         emb1 = self.get_embedding(text1)
         emb2 = self.get_embedding(text2)
-        return np.dot(emb1, emb2) / (np.linalg.norm(emb1) * np.linalg.norm(emb2)) 
\ No newline at end of file
+        return np.dot(emb1, emb2) / (np.linalg.norm(emb1) * np.linalg.norm(emb2))
+
+STOPWORDS = frozenset("""
+a an the and or but if of to in on at for with by from as is are was were be been am do does did
+i me my we our you your it its this that these those can could should would will shall may might
+what how which who whom when where why there here so than too very just about into over please
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+class HashingEmbeddingService:
+    """Model-free embeddings from hashed words, word pairs and character trigrams.
+
+    Much weaker than a sentence-transformer for open-ended text, but needs no
+    download, is deterministic across processes and costs microseconds, which
+    is enough for matching short questions against a curated list.
+    """
+
+    match_threshold = 0.55
+    intent_thresholds = (0.22, 0.08)
+    recall_threshold = 0.15
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+        self.model_name = f"hashing-{dim}"
+
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        tokens = []
+        for token in _TOKEN_RE.findall(text.lower()):
+            if token in STOPWORDS:
+                continue
+            # Cheap plural folding so "resumes" and "resume" share features
+            if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+                token = token[:-1]
+            tokens.append(token)
+        return tokens
+
+    def _features(self, text: str):
+        tokens = self._tokens(text)
+        for token in tokens:
+            yield "w:" + token, 1.0
+            padded = f"<{token}>"
+            for i in range(len(padded) - 2):
+                yield "c:" + padded[i:i + 3], 0.25
+        for first, second in zip(tokens, tokens[1:]):
+            yield f"b:{first} {second}", 0.5
+
+    def get_embedding(self, text: str) -> np.ndarray:
+        """Get embedding for a single text"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(text):
+            h = zlib.crc32(feature.encode("utf-8"))
+            # The top bit picks the sign so colliding features tend to cancel out
+            vector[h % self.dim] += weight if h & 0x80000000 else -weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Get embeddings for multiple texts"""
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.vstack([self.get_embedding(text) for text in texts])
+
+    def get_similarity(self, text1: str, text2: str) -> float:
+        """Calculate similarity between two texts"""
+        return float(np.dot(self.get_embedding(text1), self.get_embedding(text2)))
+
+_shared_service = None
+_shared_lock = threading.Lock()
+
+def get_embedding_service(backend: Optional[str] = None):
+    """Process-wide embedding service, chosen by EMBEDDING_BACKEND.
+
+    "sentence-transformers" requires the model, "hashing" never loads it and
+    "auto" (the default) tries the model and falls back to hashing when the
+    package or the model download is unavailable.
+    """
+    global _shared_service
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "auto")
+    with _shared_lock:
+        if _shared_service is not None:
+            return _shared_service
+        if backend == "hashing":
+            _shared_service = HashingEmbeddingService()
+        elif backend == "sentence-transformers":
+            _shared_service = EmbeddingService()
+        else:
+            try:
+                _shared_service = EmbeddingService()
+            except (ImportError, OSError) as e:
+                logger.warning("embedding model unavailable; using hashing embeddings", extra={"error": str(e)})
+                _shared_service = HashingEmbeddingService()
+        return _shared_service
@@ -1,24 +1,37 @@
-from reportlab.pdfgen import canvas
+"""Resource PDF builds.
+
+Each document is a content spec (title plus a list of sections). The build
+hashes every spec and only re-renders documents whose hash differs from the
+manifest written by the previous run; changed documents are rendered in
+parallel across a process pool. The same renderer backs the on-demand,
+personalised PDFs served by the API (see pdf_cache.py).
+
+Usage (from the repository root or the backend directory)::
+
+    python backend/generate_pdfs.py            # rebuild what changed
+    python backend/generate_pdfs.py --force    # rebuild everything
+"""
 from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+import argparse
+import hashlib
+import json
 import os
+import sys
+import tempfile
 
-def create_pdf(filename, title, content):
-    # Create the PDF
-    doc = SimpleDocTemplate(
-        f"frontend/public/resources/{filename}",
-        pagesize=letter,
-        rightMargin=72,
-        leftMargin=72,
-        topMargin=72,
-        bottomMargin=72
-    )
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    
+import reportlab
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "frontend", "public", "resources")
+MANIFEST_NAME = ".manifest.json"
+# Bump when the layout below changes so every document is rebuilt
+RENDERER_VERSION = "2"
+
+def build_elements(title, content):
     # Styles
     styles = getSampleStyleSheet()
     title_style = ParagraphStyle(
@@ -46,11 +59,14 @@ def create_pdf(filename, title, content):
         leftIndent=20,
         spaceAfter=8
     )
-    
+
+    # Container for the 'Flowable' objects
+    elements = []
+
     # Add title
     elements.append(Paragraph(title, title_style))
     elements.append(Spacer(1, 12))
-    
+
     # Add content
     for section in content:
         if section['type'] == 'title':
@@ -60,9 +76,54 @@ def create_pdf(filename, title, content):
         elif section['type'] == 'bullet':
             elements.append(Paragraph(section['text'], bullet_style))
         elements.append(Spacer(1, 12))
-    
-    # Build PDF
-    doc.build(elements)
+    return elements
+
+def render_pdf(path, title, content):
+    """Render a document to ``path`` atomically, so readers never see a partial file"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".pdf.tmp")
+    os.close(fd)
+    try:
+        # invariant=1 drops the timestamp and random document ID, so the same
+        # spec always produces the same bytes
+        doc = SimpleDocTemplate(
+            tmp_path,
+            pagesize=letter,
+            rightMargin=72,
+            leftMargin=72,
+            topMargin=72,
+            bottomMargin=72,
+            invariant=1
+        )
+        doc.build(build_elements(title, content))
+        # mkstemp creates the file private; the output is served as a static asset
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+def create_pdf(filename, title, content, output_dir=OUTPUT_DIR):
+    return render_pdf(os.path.join(output_dir, filename), title, content)
+
+def spec_hash(title: str, content: List[Dict[str, str]]) -> str:
+    """Content hash of a document spec, including the renderer it will go through"""
+    spec = json.dumps({"title": title, "content": content}, sort_keys=True, ensure_ascii=False)
+    payload = f"{RENDERER_VERSION}\x1f{reportlab.Version}\x1f{spec}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def personalize(title: str, content: List[Dict[str, str]], full_name: Optional[str] = None,
+                target_role: Optional[str] = None) -> Tuple[str, List[Dict[str, str]]]:
+    """Variant of a document addressed to one user; the inputs are escaped for reportlab markup"""
+    intro = []
+    if full_name:
+        title = f"{title} for {escape(full_name)}"
+    if target_role:
+        intro.append({'type': 'text', 'text': f"Prepared for your search for {escape(target_role)} roles."})
+    return title, intro + list(content)
 
 # Resume Templates
 resume_content = [
@@ -179,9 +240,73 @@ industry_content = [
     {'type': 'bullet', 'text': '• Importance of digital portfolios'}
 ]
 
-# Create PDFs
-create_pdf("resume_templates.pdf", "Resume Templates Guide", resume_content)
-create_pdf("interview_guide.pdf", "Interview Preparation Guide", interview_content)
-create_pdf("salary_tips.pdf", "Salary Negotiation Guide", salary_content)
-create_pdf("career_guides.pdf", "Career Path Development Guide", career_content)
-create_pdf("industry_insights.pdf", "Industry Insights Guide", industry_content) 
\ No newline at end of file
+# Output file -> (title, content spec)
+DOCUMENTS: Dict[str, Tuple[str, List[Dict[str, str]]]] = {
+    "resume_templates.pdf": ("Resume Templates Guide", resume_content),
+    "interview_guide.pdf": ("Interview Preparation Guide", interview_content),
+    "salary_tips.pdf": ("Salary Negotiation Guide", salary_content),
+    "career_guides.pdf": ("Career Path Development Guide", career_content),
+    "industry_insights.pdf": ("Industry Insights Guide", industry_content),
+}
+
+def _load_manifest(path: str) -> Dict[str, str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _render_job(job):
+    path, title, content = job
+    render_pdf(path, title, content)
+    return path
+
+def build_all(output_dir: str = OUTPUT_DIR, documents: Dict[str, Tuple[str, list]] = None,
+              force: bool = False, workers: Optional[int] = None) -> Dict[str, List[str]]:
+    """Render the documents whose spec changed since the last build"""
+    documents = DOCUMENTS if documents is None else documents
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = _load_manifest(manifest_path)
+
+    hashes, jobs, skipped = {}, [], []
+    for filename, (title, content) in documents.items():
+        path = os.path.join(output_dir, filename)
+        hashes[filename] = spec_hash(title, content)
+        if not force and manifest.get(filename) == hashes[filename] and os.path.exists(path):
+            skipped.append(filename)
+        else:
+            jobs.append((path, title, content))
+
+    if len(jobs) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=min(len(jobs), workers or os.cpu_count() or 1)) as pool:
+            list(pool.map(_render_job, jobs))
+    else:
+        for job in jobs:
+            _render_job(job)
+
+    # Only documents that exist now are recorded, so a failed build is retried next time
+    manifest = {name: digest for name, digest in hashes.items()
+                if os.path.exists(os.path.join(output_dir, name))}
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+    return {"built": [os.path.basename(job[0]) for job in jobs], "skipped": skipped}
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build the resource PDFs served by the frontend")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--force", action="store_true", help="rebuild documents even if unchanged")
+    parser.add_argument("--workers", type=int, help="render processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    result = build_all(args.output_dir, force=args.force, workers=args.workers)
+    for filename in result["built"]:
+        print(f"built   {filename}")
+    for filename in result["skipped"]:
+        print(f"skipped {filename} (unchanged)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""Conditional, compressed JSON responses for large list endpoints.
+
+Endpoints hand over a data version (anything that changes whenever the
+payload would) and a callable that builds the payload. A client that already
+has that version gets a 304 without the payload ever being built or
+serialized; everyone else gets a body compressed with the best encoding
+they accept, cached per version so repeat requests skip both steps.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import gzip
+import hashlib
+import json
+import threading
+
+from fastapi import Request, Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are cheaper to send as-is than to compress
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def json_dumps(data: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag derived from the data version (and any query parameters)"""
+    digest = hashlib.sha1("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def _variant_etag(etag: str, encoding: Optional[str]) -> str:
+    # Different encodings are different representations, so a strong ETag must differ too
+    return etag if encoding is None else f'{etag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of If-None-Match against any encoding of ``etag``"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    base = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        if candidate == base or any(candidate == f"{base}-{enc}" for enc in ("br", "gzip")):
+            return True
+    return False
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the preferred supported encoding from an Accept-Encoding header"""
+    if not accept_encoding:
+        return None
+    qualities: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[name] = q
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = qualities.get(encoding, qualities.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+class EncodedBodyCache:
+    """Small LRU of serialized (and compressed) bodies keyed by ETag and encoding"""
+
+    def __init__(self, max_entries: int = 128, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, Optional[str]], bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, Optional[str]]) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key: Tuple[str, Optional[str]], body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+
+body_cache = EncodedBodyCache()
+
+
+def cached_json_response(request: Request, build_payload: Callable[[], Any], etag: str,
+                         cache_control: str = "private, no-cache",
+                         min_compress_size: int = MIN_COMPRESS_SIZE) -> Response:
+    """Return 304, a cached encoded body, or a freshly serialized one"""
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        headers["ETag"] = _variant_etag(etag, encoding)
+        return Response(status_code=304, headers=headers)
+
+    body = body_cache.get((etag, encoding))
+    if body is None:
+        identity = body_cache.get((etag, None))
+        if identity is None:
+            identity = json_dumps(build_payload())
+            body_cache.put((etag, None), identity)
+        if encoding is not None and len(identity) >= min_compress_size:
+            body = compress(identity, encoding)
+            body_cache.put((etag, encoding), body)
+        else:
+            encoding = None
+            body = identity
+    headers["ETag"] = _variant_etag(etag, encoding)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
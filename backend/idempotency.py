@@ -0,0 +1,196 @@
+"""Idempotency-Key support for non-idempotent POST endpoints.
+
+A retried request carrying the same key as an earlier one must not redo the
+work. If the original is still running in this process the retry awaits the
+same computation; if it finished, the stored result is replayed. Each key is
+one small file in a shared directory (bounded, with a TTL), so a retry that
+lands on another uvicorn worker is answered too, and recording a key costs
+one file write however many keys are stored. While a key is pending in
+another worker, duplicates wait for it instead of starting their own call.
+All file I/O runs in the threadpool, off the event loop.
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+try:
+    from .data_storage import atomic_write_json, file_lock
+except ImportError:  # imported as a top-level module from the backend directory
+    from data_storage import atomic_write_json, file_lock
+
+IDEMPOTENCY_DIR = os.path.join("data", "idempotency")
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a request with a different payload"""
+
+
+class IdempotencyInProgress(Exception):
+    """Another worker is still processing the key and did not finish in time"""
+
+
+def fingerprint(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, directory: str = IDEMPOTENCY_DIR, ttl: float = None, max_entries: int = 10000,
+                 pending_timeout: float = 120.0, poll_interval: float = 0.1):
+        self.directory = directory
+        self.ttl = ttl if ttl is not None else float(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+        self.max_entries = max_entries
+        # A pending marker older than this belongs to a worker that died mid-request
+        self.pending_timeout = pending_timeout
+        self.poll_interval = poll_interval
+        self._inflight: Dict[str, Tuple[str, "asyncio.Task"]] = {}
+        self._written = 0
+        # Taking over an expired entry and removing one are rare; they share one lock
+        self._lock_path = os.path.join(directory, "takeover")
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    @staticmethod
+    def _read(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _live(self, entry: Optional[Dict[str, Any]], now: float) -> bool:
+        if entry is None:
+            return False
+        limit = self.pending_timeout if entry["status"] == "pending" else self.ttl
+        return now - entry["created_at"] < limit
+
+    def _create(self, path: str, entry: Dict[str, Any]) -> bool:
+        """Write entry to path unless the file exists; the file appears complete or not at all"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.link(tmp_path, path)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            os.unlink(tmp_path)
+
+    def _claim(self, key: str, request_fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Return the live entry for key, or record a pending marker and return None"""
+        path = self._path(key)
+        marker = {"status": "pending", "fingerprint": request_fingerprint, "created_at": time.time()}
+        # Almost every key is new: claiming it is one exclusive create, with no lock
+        if self._create(path, marker):
+            self._written += 1
+            return None
+        with file_lock(self._lock_path):
+            entry = self._read(path)
+            if self._live(entry, time.time()):
+                if entry["fingerprint"] != request_fingerprint:
+                    raise IdempotencyKeyReused(key)
+                return entry
+            atomic_write_json(path, marker, indent=None)
+            return None
+
+    def _finish(self, key: str, request_fingerprint: str, entry: Optional[Dict[str, Any]]):
+        path = self._path(key)
+        if entry is not None:
+            atomic_write_json(path, entry, indent=None)
+        else:
+            with file_lock(self._lock_path):
+                # Unless another worker has taken the key over since
+                current = self._read(path)
+                if current is not None and current["status"] == "pending" \
+                        and current["fingerprint"] == request_fingerprint:
+                    os.remove(path)
+        if self._written > self.max_entries // 10:
+            self._written = 0
+            self._evict()
+
+    def _evict(self):
+        """Delete expired entries, then the oldest until at most max_entries are left"""
+        now = time.time()
+        entries = []
+        for item in os.scandir(self.directory):
+            if not item.name.endswith(".json") or item.name.startswith("."):
+                continue
+            try:
+                entries.append((item.stat().st_mtime, item.path))
+            except FileNotFoundError:
+                continue
+        entries.sort(reverse=True)
+        # mtime is when the entry was last written; no entry outlives both limits
+        limit = max(self.ttl, self.pending_timeout)
+        for index, (mtime, path) in enumerate(entries):
+            if index >= self.max_entries or now - mtime >= limit:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def entries(self) -> int:
+        return sum(1 for item in os.scandir(self.directory)
+                   if item.name.endswith(".json") and not item.name.startswith("."))
+
+    async def run(self, key: str, request_fingerprint: str, compute: Callable[[], Awaitable[Any]],
+                  should_store: Callable[[Any], bool] = lambda result: True,
+                  pack: Callable[[Any], Any] = None, unpack: Callable[[Any], Any] = None) -> Tuple[Any, bool]:
+        """Return (result, replayed); compute runs at most once per key while its result is stored.
+
+        pack reduces a result to what is stored and unpack rebuilds a result from it, so the
+        store can keep less than the full response (by default the result is stored as is).
+        """
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            if inflight[0] != request_fingerprint:
+                raise IdempotencyKeyReused(key)
+            return await asyncio.shield(inflight[1]), True
+
+        deadline = time.monotonic() + self.pending_timeout
+        while True:
+            entry = await run_in_threadpool(self._claim, key, request_fingerprint)
+            if entry is None:
+                break
+            if entry["status"] == "done":
+                return (unpack(entry["result"]) if unpack else entry["result"]), True
+            # Pending in another worker: wait for it rather than calling upstream again
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgress(key)
+            await asyncio.sleep(self.poll_interval)
+            # A request from this process may have claimed the key while we slept
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                return await asyncio.shield(inflight[1]), True
+
+        # The computation runs as its own task, so a client that disconnects does not
+        # cancel the work its retry is about to wait for
+        task = asyncio.ensure_future(self._compute(key, request_fingerprint, compute, should_store, pack))
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight[key] = (request_fingerprint, task)
+        return await asyncio.shield(task), False
+
+    async def _compute(self, key: str, request_fingerprint: str, compute: Callable[[], Awaitable[Any]],
+                       should_store: Callable[[Any], bool], pack: Optional[Callable[[Any], Any]]) -> Any:
+        try:
+            result = await compute()
+        except BaseException:
+            # Nothing was stored, so a later retry computes afresh
+            await run_in_threadpool(self._finish, key, request_fingerprint, None)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        entry = None
+        if should_store(result):
+            entry = {"status": "done", "fingerprint": request_fingerprint, "created_at": time.time(),
+                     "result": pack(result) if pack else result}
+        await run_in_threadpool(self._finish, key, request_fingerprint, entry)
+        return result
@@ -0,0 +1,225 @@
+"""Incremental sync of the shipped career resources into the vector database.
+
+Every document in the source directory is extracted and split into chunks
+whose IDs are hashes of their content. A manifest next to the index records
+which chunk IDs each file produced last time, so a sync only embeds and
+upserts chunks that are new and deletes chunks that disappeared; a file whose
+size and mtime are unchanged is not even read. Embedding runs in batches
+across a thread pool, with at most one batch per thread queued ahead, so a
+sync stopped from its progress callback ends within a batch or so.
+
+Usage (from the backend directory)::
+
+    python -m knowledge_sync                 # sync frontend/public/resources
+    python -m knowledge_sync --dry-run       # only report what would change
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+from data_storage import atomic_write_json
+from generate_pdfs import DOCUMENTS, OUTPUT_DIR
+
+KNOWLEDGE_DIR = os.getenv("KNOWLEDGE_DIR", OUTPUT_DIR)
+MANIFEST_NAME = "knowledge_manifest.json"
+MANIFEST_VERSION = 1
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".md")
+
+
+def spec_text(title: str, content: List[Dict[str, str]]) -> str:
+    """Plain text of a generate_pdfs spec; headings start new paragraphs"""
+    paragraphs = [title]
+    for section in content:
+        if section["type"] == "title":
+            paragraphs.append("")
+        paragraphs.append(section["text"])
+    return "\n".join(paragraphs)
+
+
+def extract_text(path: str) -> str:
+    """Text of a resource. PDFs we generate are read from their spec, which is the source of truth"""
+    name = os.path.basename(path)
+    if name in DOCUMENTS:
+        return spec_text(*DOCUMENTS[name])
+    if path.endswith(".pdf"):
+        if PdfReader is None:
+            raise RuntimeError("pypdf is required to read PDF resources")
+        return "\n\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def chunk_text(text: str, max_chars: int = 800) -> List[str]:
+    """Split on blank lines into sections, packing whole lines up to max_chars per chunk"""
+    chunks: List[str] = []
+    for section in text.split("\n\n"):
+        current: List[str] = []
+        size = 0
+        for line in (line.strip() for line in section.splitlines()):
+            if not line:
+                continue
+            while len(line) > max_chars:
+                chunks.append(line[:max_chars])
+                line = line[max_chars:]
+            if current and size + len(line) + 1 > max_chars:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(line)
+            size += len(line) + 1
+        if current:
+            chunks.append("\n".join(current))
+    return chunks
+
+
+def chunk_id(source: str, text: str) -> str:
+    return hashlib.sha1(f"{source}\x1f{text}".encode("utf-8")).hexdigest()
+
+
+class KnowledgeSync:
+    def __init__(self, vector_db, source_dir: str = KNOWLEDGE_DIR, chunk_chars: int = 800,
+                 batch_size: int = 32, workers: int = None):
+        self.vector_db = vector_db
+        self.source_dir = source_dir
+        self.chunk_chars = chunk_chars
+        self.batch_size = batch_size
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.manifest_path = os.path.join(vector_db.persist_directory, MANIFEST_NAME)
+        embedding_function = vector_db.embedding_function
+        self.model_name = getattr(embedding_function, "model_name", None) or embedding_function.name()
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {"files": {}}
+        # Vectors from another model (or manifest format) cannot be reused
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("model") != self.model_name:
+            return {"files": {}, "stale_ids": [i for f in manifest.get("files", {}).values() for i in f["chunks"]]}
+        return manifest
+
+    def _scan(self) -> List[str]:
+        paths = []
+        for root, _, files in os.walk(self.source_dir):
+            for name in files:
+                if name.lower().endswith(SUPPORTED_EXTENSIONS) and not name.startswith("."):
+                    paths.append(os.path.relpath(os.path.join(root, name), self.source_dir))
+        return sorted(paths)
+
+    def plan(self) -> Dict[str, Any]:
+        """Work out which chunks to embed and which IDs to delete, without touching the index"""
+        manifest = self._load_manifest()
+        previous = manifest["files"]
+        files: Dict[str, Any] = {}
+        upserts: List[Dict[str, Any]] = []
+        unchanged_files = 0
+
+        for rel_path in self._scan():
+            path = os.path.join(self.source_dir, rel_path)
+            st = os.stat(path)
+            signature = [st.st_size, st.st_mtime_ns]
+            old = previous.get(rel_path)
+            if old and old["signature"] == signature:
+                files[rel_path] = old
+                unchanged_files += 1
+                continue
+
+            text = extract_text(path)
+            digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            if old and old["sha256"] == digest:
+                files[rel_path] = dict(old, signature=signature)
+                unchanged_files += 1
+                continue
+
+            known = set(old["chunks"]) if old else set()
+            ids = []
+            for index, text_chunk in enumerate(chunk_text(text, self.chunk_chars)):
+                cid = chunk_id(rel_path, text_chunk)
+                if cid in ids:
+                    continue
+                ids.append(cid)
+                if cid not in known:
+                    upserts.append({"id": cid, "text": text_chunk,
+                                    "metadata": {"source": rel_path, "type": "resource", "chunk": index}})
+            files[rel_path] = {"signature": signature, "sha256": digest, "chunks": ids}
+
+        kept = {cid for entry in files.values() for cid in entry["chunks"]}
+        old_ids = {cid for entry in previous.values() for cid in entry["chunks"]}
+        deletes = sorted((old_ids | set(manifest.get("stale_ids", []))) - kept)
+        return {"files": files, "upserts": upserts, "deletes": deletes, "unchanged_files": unchanged_files,
+                "unchanged_chunks": len(kept) - len(upserts)}
+
+    def _embed_batch(self, batch: List[Dict[str, Any]]):
+        return batch, self.vector_db.embedding_function([item["text"] for item in batch])
+
+    def sync(self, dry_run: bool = False,
+             on_progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        started = time.perf_counter()
+        plan = self.plan()
+        upserts, deletes = plan["upserts"], plan["deletes"]
+        if not dry_run:
+            batches = iter([upserts[i:i + self.batch_size] for i in range(0, len(upserts), self.batch_size)])
+            done = 0
+            # Embedding is the expensive step, so batches are embedded concurrently and
+            # written to the index in order. Each finished batch lets the next one in, so
+            # when on_progress raises (a cancelled task) nothing else has been queued.
+            pool = ThreadPoolExecutor(max_workers=self.workers)
+            try:
+                in_flight = deque(pool.submit(self._embed_batch, batch) for batch in islice(batches, self.workers))
+                while in_flight:
+                    batch, embeddings = in_flight.popleft().result()
+                    following = next(batches, None)
+                    if following is not None:
+                        in_flight.append(pool.submit(self._embed_batch, following))
+                    self.vector_db.upsert_embedded(
+                        [item["id"] for item in batch], [item["text"] for item in batch],
+                        [list(map(float, vector)) for vector in embeddings],
+                        [item["metadata"] for item in batch],
+                    )
+                    done += len(batch)
+                    if on_progress:
+                        on_progress(done, len(upserts))
+            finally:
+                pool.shutdown(cancel_futures=True)
+            self.vector_db.delete_ids(deletes)
+            atomic_write_json(self.manifest_path, {"version": MANIFEST_VERSION, "model": self.model_name,
+                                                   "files": plan["files"]})
+        return {
+            "files": len(plan["files"]),
+            "unchanged_files": plan["unchanged_files"],
+            "upserted": len(upserts),
+            "deleted": len(deletes),
+            "unchanged_chunks": plan["unchanged_chunks"],
+            "dry_run": dry_run,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Sync resource documents into the vector database")
+    parser.add_argument("--source-dir", default=KNOWLEDGE_DIR)
+    parser.add_argument("--db", default="data/vector_db", help="vector database directory")
+    parser.add_argument("--workers", type=int, help="embedding threads")
+    parser.add_argument("--dry-run", action="store_true", help="report changes without applying them")
+    args = parser.parse_args(argv)
+
+    from vector_db import VectorDB
+    result = KnowledgeSync(VectorDB(args.db), args.source_dir, workers=args.workers).sync(dry_run=args.dry_run)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,40 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, status, Query, Request, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr
 from typing import List, Dict, Any, Optional
 from services.chatbot import ChatbotService
-from services.job_scraper import JobScraper
+from services.job_scraper import JOB_FIELDS, JobScraper, parse_fields, project_jobs, project_rows
 from datetime import datetime, timedelta, timezone
 import os
 from dotenv import load_dotenv
 from passlib.context import CryptContext
 from jose import JWTError, jwt
-from data_storage import get_users, save_user, get_user, get_sessions, save_session
+from data_storage import get_users, get_user, create_user
+from scheduling import SessionStore, SchedulingConflict, DEFAULT_DURATION, MIN_DURATION, MAX_DURATION
+from http_cache import cached_json_response, etag_matches, make_etag
+from services.faq_index import FAQIndex
+from services.intent_router import IntentRouter
+from services.mentor_matching import MentorCatalogue, hours_mask, slot_mask
+from generate_pdfs import DOCUMENTS, personalize, spec_hash
+from pdf_cache import PDFCache, iter_file
+from task_queue import TaskQueue, QueueFull, FINAL_STATUSES
+from idempotency import IdempotencyStore, IdempotencyKeyReused, IdempotencyInProgress, fingerprint
+from structured_logging import RequestLoggingMiddleware, configure_logging, get_logger, stage
+from chat_replay import REPLAY_DIR, ChatReplay
+from usage import UsageTracker, conversation_stage, seconds_until_tomorrow
+from memory import estimate_tokens
+import asyncio
+import concurrent.futures
 import json
+import threading
 
 load_dotenv()
+# Log records are written as JSON lines by a background thread; see structured_logging
+configure_logging()
+logger = get_logger("api")
 
 # Initialize FastAPI app
 app = FastAPI()
@@ -31,15 +52,18 @@ app.add_middleware(
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "a_very_secret_key_please_change") # Use env var in production
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Accounts allowed to change shared data (knowledge base, FAQ, mentors): comma-separated emails
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
+# Background task kinds that change shared data or replay many conversations
+ADMIN_TASK_KINDS = ("knowledge_ingest", "knowledge_sync", "faq_reembed", "chat_replay")
 
 # --- Password Hashing ---
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-# --- In-Memory Database (Replace with real DB for production) ---
-fake_users_db: Dict[str, Dict[str, Any]] = {}
-
 # --- OAuth2 Scheme ---
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
+# For endpoints that work without signing in but know the user when a token is sent
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token", auto_error=False)
 
 # --- Pydantic Models ---
 class UserBase(BaseModel):
@@ -76,11 +100,36 @@ class ChatResponse(BaseModel):
     response: str
     conversation_history: List[Message]
     status: str
+    source: Optional[Dict[str, Any]] = None  # set when the answer came from the FAQ index or a tool, not the LLM
+
+class TaskRequest(BaseModel):
+    kind: str
+    params: Dict[str, Any] = {}
+    priority: str = "normal"  # high | normal | low
 
 class SessionRequest(BaseModel):
     mentorName: str
     date: str
     time: str
+    duration: int = DEFAULT_DURATION  # minutes
+
+class MentorProfile(BaseModel):
+    name: str
+    headline: str = ""
+    bio: str = ""
+    skills: List[str] = []
+    availability: Dict[str, List[str]] = {}  # {"mon": ["18:00-20:00"], ...}
+
+class MentorMatchRequest(BaseModel):
+    goals: str
+    skills: List[str] = []  # the mentor must have all of them
+    days: List[str] = []  # with start_hour/end_hour: mentors free at some hour in this window
+    start_hour: int = 0
+    end_hour: int = 24
+    date: Optional[str] = None  # with time: mentors free for the whole session and not already booked
+    time: Optional[str] = None
+    duration: int = DEFAULT_DURATION
+    top_k: int = 5
 
 # --- Utility Functions ---
 def verify_password(plain_password, hashed_password):
@@ -121,6 +170,30 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     #     raise HTTPException(status_code=400, detail="Inactive user")
     return User(id=token_data.email, email=token_data.email, full_name=user.get("full_name"))
 
+def is_admin(user: User) -> bool:
+    return user.email.lower() in ADMIN_EMAILS
+
+async def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    if not is_admin(current_user):
+        raise HTTPException(status_code=403, detail="Administrator access required")
+    return current_user
+
+async def get_optional_email(token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[str]:
+    """The signed-in user's email, or None for anonymous requests"""
+    if token:
+        try:
+            return jwt.decode(token, JWT_SECRET_KEY, algorithms=[ALGORITHM]).get("sub") or None
+        except JWTError:
+            pass
+    return None
+
+async def get_usage_key(request: Request, email: Optional[str] = Depends(get_optional_email)) -> str:
+    """Who token usage is charged to: the signed-in user, or the client address for anonymous chats.
+
+    Everyone behind one proxy or NAT shares an anonymous budget; signing in gets a budget of one's own.
+    """
+    return email or f"ip:{request.client.host if request.client else 'unknown'}"
+
 
 # --- FastAPI App ---
 app = FastAPI()
@@ -132,27 +205,174 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
+# Request IDs, per-stage timings and one access log record per request
+app.add_middleware(RequestLoggingMiddleware)
 
 # Initialize services
-chatbot_service = ChatbotService()
+# Each uvicorn worker process builds its own instances; all shared state lives in
+# the data directory behind file locks (see data_storage.file_lock).
+usage_tracker = UsageTracker()
+chatbot_service = ChatbotService(usage_tracker)
 job_scraper = JobScraper()
-
-# In-memory storage for scheduled sessions
-scheduled_sessions = []
+session_store = SessionStore()
+pdf_cache = PDFCache()
+task_queue = TaskQueue()
+idempotency_store = IdempotencyStore()
+
+def _lazy(factory):
+    """Build the instance on the first call (once, even with concurrent callers) and reuse it"""
+    lock = threading.Lock()
+    instance = []
+
+    def get():
+        with lock:
+            if not instance:
+                instance.append(factory())
+            return instance[0]
+    return get
+
+# Services that embed text are built on first use (or by the warm-up at startup), so
+# importing this module - in workers, the CLI tools or tests - never loads a model
+get_faq_index = _lazy(FAQIndex)
+get_intent_router = _lazy(lambda: IntentRouter(job_scraper, session_store, get_faq_index()))
+get_mentor_catalogue = _lazy(MentorCatalogue)
+
+_vector_db = None
+_vector_db_lock = threading.Lock()
+
+def get_vector_db():
+    # Created on first use: chromadb is slow to import and only background tasks need it
+    global _vector_db
+    with _vector_db_lock:
+        if _vector_db is None:
+            from vector_db import VectorDB
+            _vector_db = VectorDB()
+        return _vector_db
+
+# --- Background task handlers ---
+# Each takes the submitted params and a TaskContext; the return value is the task result.
+def summarize_conversation_task(params: Dict[str, Any], context):
+    # Charged to whoever submitted the task, like their own chats
+    messages = params.get("messages", [])
+    remaining = usage_tracker.remaining(context.user)
+    prompt_tokens = sum(estimate_tokens(str(msg.get("content", ""))) for msg in messages)
+    if remaining is not None and remaining <= prompt_tokens:
+        raise RuntimeError("Daily token budget used up; try again tomorrow")
+    # Off the request path, so the model gets longer than the interactive 30 s
+    return {"summary": chatbot_service.summarize(
+        messages, timeout=120, user=context.user,
+        max_tokens=usage_tracker.max_tokens_for("summary", remaining, prompt_tokens))}
+
+def ingest_knowledge_task(params: Dict[str, Any], context):
+    def on_batch(done, total):
+        context.progress(done, total)
+        context.check_cancelled()
+    return {"ingested": get_vector_db().upsert_documents(params.get("documents", []), on_batch=on_batch)}
+
+def reembed_faq_task(params: Dict[str, Any], context):
+    return {"entries": get_faq_index().reload()}
+
+def sync_knowledge_task(params: Dict[str, Any], context):
+    from knowledge_sync import KnowledgeSync
+
+    def on_progress(done, total):
+        context.progress(done, total)
+        # Stopping early is safe: the manifest is only written after a complete sync
+        context.check_cancelled()
+    return KnowledgeSync(get_vector_db()).sync(dry_run=bool(params.get("dry_run")), on_progress=on_progress)
+
+def make_replay_reply(output_path: str, user: Optional[str] = None):
+    """Chat pipeline for a replay run (see chat_replay), answering like /api/chat;
+    LLM calls are charged to user's budget."""
+    # Bookings made by replayed conversations go to a scratch calendar next to the results,
+    # not the real one; it persists with them, so a resumed run sees the same bookings
+    router = IntentRouter(job_scraper, SessionStore(log_file=f"{output_path}.sessions.jsonl",
+                                                    legacy_file=f"{output_path}.sessions.json"), get_faq_index())
+
+    async def reply(messages, user_input):
+        request = ChatRequest(messages=[Message(**msg) for msg in messages], user_input=user_input)
+        # Replays are counted under their own route, against the budget of whoever started them
+        return await _chat_reply(request, router=router, user=user, route="replay")
+    return reply
+
+def replay_chat_task(params: Dict[str, Any], context):
+    # Files are named relative to data/replays, so a task cannot read or write elsewhere
+    input_name = params.get("input", "")
+    output_name = params.get("output") or f"{os.path.splitext(input_name)[0]}.results.jsonl"
+    if any(not name or os.path.basename(name) != name or name.startswith(".") for name in (input_name, output_name)):
+        raise ValueError("input and output must be file names in the replay directory")
+    output_path = os.path.join(REPLAY_DIR, output_name)
+    replay = ChatReplay(make_replay_reply(output_path, context.user), os.path.join(REPLAY_DIR, input_name), output_path,
+                        concurrency=int(params.get("concurrency", 4)), rate_limit=params.get("rate_limit"))
+
+    # Stopping early is safe: resubmitting the same replay resumes from its output
+    if _server_loop is None:
+        def report(done, total):
+            context.progress(done, total)
+            context.check_cancelled()
+        return asyncio.run(replay.run(on_progress=report))
+
+    # On the server's event loop, so replies share its threadpool and in-flight idempotency keys.
+    # Progress writes and cancellation checks touch the tasks file, so this thread does them.
+    latest = {}
+    running = asyncio.run_coroutine_threadsafe(
+        replay.run(on_progress=lambda done, total: latest.update(done=done, total=total)), _server_loop)
+    while True:
+        try:
+            return running.result(timeout=1)
+        except concurrent.futures.TimeoutError:
+            pass
+        if latest:
+            context.progress(latest["done"], latest["total"])
+        if context.cancelled():
+            running.cancel()
+            context.check_cancelled()
+
+task_queue.register("conversation_summary", summarize_conversation_task)
+task_queue.register("knowledge_ingest", ingest_knowledge_task)
+task_queue.register("faq_reembed", reembed_faq_task)
+task_queue.register("knowledge_sync", sync_knowledge_task)
+# The input file and earlier failures can change under the same parameters, so a
+# finished replay is never handed back in place of a new run
+task_queue.register("chat_replay", replay_chat_task, reuse_results=False)
+
+_server_loop = None
+
+@app.on_event("startup")
+async def start_task_workers():
+    global _server_loop
+    _server_loop = asyncio.get_running_loop()
+    task_queue.start()
+    # Load the embedding model and build the indexes in the background, so the first
+    # chat does not wait for them and startup does not either
+    threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+
+def _warm_up():
+    try:
+        get_intent_router()
+        get_mentor_catalogue()
+    except Exception:
+        logger.exception("warm-up failed; services will be built on first use")
+
+@app.on_event("shutdown")
+def stop_task_workers():
+    global _server_loop
+    task_queue.shutdown()
+    _server_loop = None
+    usage_tracker.flush()
 
 # --- Authentication Endpoints ---
 @app.post("/api/auth/register", response_model=User)
-async def register_user(user_in: UserCreate):
-    print(f"Registration attempt received for email: {user_in.email}")
-    
+def register_user(user_in: UserCreate):
+    # Plain def: password hashing and the locked users-file write would block the event loop
     # Check if user already exists
     if get_user(user_in.email):
-        print(f"Email already registered: {user_in.email}")
+        logger.info("registration rejected: email already registered")
         raise HTTPException(status_code=400, detail="Email already registered")
     
     try:
-        print("Hashing password...")
         hashed_password = get_password_hash(user_in.password)
         user_db_data = {
             "email": user_in.email,
@@ -160,11 +380,16 @@ async def register_user(user_in: UserCreate):
             "hashed_password": hashed_password,
             "disabled": False
         }
-        save_user(user_in.email, user_db_data)
-        print(f"Successfully registered user: {user_in.email}")
+        # Re-checked under the users file lock: another worker may have registered the email meanwhile
+        if not create_user(user_in.email, user_db_data):
+            logger.info("registration rejected: email already registered")
+            raise HTTPException(status_code=400, detail="Email already registered")
+        logger.info("user registered")
         return User(id=user_in.email, email=user_in.email, full_name=user_in.full_name)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error during registration: {str(e)}")
+        logger.exception("registration failed")
         raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
 @app.post("/api/auth/token", response_model=Token)
@@ -187,72 +412,314 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
     # The Depends(get_current_user) handles token validation and fetching user
     return current_user
 
+@app.get("/api/users/me/usage")
+async def read_my_usage(current_user: User = Depends(get_current_user)):
+    # Today's (UTC) LLM token usage; counts from other workers can lag by USAGE_FLUSH_INTERVAL
+    return dict(usage_tracker.usage(current_user.email), daily_budget=usage_tracker.daily_budget or None,
+                remaining=usage_tracker.remaining(current_user.email))
+
 # --- Existing Endpoints (Chat & Jobs) ---
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest): # Consider adding current_user: User = Depends(get_current_user) if chats should be user-specific
+async def chat(request: ChatRequest, response: Response,
+               idempotency_key: Optional[str] = Header(None, max_length=255),
+               usage_key: str = Depends(get_usage_key)): # Consider adding current_user: User = Depends(get_current_user) if chats should be user-specific
     try:
-        # Convert messages Pydantic models to dicts for the service
-        conversation_history = [msg.model_dump() for msg in request.messages]
-
-        result = chatbot_service.generate_response(
-            conversation_history=conversation_history,
-            user_input=request.user_input
-        )
+        if not idempotency_key:
+            return await _chat_reply(request, user=usage_key)
+        result, replayed = await _chat_with_idempotency(request, idempotency_key, user=usage_key)
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return result
+    except HTTPException:
+        raise
+    except IdempotencyKeyReused:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    except IdempotencyInProgress:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+    except Exception:
+        logger.exception("chat request failed")
+        raise HTTPException(status_code=500, detail="Internal server error during chat processing")
 
-        # Convert response dicts back to Message models
-        response_messages = [Message(**msg) for msg in result["conversation_history"]]
+async def _chat_with_idempotency(request: ChatRequest, idempotency_key: str, **reply_options):
+    # Retries must not call the model (or book a session) again. The client stamps
+    # messages afresh on every attempt, so timestamps are not part of the identity.
+    payload = {"user_input": request.user_input, "messages": [[m.role, m.content] for m in request.messages]}
+    return await idempotency_store.run(
+        f"chat:{idempotency_key}", fingerprint(payload), lambda: _chat_reply(request, **reply_options),
+        should_store=lambda reply: reply["status"] == "success",
+        pack=_pack_reply, unpack=lambda stored: _unpack_reply(request, stored)
+    )
 
+def _pack_reply(reply: Dict[str, Any]) -> Dict[str, Any]:
+    # Only the new turn is stored; the history the client sent is part of the fingerprint
+    user_message, assistant_message = reply["conversation_history"][-2:]
+    return {"response": reply["response"], "status": reply["status"], "source": reply["source"],
+            "timestamps": [user_message["timestamp"], assistant_message["timestamp"]]}
+
+def _unpack_reply(request: ChatRequest, stored: Dict[str, Any]) -> Dict[str, Any]:
+    asked_at, answered_at = stored["timestamps"]
+    history = [msg.model_dump() for msg in request.messages]
+    history.append({"role": "user", "content": request.user_input, "timestamp": asked_at})
+    history.append({"role": "assistant", "content": stored["response"], "timestamp": answered_at})
+    return ChatResponse(response=stored["response"], conversation_history=[Message(**msg) for msg in history],
+                        status=stored["status"], source=stored["source"]).model_dump()
+
+async def _chat_reply(request: ChatRequest, router: IntentRouter = None, user: Optional[str] = None,
+                      route: str = "chat") -> Dict[str, Any]:
+    # Convert messages Pydantic models to dicts for the service
+    conversation_history = [msg.model_dump() for msg in request.messages]
+
+    # Known FAQ questions, job searches and bookings are answered locally without an LLM call.
+    # Both paths block on I/O, so they run in the threadpool instead of on the event loop.
+    with stage("route"):
+        routed, intent = await run_in_threadpool(
+            lambda: (router or get_intent_router()).route_with_intent(request.user_input))
+    if routed:
+        now = datetime.now().isoformat()
+        conversation_history.append({"role": "user", "content": request.user_input, "timestamp": now})
+        conversation_history.append({"role": "assistant", "content": routed["response"], "timestamp": now})
         return ChatResponse(
-            response=result["response"],
-            conversation_history=response_messages,
-            status=result["status"]
+            response=routed["response"],
+            conversation_history=[Message(**msg) for msg in conversation_history],
+            status="success",
+            source=routed["source"]
+        ).model_dump()
+
+    # Local answers above cost no tokens, so they are served even when the budget is spent.
+    # The prompt is charged as well, so there must be budget left over for a reply.
+    remaining = usage_tracker.remaining(user)
+    prompt_tokens = sum(estimate_tokens(msg["content"]) for msg in conversation_history) + \
+        estimate_tokens(request.user_input)
+    if remaining is not None and remaining <= prompt_tokens:
+        raise HTTPException(status_code=429, detail="Daily token budget used up; try again tomorrow",
+                            headers={"Retry-After": str(seconds_until_tomorrow())})
+    # Sized from how long replies to this kind of message at this point in a conversation usually are
+    bucket = f"{intent}:{conversation_stage(conversation_history)}"
+    with stage("llm"):
+        result = await run_in_threadpool(
+            chatbot_service.generate_response,
+            conversation_history=conversation_history,
+            user_input=request.user_input,
+            max_tokens=usage_tracker.max_tokens_for(bucket, remaining, prompt_tokens),
+            user=user,
+            route=route,
+            bucket=bucket
         )
 
-    except Exception as e:
-        print(f"Error in /api/chat: {e}") # Added print for debugging
-        # Consider more specific error handling or logging
-        raise HTTPException(status_code=500, detail="Internal server error during chat processing")
-
+    # Convert response dicts back to Message models
+    response_messages = [Message(**msg) for msg in result["conversation_history"]]
+
+    return ChatResponse(
+        response=result["response"],
+        conversation_history=response_messages,
+        status=result["status"]
+    ).model_dump()
+
+
+@app.post("/api/faq/reload")
+async def reload_faq(current_user: User = Depends(get_admin_user)):
+    # The index also picks up edits to the FAQ file by itself within a few seconds.
+    # Re-embedding is CPU-bound, so it runs in the threadpool.
+    entries = await run_in_threadpool(lambda: get_faq_index().reload())
+    return {"status": "success", "entries": entries}
+
+@app.get("/api/resources/{document}.pdf")
+def get_resource_pdf(request: Request, document: str,
+                     name: Optional[str] = Query(None, max_length=100),
+                     role: Optional[str] = Query(None, max_length=100)):
+    # Plain def: a cache miss renders the PDF, which should not block the event loop
+    spec = DOCUMENTS.get(f"{document}.pdf")
+    if spec is None:
+        raise HTTPException(status_code=404, detail="Resource not found")
+    title, content = personalize(*spec, full_name=name, target_role=role)
+    etag = f'"{spec_hash(title, content)}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    f, _, size = pdf_cache.open(title, content)
+    headers["Content-Length"] = str(size)
+    headers["Content-Disposition"] = f'inline; filename="{document}.pdf"'
+    return StreamingResponse(iter_file(f), media_type="application/pdf", headers=headers)
 
 @app.get("/api/jobs")
-async def get_jobs(query: str = None, location: str = None): # Consider adding current_user: User = Depends(get_current_user) if access should be restricted
+async def get_jobs(request: Request, query: str = None, location: str = None, fields: str = None,
+                   layout: str = Query("objects", pattern="^(objects|rows)$")): # Consider adding current_user: User = Depends(get_current_user) if access should be restricted
+    # Without fields= each job has every field, as before. fields= picks the keys per job (comma-separated,
+    # or "list" for a compact list view) and descriptions become previews, see /api/jobs/{job_id}.
+    # layout=rows sends {"fields": [...], "rows": [[...], ...]} instead of one object per job.
     try:
-        jobs = job_scraper.search_jobs(query, location)
-        return {"jobs": jobs}
-    except Exception as e:
-        print(f"Error in /api/jobs: {e}") # Added print for debugging
+        selected = parse_fields(fields) if fields else JOB_FIELDS
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        # Waits on the providers for up to the search deadline, so keep it off the event loop
+        jobs, version, missing = await run_in_threadpool(job_scraper.search, query, location)
+        etag = make_etag("jobs", version, query, location, ",".join(selected) if fields else "all", layout, ",".join(missing))
+        if not fields and layout == "objects":
+            return cached_json_response(
+                request, lambda: {"jobs": [job.to_dict() for job in jobs], "missing_providers": missing}, etag)
+        if layout == "rows":
+            return cached_json_response(
+                request, lambda: dict(project_rows(jobs, selected), missing_providers=missing), etag)
+        return cached_json_response(
+            request, lambda: {"jobs": project_jobs(jobs, selected), "missing_providers": missing}, etag)
+    except Exception:
+        logger.exception("job search failed")
         raise HTTPException(status_code=500, detail="Internal server error during job search")
 
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    # A miss here falls back to the store shared with the other workers
+    job = await run_in_threadpool(job_scraper.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found; it may have expired, search again")
+    return job.to_dict()
+
+# Plain def for the session endpoints: the store takes a cross-process file lock and reads its log
 @app.post("/api/schedule-session")
-async def schedule_session(session: SessionRequest):
+def schedule_session(session: SessionRequest, email: Optional[str] = Depends(get_optional_email)):
+    if not session.mentorName.strip():
+        raise HTTPException(status_code=400, detail="Mentor name is required")
+    if not MIN_DURATION <= session.duration <= MAX_DURATION:
+        raise HTTPException(status_code=400, detail="Duration must be between 15 and 480 minutes")
     try:
-        # Validate date format
-        datetime.strptime(session.date, '%Y-%m-%d')
-        
-        # Save session to persistent storage
-        session_data = {
-            "mentorName": session.mentorName,
-            "date": session.date,
-            "time": session.time,
-            "status": "scheduled"
-        }
-        save_session(session_data)
-        
-        return {"message": "Session scheduled successfully"}
+        # Only a signed-in booker can cancel the session later (administrators can cancel any)
+        booked = session_store.book(session.mentorName, session.date, session.time, session.duration,
+                                    booked_by=email)
+        return {"message": "Session scheduled successfully", "session": booked}
     except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid date format")
+        raise HTTPException(status_code=400, detail="Invalid date or time format (expected YYYY-MM-DD and HH:MM)")
+    except SchedulingConflict as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "conflict": e.session})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/scheduled-sessions")
-async def get_scheduled_sessions():
-    return get_sessions()
+def get_scheduled_sessions(
+    request: Request,
+    mentor: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    status: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+):
+    # The log length changes with every booking, so it versions every possible listing
+    etag = make_etag("sessions", session_store.version, mentor, date_from, date_to, status, offset, limit)
+    try:
+        return cached_json_response(
+            request, lambda: session_store.list_sessions(mentor, date_from, date_to, status, offset, limit), etag
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format (expected YYYY-MM-DD)")
+
+@app.delete("/api/scheduled-sessions/{session_id}")
+def cancel_scheduled_session(session_id: str, current_user: User = Depends(get_current_user)):
+    # Someone else's booking answers like a missing one
+    cancelled = session_store.cancel(session_id, None if is_admin(current_user) else current_user.email)
+    if cancelled is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"message": "Session cancelled", "session": cancelled}
+
+@app.get("/api/mentors/{mentor_name}/availability")
+def get_mentor_availability(
+    mentor_name: str,
+    date: str,
+    duration: int = Query(DEFAULT_DURATION, ge=MIN_DURATION, le=MAX_DURATION),
+    day_start: str = "09:00",
+    day_end: str = "18:00",
+):
+    try:
+        slots = session_store.free_slots(mentor_name, date, duration, day_start, day_end)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date or time format (expected YYYY-MM-DD and HH:MM)")
+    return {"mentorName": mentor_name, "date": date, "duration": duration, "free_slots": slots}
+
+# --- Mentor Matching ---
+@app.post("/api/mentors/match")
+def match_mentors(match_request: MentorMatchRequest):
+    if not 1 <= match_request.top_k <= 50:
+        raise HTTPException(status_code=400, detail="top_k must be between 1 and 50")
+    accept = None
+    try:
+        if match_request.date and match_request.time:
+            availability = slot_mask(match_request.date, match_request.time, match_request.duration)
+            # The weekly bitset says when a mentor is generally free; the calendar knows what is booked
+            accept = lambda mentor: session_store.is_free(
+                mentor["name"], match_request.date, match_request.time, match_request.duration)
+        else:
+            availability = hours_mask(match_request.days, match_request.start_hour, match_request.end_hour)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    mentors = get_mentor_catalogue().match(match_request.goals, match_request.skills, availability,
+                                     require_all_hours=accept is not None, top_k=match_request.top_k,
+                                     accept=accept)
+    return {"mentors": mentors, "total": len(mentors)}
+
+@app.get("/api/mentors/{mentor_id}")
+def get_mentor(mentor_id: str):
+    mentor = get_mentor_catalogue().get(mentor_id)
+    if mentor is None:
+        raise HTTPException(status_code=404, detail="Mentor not found")
+    return mentor
+
+@app.put("/api/mentors/{mentor_id}")
+def update_mentor(mentor_id: str, profile: MentorProfile, current_user: User = Depends(get_admin_user)):
+    try:
+        return get_mentor_catalogue().upsert(dict(profile.model_dump(), id=mentor_id))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.delete("/api/mentors/{mentor_id}")
+async def delete_mentor(mentor_id: str, current_user: User = Depends(get_admin_user)):
+    if not await run_in_threadpool(lambda: get_mentor_catalogue().remove(mentor_id)):
+        raise HTTPException(status_code=404, detail="Mentor not found")
+    return {"message": "Mentor removed", "id": mentor_id}
+
+# --- Background Tasks ---
+def _task_view(task: Dict[str, Any]) -> Dict[str, Any]:
+    # Params can be large (documents to ingest) and the dedup key is internal
+    return {k: v for k, v in task.items() if k not in ("params", "key")}
+
+def _visible_task(task: Optional[Dict[str, Any]], user: User) -> Dict[str, Any]:
+    # Other users' tasks answer like missing ones, so their IDs cannot be probed
+    if task is None or (task.get("user") != user.email and not is_admin(user)):
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+@app.post("/api/tasks", status_code=202)
+async def submit_task(task_request: TaskRequest, current_user: User = Depends(get_current_user)):
+    if task_request.kind in ADMIN_TASK_KINDS and not is_admin(current_user):
+        raise HTTPException(status_code=403, detail="Administrator access required for this task kind")
+    try:
+        # The task's LLM calls are charged to whoever submitted it
+        task = await run_in_threadpool(task_queue.submit, task_request.kind, task_request.params,
+                                       task_request.priority, user=current_user.email)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return _task_view(task)
+
+@app.get("/api/tasks/{task_id}")
+async def get_task(task_id: str, wait: float = Query(0, ge=0, le=60), current_user: User = Depends(get_current_user)):
+    # With wait > 0 this long-polls: it answers as soon as the task finishes or the wait runs out
+    task = _visible_task(await run_in_threadpool(task_queue.get, task_id), current_user)
+    if wait and task["status"] not in FINAL_STATUSES:
+        task = _visible_task(await run_in_threadpool(task_queue.wait, task_id, wait), current_user)
+    return _task_view(task)
+
+@app.delete("/api/tasks/{task_id}")
+async def cancel_task(task_id: str, current_user: User = Depends(get_current_user)):
+    _visible_task(await run_in_threadpool(task_queue.get, task_id), current_user)
+    return _task_view(_visible_task(await run_in_threadpool(task_queue.cancel, task_id), current_user))
 
 # --- Main Execution ---
 if __name__ == "__main__":
     import uvicorn
     # Ensure JWT_SECRET_KEY is set, generate one if not for local dev
     if not os.getenv("JWT_SECRET_KEY"):
-        print("WARNING: JWT_SECRET_KEY not set, using default. SET THIS IN YOUR .env FILE FOR PRODUCTION.")
+        logger.warning("JWT_SECRET_KEY not set, using default. SET THIS IN YOUR .env FILE FOR PRODUCTION.")
         # You might want to generate and save a key to .env here automatically for dev
     uvicorn.run(app, host="0.0.0.0", port=8000) 
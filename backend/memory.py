@@ -1,60 +1,175 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
 from datetime import datetime
+import glob
+import hashlib
 import json
 import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+try:
+    from .data_storage import FileCache, atomic_write_json, file_lock, file_signature
+    from .structured_logging import get_logger
+except ImportError:  # imported as a top-level module from the backend directory
+    from data_storage import FileCache, atomic_write_json, file_lock, file_signature
+    from structured_logging import get_logger
+
+logger = get_logger("memory")
+
+MEMORY_INDEX_DIR = os.path.join("data", "memory_index")
+# Roles worth recalling later; system notes such as "Conversation cleared" are not
+INDEXED_ROLES = ("user", "assistant")
+# Seconds the indexing thread lets turns queue up, so a burst is embedded and written in one go
+INDEX_BATCH_WINDOW = 0.05
+
+def _parse_turn(line: bytes) -> Dict[str, Any]:
+    try:
+        return json.loads(line)
+    except ValueError:
+        # A line torn by a crash mid-append still owns its row, so the files stay aligned
+        return {"role": "", "content": "", "timestamp": ""}
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English)"""
+    return len(text) // 4 + 1
 
 class ConversationMemory:
-    def __init__(self, max_history: int = 10):
+    """Recent turns of each conversation plus a long-term index of all of them.
+
+    The conversation file keeps the last ``max_history`` messages. Every user
+    and assistant turn is also appended, with its embedding, to a per-conversation
+    index: turns go to a JSON-lines file and their vectors to a raw float32 file
+    in the same order, so each turn is embedded exactly once when it is written.
+    get_context() with a query adds the few earlier turns most similar to it,
+    within ``token_budget``, to the recent window.
+
+    Turns are embedded and indexed by a background thread, so add_message()
+    only costs the conversation file write. get_context() and clear() wait
+    for turns already added to be indexed; turns still queued when the
+    process exits are not indexed.
+
+    clear() deletes a conversation's index, so nothing from before the clear
+    is recalled. An index keeps its last ``max_indexed_turns`` turns, and the
+    indexes of conversations idle for ``retention_days`` are deleted.
+    """
+
+    def __init__(self, max_history: int = 10, embedding_service=None, index_dir: str = MEMORY_INDEX_DIR,
+                 token_budget: int = None, max_recalled: int = 4, max_indexed_turns: int = 1000,
+                 retention_days: float = None):
         self.max_history = max_history
         self.memory_file = "data/conversation_memory.json"
+        # Absolute, since the indexing thread may write after the working directory changed
+        self.index_dir = os.path.abspath(index_dir)
+        self.token_budget = token_budget if token_budget is not None else int(os.getenv("MEMORY_TOKEN_BUDGET", "300"))
+        self.max_recalled = max_recalled
+        self.max_indexed_turns = max_indexed_turns
+        self.retention_days = retention_days if retention_days is not None else float(
+            os.getenv("MEMORY_RETENTION_DAYS", "30"))
+        self._turns_since_sweep = 0
+        self._embedding_service = embedding_service
+        self._cache = FileCache()
+        # Loaded indexes by conversation, reused until another write changes the files
+        self._indexes: "OrderedDict[str, Tuple[Any, List[Dict[str, Any]], np.ndarray]]" = OrderedDict()
+        self._indexes_lock = threading.Lock()
+        # Turns waiting for the indexing thread, which is started on the first turn
+        self._pending: "queue.Queue[Tuple[str, Dict[str, Any]]]" = queue.Queue()
+        self._indexer: Optional[threading.Thread] = None
+        self._indexer_lock = threading.Lock()
+        # Set by flush() so the indexing thread stops waiting for more turns
+        self._flush_requested = threading.Event()
+        # Row count of index files as this process last left them, keyed by vector file with
+        # both files' signatures, so appends skip re-reading the turns while nobody else wrote
+        self._aligned: Dict[str, Tuple[Any, int]] = {}
         self._ensure_memory_file()
-        
+
     def _ensure_memory_file(self):
         """Ensure memory file exists"""
         os.makedirs(os.path.dirname(self.memory_file), exist_ok=True)
-        if not os.path.exists(self.memory_file):
-            with open(self.memory_file, "w") as f:
-                json.dump({"conversations": []}, f)
+        with file_lock(self.memory_file):
+            if not os.path.exists(self.memory_file):
+                atomic_write_json(self.memory_file, {"conversations": []}, indent=None)
+
+    def _read(self, file_path: str) -> Dict[str, Any]:
+        with open(file_path, "r") as f:
+            return json.load(f)
+
+    @property
+    def embedding_service(self):
+        # Resolved on first use so a memory that is only read as a window never loads a model
+        if self._embedding_service is None:
+            try:
+                from .embeddings import get_embedding_service
+            except ImportError:
+                from embeddings import get_embedding_service
+            self._embedding_service = get_embedding_service()
+        return self._embedding_service
     
     def add_message(self, conversation_id: str, role: str, content: str, metadata: Dict[str, Any] = None):
         """Add a message to conversation history"""
-        with open(self.memory_file, "r") as f:
-            data = json.load(f)
-            
-        conversation = next(
-            (c for c in data["conversations"] if c["id"] == conversation_id),
-            {"id": conversation_id, "messages": []}
-        )
-        
         message = {
             "role": role,
             "content": content,
             "timestamp": datetime.now().isoformat(),
             "metadata": metadata or {}
         }
+
+        # Hold the lock across read-modify-write so concurrent workers don't drop each other's turns
+        with file_lock(self.memory_file):
+            data = self._read(self.memory_file)
+            
+            conversation = next(
+                (c for c in data["conversations"] if c["id"] == conversation_id),
+                {"id": conversation_id, "messages": []}
+            )
         
-        conversation["messages"].append(message)
+            conversation["messages"].append(message)
         
-        # Keep only the last max_history messages
-        if len(conversation["messages"]) > self.max_history:
-            conversation["messages"] = conversation["messages"][-self.max_history:]
+            # Keep only the last max_history messages
+            if len(conversation["messages"]) > self.max_history:
+                conversation["messages"] = conversation["messages"][-self.max_history:]
             
-        # Update or add conversation
-        if conversation not in data["conversations"]:
-            data["conversations"].append(conversation)
-        else:
-            data["conversations"] = [
-                conversation if c["id"] == conversation_id else c
-                for c in data["conversations"]
-            ]
+            # Update or add conversation
+            if conversation not in data["conversations"]:
+                data["conversations"].append(conversation)
+            else:
+                data["conversations"] = [
+                    conversation if c["id"] == conversation_id else c
+                    for c in data["conversations"]
+                ]
             
-        with open(self.memory_file, "w") as f:
-            json.dump(data, f, indent=2)
+            atomic_write_json(self.memory_file, data)
+            self._cache.invalidate(self.memory_file)
+
+        if role in INDEXED_ROLES and content.strip():
+            self._enqueue_turn(conversation_id, message)
+
+    def flush(self):
+        """Wait until every turn added so far is indexed"""
+        self._flush_requested.set()
+        self._pending.join()
     
+    def clear(self, conversation_id: str):
+        """Mark the conversation cleared and forget its indexed turns"""
+        self.add_message(conversation_id, "system", "Conversation cleared")
+        # Turns still queued would otherwise be indexed again after the files are removed
+        self.flush()
+        turns_file = self._turns_path(conversation_id)
+        with file_lock(turns_file):
+            for path in [turns_file] + self._vector_files(turns_file):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        with self._indexes_lock:
+            self._indexes.pop(conversation_id, None)
+
     def get_conversation(self, conversation_id: str) -> List[Dict[str, Any]]:
         """Get conversation history"""
-        with open(self.memory_file, "r") as f:
-            data = json.load(f)
+        data = self._cache.load(self.memory_file, self._read)
             
         conversation = next(
             (c for c in data["conversations"] if c["id"] == conversation_id),
@@ -63,11 +178,206 @@ class ConversationMemory:
         
         return conversation["messages"]
     
-    def get_context(self, conversation_id: str, n_messages: int = 5) -> str:
-        """Get recent conversation context"""
+    def get_context(self, conversation_id: str, n_messages: int = 5, query: Optional[str] = None) -> str:
+        """Get recent conversation context, plus the earlier turns most relevant to query if given"""
         messages = self.get_conversation(conversation_id)
         recent_messages = messages[-n_messages:]
-        return "\n".join([
+        recent = "\n".join([
             f"{msg['role']}: {msg['content']}"
             for msg in recent_messages
-        ]) 
\ No newline at end of file
+        ])
+        if not query:
+            return recent
+
+        in_window = {(msg["timestamp"], msg["content"]) for msg in recent_messages}
+        self.flush()
+        recalled = self.recall(conversation_id, query, exclude=in_window)
+        if not recalled:
+            return recent
+        earlier = "\n".join(f"{turn['role']}: {turn['content']}" for turn in recalled)
+        return f"Earlier in this conversation:\n{earlier}\n\nRecent messages:\n{recent}"
+
+    # --- Long-term index ---
+    def _turns_path(self, conversation_id: str) -> str:
+        return os.path.join(self.index_dir, hashlib.sha1(conversation_id.encode("utf-8")).hexdigest() + ".jsonl")
+
+    def _index_paths(self, conversation_id: str) -> Tuple[str, str]:
+        turns_file = self._turns_path(conversation_id)
+        # Vectors are per model, so switching models re-embeds the turns instead of mixing spaces
+        model_name = getattr(self.embedding_service, "model_name", type(self.embedding_service).__name__)
+        return turns_file, f"{turns_file[:-len('.jsonl')]}.{hashlib.sha1(model_name.encode('utf-8')).hexdigest()[:10]}.f32"
+
+    @staticmethod
+    def _vector_files(turns_file: str) -> List[str]:
+        """Vector files of every embedding model for one conversation"""
+        return glob.glob(glob.escape(turns_file[:-len(".jsonl")]) + ".*.f32")
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        matrix = np.asarray(self.embedding_service.get_embeddings(texts), dtype=np.float32).reshape(len(texts), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    def _align_vectors(self, turns_file: str, vectors_file: str, dim: int) -> int:
+        """Make the vector file hold exactly one row per turn and return the number of turns;
+        caller holds the turns file lock.
+
+        Rows only go missing (or dangle) if a writer died between the two appends
+        or the embedding model changed, so normally this only counts lines.
+        """
+        signature = (file_signature(turns_file), file_signature(vectors_file))
+        known = self._aligned.get(vectors_file)
+        if known is not None and known[0] == signature:
+            return known[1]
+        row_bytes = 4 * dim
+        rows = os.path.getsize(vectors_file) // row_bytes if os.path.exists(vectors_file) else 0
+        with open(turns_file, "rb") as f:
+            lines = f.read().splitlines()
+        if rows > len(lines):
+            os.truncate(vectors_file, len(lines) * row_bytes)
+        elif rows < len(lines):
+            texts = [_parse_turn(line)["content"] for line in lines[rows:]]
+            with open(vectors_file, "ab") as f:
+                f.truncate(rows * row_bytes)
+                f.write(self._embed(texts).tobytes())
+        self._remember_alignment(turns_file, vectors_file, len(lines))
+        return len(lines)
+
+    def _remember_alignment(self, turns_file: str, vectors_file: str, count: int):
+        self._aligned.pop(vectors_file, None)
+        self._aligned[vectors_file] = ((file_signature(turns_file), file_signature(vectors_file)), count)
+        while len(self._aligned) > 256:
+            del self._aligned[next(iter(self._aligned))]
+
+    def _trim(self, turns_file: str, vectors_file: str, dim: int):
+        """Keep the newest three quarters of max_indexed_turns; caller holds the turns file lock"""
+        keep = self.max_indexed_turns * 3 // 4
+        with open(turns_file, "rb") as f:
+            lines = f.read().splitlines()[-keep:]
+        vectors = np.fromfile(vectors_file, dtype=np.float32).reshape(-1, dim)[-keep:]
+        for path, data in ((vectors_file, vectors.tobytes()), (turns_file, b"".join(l + b"\n" for l in lines))):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        self._remember_alignment(turns_file, vectors_file, len(lines))
+        # Other models' rows no longer line up with the turns; they are re-embedded if needed
+        for path in self._vector_files(turns_file):
+            if path != vectors_file:
+                os.remove(path)
+
+    def _sweep(self):
+        """Delete the indexes of conversations with no new turn for retention_days"""
+        cutoff = time.time() - self.retention_days * 86400
+        for entry in os.scandir(self.index_dir):
+            if not entry.name.endswith(".jsonl"):
+                continue
+            try:
+                if entry.stat().st_mtime >= cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            with file_lock(entry.path):
+                for path in [entry.path] + self._vector_files(entry.path):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+    def _enqueue_turn(self, conversation_id: str, message: Dict[str, Any]):
+        with self._indexer_lock:
+            if self._indexer is None:
+                self._indexer = threading.Thread(target=self._index_pending, name="memory-indexer", daemon=True)
+                self._indexer.start()
+        self._pending.put((conversation_id, message))
+
+    def _index_pending(self):
+        while True:
+            batch = [self._pending.get()]
+            # Turns that queue up meanwhile are embedded in one call per conversation
+            if self._flush_requested.wait(INDEX_BATCH_WINDOW):
+                self._flush_requested.clear()
+            while True:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            by_conversation: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+            for conversation_id, message in batch:
+                by_conversation.setdefault(conversation_id, []).append(message)
+            for conversation_id, messages in by_conversation.items():
+                try:
+                    self._index_turns(conversation_id, messages)
+                except Exception:
+                    # The turns are only missing from recall; the conversation itself was saved
+                    logger.exception("indexing conversation turns failed")
+            for _ in batch:
+                self._pending.task_done()
+
+    def _index_turns(self, conversation_id: str, messages: List[Dict[str, Any]]):
+        # Embed before taking the lock; model inference is the slow part
+        vectors = self._embed([message["content"] for message in messages])
+        dim = vectors.shape[1]
+        turns_file, vectors_file = self._index_paths(conversation_id)
+        os.makedirs(self.index_dir, exist_ok=True)
+        lines = "".join(json.dumps({"role": m["role"], "content": m["content"], "timestamp": m["timestamp"]}) + "\n"
+                        for m in messages)
+        with file_lock(turns_file):
+            count = 0
+            if os.path.exists(turns_file):
+                count = self._align_vectors(turns_file, vectors_file, dim)
+            with open(turns_file, "a", encoding="utf-8") as f:
+                f.write(lines)
+            with open(vectors_file, "ab") as f:
+                f.write(vectors.tobytes())
+            count += len(messages)
+            self._remember_alignment(turns_file, vectors_file, count)
+            if count > self.max_indexed_turns:
+                self._trim(turns_file, vectors_file, dim)
+        self._turns_since_sweep += len(messages)
+        if self._turns_since_sweep >= 100:
+            self._turns_since_sweep = 0
+            self._sweep()
+
+    def _load_index(self, conversation_id: str, dim: int) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        turns_file, vectors_file = self._index_paths(conversation_id)
+        if not os.path.exists(turns_file):
+            return [], np.zeros((0, dim), dtype=np.float32)
+        signature = (file_signature(turns_file), file_signature(vectors_file))
+        with self._indexes_lock:
+            cached = self._indexes.get(conversation_id)
+            if cached is not None and cached[0] == signature:
+                self._indexes.move_to_end(conversation_id)
+                return cached[1], cached[2]
+
+        with file_lock(turns_file):
+            self._align_vectors(turns_file, vectors_file, dim)
+            signature = (file_signature(turns_file), file_signature(vectors_file))
+            with open(turns_file, "rb") as f:
+                turns = [_parse_turn(line) for line in f.read().splitlines()]
+            matrix = np.fromfile(vectors_file, dtype=np.float32).reshape(-1, dim)
+        with self._indexes_lock:
+            self._indexes[conversation_id] = (signature, turns, matrix)
+            self._indexes.move_to_end(conversation_id)
+            while len(self._indexes) > 256:
+                self._indexes.popitem(last=False)
+        return turns, matrix
+
+    def recall(self, conversation_id: str, query: str, exclude=()) -> List[Dict[str, Any]]:
+        """Earlier turns most similar to query, in conversation order, within the token budget"""
+        vector = self._embed([query])[0]
+        turns, matrix = self._load_index(conversation_id, len(vector))
+        if not turns:
+            return []
+        scores = matrix @ vector
+        threshold = getattr(self.embedding_service, "recall_threshold", 0.3)
+        picked, budget = [], self.token_budget
+        for index in np.argsort(-scores, kind="stable"):
+            if scores[index] < threshold or len(picked) == self.max_recalled:
+                break
+            turn = turns[index]
+            cost = estimate_tokens(turn["content"])
+            if (turn["timestamp"], turn["content"]) in exclude or cost > budget:
+                continue
+            picked.append(int(index))
+            budget -= cost
+        return [turns[index] for index in sorted(picked)]
@@ -0,0 +1,84 @@
+"""Size-bounded disk cache of rendered PDFs.
+
+Files are named after the content hash of the spec they were rendered from,
+so a cache hit needs no rendering and identical requests from any worker
+share one file. Renders go through a temp file and os.replace, which makes a
+concurrent duplicate render harmless. Files are opened before they are
+returned, so eviction by another request cannot pull one out from under a
+response that is still streaming it.
+"""
+from typing import BinaryIO, Dict, Iterator, List, Tuple
+import os
+
+from generate_pdfs import render_pdf, spec_hash
+
+PDF_CACHE_DIR = os.path.join("data", "pdf_cache")
+CHUNK_SIZE = 64 * 1024
+
+
+class PDFCache:
+    def __init__(self, cache_dir: str = PDF_CACHE_DIR, max_bytes: int = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.getenv("PDF_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    def open(self, title: str, content: List[Dict[str, str]]) -> Tuple[BinaryIO, str, int]:
+        """Open the rendered PDF for a spec, rendering it first on a miss.
+
+        Returns the open file, the content hash and the size in bytes.
+        """
+        key = spec_hash(title, content)
+        path = self.path_for(key)
+        try:
+            f = open(path, "rb")
+            # Mark as recently used for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            render_pdf(path, title, content)
+            f = open(path, "rb")
+            self._evict(keep=path)
+        return f, key, os.fstat(f.fileno()).st_size
+
+    def _evict(self, keep: str = None):
+        """Delete least recently used files until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".pdf"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            total += stat.st_size
+            entries.append((stat.st_mtime_ns, entry.path, stat.st_size))
+        entries.sort()
+        for _, path, size in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+    def size(self) -> int:
+        return sum(e.stat().st_size for e in os.scandir(self.cache_dir) if e.name.endswith(".pdf"))
+
+
+def iter_file(f: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a file in chunks and close it, for StreamingResponse"""
+    try:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
@@ -0,0 +1,361 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+import json
+import os
+import threading
+import uuid
+
+from data_storage import DATA_DIR, SESSIONS_FILE, file_lock
+
+SESSIONS_LOG = os.path.join(DATA_DIR, "sessions.jsonl")
+
+DEFAULT_DURATION = 60
+# Session lengths a booking may have, in minutes
+MIN_DURATION = 15
+MAX_DURATION = 8 * 60
+ACTIVE_STATUS = "scheduled"
+EPOCH = datetime(1970, 1, 1)
+
+
+class SchedulingConflict(Exception):
+    """Raised when a booking overlaps an existing session of the same mentor"""
+
+    def __init__(self, session: Dict[str, Any]):
+        super().__init__(f"{session['mentorName']} already has a session at {session['date']} {session['time']}")
+        self.session = session
+
+
+def to_minutes(date: str, time: str) -> int:
+    """Minutes since the epoch for a YYYY-MM-DD date and HH:MM time"""
+    moment = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
+    return int((moment - EPOCH).total_seconds()) // 60
+
+
+def from_minutes(minutes: int) -> Tuple[str, str]:
+    moment = EPOCH + timedelta(minutes=minutes)
+    return moment.strftime("%Y-%m-%d"), moment.strftime("%H:%M")
+
+
+def mentor_key(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+class MentorCalendar:
+    """Active sessions of one mentor, kept sorted by start time.
+
+    Bookings are never allowed to overlap, so sorting by start also sorts by
+    end and an overlap check only has to look at the two neighbours of the
+    insertion point.
+    """
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.ids: List[str] = []
+
+    def find_conflict(self, start: int, end: int) -> Optional[str]:
+        index = bisect_right(self.starts, start)
+        if index > 0 and self.ends[index - 1] > start:
+            return self.ids[index - 1]
+        if index < len(self.starts) and self.starts[index] < end:
+            return self.ids[index]
+        return None
+
+    def add(self, start: int, end: int, session_id: str):
+        index = bisect_right(self.starts, start)
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+        self.ids.insert(index, session_id)
+
+    def remove(self, start: int, session_id: str):
+        index = bisect_left(self.starts, start)
+        while index < len(self.starts) and self.starts[index] == start:
+            if self.ids[index] == session_id:
+                del self.starts[index], self.ends[index], self.ids[index]
+                return
+            index += 1
+
+    def between(self, start: int, end: int) -> range:
+        """Positions of sessions starting in [start, end)"""
+        return range(bisect_left(self.starts, start), bisect_left(self.starts, end))
+
+
+class SessionStore:
+    """Mentor session bookings indexed by mentor and by start time.
+
+    Every booking and status change is appended to a JSON-lines log, so a
+    write costs O(1) I/O instead of rewriting the whole sessions file. The
+    indexes are rebuilt from the log at startup. When several worker
+    processes share the log, each one tails the bytes appended by the others
+    before answering, and bookings hold a cross-process lock while they check
+    for conflicts and append.
+    """
+
+    def __init__(self, log_file: str = SESSIONS_LOG, legacy_file: str = SESSIONS_FILE):
+        self.log_file = log_file
+        self.legacy_file = legacy_file
+        self._lock = threading.RLock()
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._calendars: Dict[str, MentorCalendar] = {}
+        # Global timeline of (start minute, session id) for date-range queries
+        self._timeline: List[Tuple[int, str]] = []
+        # Bytes of the log already applied to the in-memory indexes
+        self._offset = 0
+        self._load()
+
+    # --- Persistence ---
+    def _load(self):
+        directory = os.path.dirname(self.log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with file_lock(self.log_file):
+            if not os.path.exists(self.log_file):
+                self._import_legacy()
+            for event in self._read_new_events():
+                self._replay(event)
+        self._build_indexes()
+
+    def _read_new_events(self) -> List[Dict[str, Any]]:
+        """Parse complete lines appended since the last read"""
+        try:
+            if os.path.getsize(self.log_file) == self._offset:
+                return []
+        except FileNotFoundError:
+            return []
+        with open(self.log_file, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read()
+        # Only consume up to the last newline; a partial line is still being written
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        self._offset += len(complete)
+        events = []
+        for line in complete.splitlines():
+            if not line.strip():
+                continue
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A torn line left by a crash mid-append; the rest of the log is intact
+                continue
+        return events
+
+    def _sync(self):
+        """Apply bookings made by other processes since the last read"""
+        for event in self._read_new_events():
+            if event["op"] == "book" and event["session"]["id"] in self._sessions:
+                continue
+            self._apply(event)
+
+    def _replay(self, event: Dict[str, Any]):
+        if event["op"] == "book":
+            self._sessions[event["session"]["id"]] = event["session"]
+        elif event["op"] == "status" and event["id"] in self._sessions:
+            self._sessions[event["id"]]["status"] = event["status"]
+
+    def _build_indexes(self):
+        """Sort once after replaying the log instead of inserting one by one"""
+        self._timeline = sorted((s["start"], s["id"]) for s in self._sessions.values())
+        self._calendars = {}
+        for start, session_id in self._timeline:
+            session = self._sessions[session_id]
+            if session["status"] == ACTIVE_STATUS:
+                calendar = self._calendar(session["mentorName"])
+                calendar.starts.append(start)
+                calendar.ends.append(session["end"])
+                calendar.ids.append(session_id)
+
+    def _import_legacy(self):
+        """Carry over bookings from the old sessions.json list"""
+        events = []
+        if os.path.exists(self.legacy_file):
+            try:
+                with open(self.legacy_file, "r") as f:
+                    legacy = json.load(f).get("sessions", [])
+            except json.JSONDecodeError:
+                legacy = []
+            for session in legacy:
+                try:
+                    record = self._new_record(session["mentorName"], session["date"], session["time"],
+                                              session.get("duration", DEFAULT_DURATION),
+                                              session.get("status", ACTIVE_STATUS))
+                except (KeyError, ValueError):
+                    continue
+                events.append({"op": "book", "session": record})
+        # Written before the log is replayed, so the imported bookings load like any others
+        with open(self.log_file, "w") as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+
+    def _append(self, event: Dict[str, Any]):
+        # Callers hold the file lock and have synced, so anything past our offset is a
+        # partial line torn by a crash mid-append; cut it off so this event starts a fresh line
+        data = (json.dumps(event) + "\n").encode()
+        with open(self.log_file, "ab") as f:
+            if os.path.getsize(self.log_file) != self._offset:
+                f.truncate(self._offset)
+            f.write(data)
+        self._offset += len(data)
+
+    def _apply(self, event: Dict[str, Any]):
+        if event["op"] == "book":
+            session = event["session"]
+            self._sessions[session["id"]] = session
+            insort(self._timeline, (session["start"], session["id"]))
+            if session["status"] == ACTIVE_STATUS:
+                self._calendar(session["mentorName"]).add(session["start"], session["end"], session["id"])
+        elif event["op"] == "status":
+            session = self._sessions.get(event["id"])
+            if session is None:
+                return
+            calendar = self._calendar(session["mentorName"])
+            if session["status"] == ACTIVE_STATUS and event["status"] != ACTIVE_STATUS:
+                calendar.remove(session["start"], session["id"])
+            elif session["status"] != ACTIVE_STATUS and event["status"] == ACTIVE_STATUS:
+                calendar.add(session["start"], session["end"], session["id"])
+            session["status"] = event["status"]
+
+    # --- Helpers ---
+    def _calendar(self, mentor_name: str) -> MentorCalendar:
+        key = mentor_key(mentor_name)
+        calendar = self._calendars.get(key)
+        if calendar is None:
+            calendar = self._calendars[key] = MentorCalendar()
+        return calendar
+
+    @staticmethod
+    def _new_record(mentor_name: str, date: str, time: str, duration: int = DEFAULT_DURATION,
+                    status: str = ACTIVE_STATUS, booked_by: Optional[str] = None) -> Dict[str, Any]:
+        start = to_minutes(date, time)
+        return {
+            "id": uuid.uuid4().hex,
+            "mentorName": mentor_name.strip(),
+            "date": date,
+            "time": time,
+            "duration": int(duration),
+            "status": status,
+            "start": start,
+            "end": start + int(duration),
+            "created_at": datetime.now().isoformat(),
+            "bookedBy": booked_by,
+        }
+
+    @staticmethod
+    def public(session: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in session.items() if k not in ("start", "end", "bookedBy")}
+
+    # --- Public API ---
+    def book(self, mentor_name: str, date: str, time: str, duration: int = DEFAULT_DURATION,
+             booked_by: Optional[str] = None) -> Dict[str, Any]:
+        """Book a session, raising SchedulingConflict if the mentor is busy"""
+        record = self._new_record(mentor_name, date, time, duration, booked_by=booked_by)
+        with self._lock, file_lock(self.log_file):
+            self._sync()
+            conflict_id = self._calendar(mentor_name).find_conflict(record["start"], record["end"])
+            if conflict_id is not None:
+                raise SchedulingConflict(self.public(self._sessions[conflict_id]))
+            event = {"op": "book", "session": record}
+            self._append(event)
+            self._apply(event)
+        return self.public(record)
+
+    def set_status(self, session_id: str, status: str, booked_by: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Change a session's status; with booked_by, only if that user booked it (None otherwise)"""
+        with self._lock, file_lock(self.log_file):
+            self._sync()
+            session = self._sessions.get(session_id)
+            if session is None or (booked_by is not None and session.get("bookedBy") != booked_by):
+                return None
+            if session["status"] != status:
+                if status == ACTIVE_STATUS:
+                    conflict_id = self._calendar(session["mentorName"]).find_conflict(session["start"], session["end"])
+                    if conflict_id is not None:
+                        raise SchedulingConflict(self.public(self._sessions[conflict_id]))
+                event = {"op": "status", "id": session_id, "status": status}
+                self._append(event)
+                self._apply(event)
+            return self.public(session)
+
+    def cancel(self, session_id: str, booked_by: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        return self.set_status(session_id, "cancelled", booked_by)
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._sync()
+            session = self._sessions.get(session_id)
+        return self.public(session) if session else None
+
+    def list_sessions(self, mentor: Optional[str] = None, date_from: Optional[str] = None,
+                      date_to: Optional[str] = None, status: Optional[str] = None,
+                      offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """Filtered, paginated listing ordered by start time"""
+        low = to_minutes(date_from, "00:00") if date_from else None
+        high = to_minutes(date_to, "00:00") + 24 * 60 if date_to else None
+
+        with self._lock:
+            self._sync()
+            if mentor is not None and (status is None or status == ACTIVE_STATUS):
+                # Active sessions of one mentor come straight from the calendar index
+                calendar = self._calendars.get(mentor_key(mentor), MentorCalendar())
+                span = calendar.between(low if low is not None else -2**62, high if high is not None else 2**62)
+                ids = calendar.ids[span.start:span.stop]
+            else:
+                lo = 0 if low is None else bisect_left(self._timeline, (low, ""))
+                hi = len(self._timeline) if high is None else bisect_left(self._timeline, (high, ""))
+                ids = [session_id for _, session_id in self._timeline[lo:hi]]
+                if mentor is not None:
+                    key = mentor_key(mentor)
+                    ids = [i for i in ids if mentor_key(self._sessions[i]["mentorName"]) == key]
+            if status is not None:
+                ids = [i for i in ids if self._sessions[i]["status"] == status]
+            page = [self.public(self._sessions[i]) for i in ids[offset:offset + limit]]
+
+        return {"sessions": page, "total": len(ids), "offset": offset, "limit": limit}
+
+    def is_free(self, mentor: str, date: str, time: str, duration: int = DEFAULT_DURATION) -> bool:
+        """Whether the mentor has no active session overlapping the given slot"""
+        start = to_minutes(date, time)
+        with self._lock:
+            self._sync()
+            calendar = self._calendars.get(mentor_key(mentor))
+            return calendar is None or calendar.find_conflict(start, start + int(duration)) is None
+
+    def free_slots(self, mentor: str, date: str, duration: int = DEFAULT_DURATION,
+                   day_start: str = "09:00", day_end: str = "18:00", step: int = 30) -> List[str]:
+        """Start times on ``date`` where a session of ``duration`` minutes fits"""
+        open_at = to_minutes(date, day_start)
+        close_at = to_minutes(date, day_end)
+        slots = []
+        with self._lock:
+            self._sync()
+            calendar = self._calendars.get(mentor_key(mentor), MentorCalendar())
+            # Include a session that started earlier but runs into the day
+            index = max(bisect_right(calendar.starts, open_at) - 1, 0)
+            busy = list(zip(calendar.starts[index:], calendar.ends[index:]))
+
+        cursor = open_at
+        for start, end in busy:
+            if start >= close_at:
+                break
+            while cursor + duration <= min(start, close_at):
+                slots.append(from_minutes(cursor)[1])
+                cursor += step
+            if end > cursor:
+                # Re-align to the step grid after a busy block
+                cursor = open_at + -(-(end - open_at) // step) * step
+        while cursor + duration <= close_at:
+            slots.append(from_minutes(cursor)[1])
+            cursor += step
+        return slots
+
+    @property
+    def version(self) -> int:
+        """Changes whenever any worker books or updates a session (the applied log length)"""
+        with self._lock:
+            self._sync()
+            return self._offset
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._sync()
+            return len(self._sessions)
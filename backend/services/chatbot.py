@@ -1,5 +1,5 @@
 import requests
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 import json
 import os
@@ -7,13 +7,19 @@ import re
 from dotenv import load_dotenv
 import time
 
+from memory import estimate_tokens
+from structured_logging import get_logger, truncate
+
 load_dotenv()
+logger = get_logger("chatbot")
 
 class ChatbotService:
-    def __init__(self):
+    def __init__(self, usage_tracker=None):
+        # Optional usage.UsageTracker; every completion's token usage is recorded with it
+        self.usage_tracker = usage_tracker
         self.api_key = os.getenv("OPENROUTER_API_KEY")
         self.model = "nvidia/llama-3.3-nemotron-super-49b-v1:free"
-        self.base_url = "https://openrouter.ai/api/v1/chat/completions"
+        self.base_url = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
@@ -48,9 +54,25 @@ class ChatbotService:
                 "content": msg["content"]
             })
         return formatted_messages
-        
-    def generate_response(self, conversation_history: List[Dict[str, str]], user_input: str) -> Dict[str, Any]:
-        """Generate a response using the Llama 3.3 Nemotron Super model"""
+
+    def _record_usage(self, result: Dict[str, Any], messages: List[Dict[str, str]], content: str,
+                      user: Optional[str], route: str, bucket: Optional[str] = None) -> Dict[str, int]:
+        usage = result.get("usage") or {}
+        # Rough counts if the provider left the usage block out
+        prompt_tokens = usage.get("prompt_tokens") or sum(estimate_tokens(m["content"]) for m in messages)
+        completion_tokens = usage.get("completion_tokens") or estimate_tokens(content)
+        truncated = result["choices"][0].get("finish_reason") == "length"
+        if self.usage_tracker is not None:
+            self.usage_tracker.record(user, route, prompt_tokens, completion_tokens, bucket=bucket, truncated=truncated)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+
+    def generate_response(self, conversation_history: List[Dict[str, str]], user_input: str, max_tokens: int = 1000,
+                          user: Optional[str] = None, route: str = "chat", bucket: Optional[str] = None) -> Dict[str, Any]:
+        """Generate a response using the Llama 3.3 Nemotron Super model.
+
+        Token usage is recorded for user and route, and for bucket (the intent
+        and conversation stage that max_tokens was chosen for) if given.
+        """
         try:
             if not self.api_key:
                 raise Exception("OpenRouter API key not found. Please set OPENROUTER_API_KEY in your environment variables.")
@@ -89,7 +111,7 @@ class ChatbotService:
                 "model": self.model,
                 "messages": messages,
                 "temperature": 0.7,
-                "max_tokens": 1000,
+                "max_tokens": max_tokens,
                 "top_p": 0.9,
                 "frequency_penalty": 0.5,
                 "presence_penalty": 0.5
@@ -113,6 +135,7 @@ class ChatbotService:
                     if response.status_code == 200:
                         result = response.json()
                         assistant_response = result["choices"][0]["message"]["content"]
+                        usage = self._record_usage(result, messages, assistant_response, user, route, bucket)
                         
                         # Clean up the response
                         assistant_response = self._clean_response(assistant_response)
@@ -127,21 +150,24 @@ class ChatbotService:
                         return {
                             "response": assistant_response,
                             "conversation_history": conversation_history,
-                            "status": "success"
+                            "status": "success",
+                            "usage": dict(usage, max_tokens=max_tokens)
                         }
                     elif response.status_code == 429:  # Rate limit
+                        logger.warning("LLM rate limited", extra={"attempt": retry_count + 1})
                         retry_count += 1
                         if retry_count < max_retries:
                             time.sleep(2 ** retry_count)  # Exponential backoff
                             continue
                     else:
                         error_msg = f"API Error: {response.status_code} - {response.text}"
-                        print(f"Error in generate_response: {error_msg}")
+                        logger.warning("LLM API error", extra={"status": response.status_code,
+                                                               "body": truncate(response.text, 200)})
                         last_error = error_msg
                         break
                         
                 except requests.exceptions.RequestException as e:
-                    print(f"Request exception in generate_response: {str(e)}")
+                    logger.warning("LLM request failed", extra={"attempt": retry_count + 1, "error": str(e)})
                     retry_count += 1
                     if retry_count < max_retries:
                         time.sleep(2 ** retry_count)  # Exponential backoff
@@ -163,7 +189,7 @@ class ChatbotService:
             }
                 
         except Exception as e:
-            print(f"Exception in generate_response: {str(e)}")
+            logger.exception("generate_response failed")
             error_response = f"I apologize, but I encountered an issue: {str(e)}. Please try rephrasing your question or try again later."
             conversation_history.append({
                 "role": "assistant",
@@ -176,45 +202,51 @@ class ChatbotService:
                 "status": "error"
             }
             
+    def summarize(self, conversation_history: List[Dict[str, str]], timeout: float = 30,
+                  user: Optional[str] = None, route: str = "summary", max_tokens: int = 1000) -> str:
+        """Summarize the conversation; raises on API errors (used by background tasks)"""
+        messages = self._format_messages(conversation_history)
+        messages.append({
+            "role": "user",
+            "content": """Please provide a comprehensive summary of our conversation, including:
+            1. Key career-related topics discussed
+            2. Important decisions or insights shared
+            3. Action items or next steps identified
+            4. Any specific resources or recommendations mentioned
+            
+            Format the summary in a clear, organized manner that highlights the most important aspects of our discussion."""
+        })
+        
+        data = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.3,
+            "max_tokens": max_tokens,
+            "top_p": 0.9,
+            "frequency_penalty": 0.5,
+            "presence_penalty": 0.5
+        }
+        
+        response = requests.post(
+            self.base_url,
+            headers=self.headers,
+            json=data,
+            timeout=timeout
+        )
+        
+        if response.status_code == 200:
+            result = response.json()
+            summary = result["choices"][0]["message"]["content"]
+            self._record_usage(result, messages, summary, user, route)
+            return summary
+        error_msg = f"API Error: {response.status_code} - {truncate(response.text, 200)}"
+        logger.warning("LLM API error", extra={"status": response.status_code, "operation": "summarize"})
+        raise Exception(error_msg)
+
     def get_conversation_summary(self, conversation_history: List[Dict[str, str]]) -> str:
         """Generate a summary of the conversation using the Llama 3.3 Nemotron Super model"""
         try:
-            messages = self._format_messages(conversation_history)
-            messages.append({
-                "role": "user",
-                "content": """Please provide a comprehensive summary of our conversation, including:
-                1. Key career-related topics discussed
-                2. Important decisions or insights shared
-                3. Action items or next steps identified
-                4. Any specific resources or recommendations mentioned
-                
-                Format the summary in a clear, organized manner that highlights the most important aspects of our discussion."""
-            })
-            
-            data = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": 0.3,
-                "max_tokens": 1000,
-                "top_p": 0.9,
-                "frequency_penalty": 0.5,
-                "presence_penalty": 0.5
-            }
-            
-            response = requests.post(
-                self.base_url,
-                headers=self.headers,
-                json=data,
-                timeout=30  # Add timeout
-            )
-            
-            if response.status_code == 200:
-                return response.json()["choices"][0]["message"]["content"]
-            else:
-                error_msg = f"API Error: {response.status_code} - {response.text}"
-                print(f"Error in get_conversation_summary: {error_msg}")  # Debug log
-                raise Exception(error_msg)
-                
+            return self.summarize(conversation_history)
         except Exception as e:
-            print(f"Exception in get_conversation_summary: {str(e)}")  # Debug log
+            logger.exception("get_conversation_summary failed")
             return "I apologize, but I'm experiencing technical difficulties while trying to generate the summary." 
\ No newline at end of file
@@ -0,0 +1,157 @@
+from typing import List, Dict, Any, Optional
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from data_storage import file_signature
+from embeddings import get_embedding_service
+from structured_logging import get_logger
+
+logger = get_logger("faq")
+
+# Curated content that ships with the code, so it is resolved relative to the backend
+# rather than the working directory that runtime data lives in
+FAQ_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "faq.json")
+
+
+def normalize_question(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9']+", text.lower()))
+
+
+class _Snapshot:
+    """Immutable view of one build of the index; swapped atomically on reload"""
+
+    def __init__(self, entries: List[Dict[str, Any]], matrix: np.ndarray, owners: np.ndarray,
+                 exact: Dict[str, int], signature):
+        self.entries = entries
+        self.matrix = matrix
+        self.owners = owners
+        self.exact = exact
+        self.signature = signature
+
+
+class FAQIndex:
+    """Canned answers for known questions, matched by embedding similarity.
+
+    Every question and paraphrase in the data file is embedded once when the
+    index is built; the vectors are also cached next to the data file so a
+    restart only re-embeds when the content or the embedding model changed.
+    A lookup is one matrix-vector product. The index reloads itself when the
+    data file changes (checked at most once per ``check_interval`` seconds)
+    or when reload() is called.
+    """
+
+    def __init__(self, data_file: str = FAQ_FILE, embedding_service=None, threshold: Optional[float] = None,
+                 check_interval: float = 2.0):
+        self.data_file = data_file
+        self.cache_file = os.path.splitext(data_file)[0] + ".embeddings.npz"
+        self.embedding_service = embedding_service or get_embedding_service()
+        env_threshold = os.getenv("FAQ_MATCH_THRESHOLD")
+        if threshold is not None:
+            self.threshold = threshold
+        elif env_threshold:
+            self.threshold = float(env_threshold)
+        else:
+            self.threshold = self.embedding_service.match_threshold
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._snapshot = self._build()
+
+    def _load_entries(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.data_file):
+            return []
+        with open(self.data_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return [e for e in data.get("faqs", []) if e.get("question") and e.get("answer")]
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, reusing the on-disk cache when it was built from the same inputs"""
+        model_name = getattr(self.embedding_service, "model_name", type(self.embedding_service).__name__)
+        digest = hashlib.sha1("\n".join([model_name] + texts).encode("utf-8")).hexdigest()
+        if os.path.exists(self.cache_file):
+            try:
+                cached = np.load(self.cache_file)
+                if str(cached["digest"]) == digest:
+                    return cached["matrix"]
+            except (OSError, KeyError, ValueError):
+                pass
+
+        matrix = np.asarray(self.embedding_service.get_embeddings(texts), dtype=np.float32)
+        if len(matrix):
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.where(norms == 0, 1, norms)
+        tmp_path = self.cache_file + ".tmp.npz"
+        try:
+            np.savez(tmp_path, matrix=matrix, digest=np.array(digest))
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            logger.warning("could not cache FAQ embeddings", extra={"error": str(e)})
+        return matrix
+
+    def _build(self) -> _Snapshot:
+        signature = file_signature(self.data_file)
+        entries = self._load_entries()
+        texts, owners, exact = [], [], {}
+        for index, entry in enumerate(entries):
+            for text in [entry["question"]] + list(entry.get("paraphrases", [])):
+                texts.append(text)
+                owners.append(index)
+                exact.setdefault(normalize_question(text), index)
+        matrix = self._embed(texts) if texts else np.zeros((0, 1), dtype=np.float32)
+        return _Snapshot(entries, matrix, np.asarray(owners, dtype=np.int32), exact, signature)
+
+    def reload(self) -> int:
+        """Rebuild from the data file; returns the number of FAQ entries"""
+        snapshot = self._build()
+        with self._lock:
+            self._snapshot = snapshot
+            self._last_check = time.monotonic()
+        return len(snapshot.entries)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        if file_signature(self.data_file) != self._snapshot.signature:
+            self.reload()
+
+    def match(self, query: str) -> Optional[Dict[str, Any]]:
+        """Best FAQ entry for the query, or None if nothing is similar enough"""
+        self._maybe_reload()
+        snapshot = self._snapshot
+        if not snapshot.entries or not query or not query.strip():
+            return None
+
+        index = snapshot.exact.get(normalize_question(query))
+        score = 1.0
+        if index is None:
+            vector = np.asarray(self.embedding_service.get_embedding(query), dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm == 0:
+                return None
+            scores = snapshot.matrix @ (vector / norm)
+            best = int(np.argmax(scores))
+            score = float(scores[best])
+            if score < self.threshold:
+                return None
+            index = int(snapshot.owners[best])
+
+        entry = snapshot.entries[index]
+        return {
+            "id": entry.get("id", str(index)),
+            "question": entry["question"],
+            "answer": entry["answer"],
+            "source": entry.get("source", "faq"),
+            "reference": entry.get("reference"),
+            "score": round(score, 4),
+        }
+
+    def __len__(self) -> int:
+        return len(self._snapshot.entries)
@@ -0,0 +1,303 @@
+"""Answer structured chat requests with local tools instead of the LLM.
+
+Messages are classified by nearest centroid: each intent is the mean
+embedding of a handful of example utterances, and a message belongs to the
+closest one if it is close enough and clearly closer than the runner-up.
+Open-ended career questions are an intent of their own, so "closest to chat"
+is as much a decision as "closest to jobs". A routed message is only
+answered locally when slot extraction also finds what the tool needs;
+anything else goes to the LLM as before. Bookings are only proposed: the
+reply carries the free slot in ``source["proposal"]`` and nothing is booked
+until the client confirms it with POST /api/schedule-session.
+"""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import re
+
+import numpy as np
+
+from embeddings import get_embedding_service
+from scheduling import DEFAULT_DURATION, MAX_DURATION, MIN_DURATION
+
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    "job_search": [
+        "find data analyst jobs in Bangalore",
+        "show me software engineer jobs",
+        "search for product manager openings in Mumbai",
+        "are there any remote marketing jobs",
+        "looking for part time HR jobs near Pune",
+        "job openings for UX designers in Delhi",
+        "any vacancies for business analysts",
+        "list java developer positions in Hyderabad",
+        "who is hiring content writers",
+        "get me entry level jobs in Chennai",
+    ],
+    "schedule_session": [
+        "book a session with my mentor",
+        "schedule a mentoring session with Priya tomorrow at 3pm",
+        "book a call with mentor Anita on Friday at 10:00",
+        "set up a meeting with my mentor next Monday",
+        "can I book a slot with Rahul on 2026-11-03 at 15:30",
+        "I want to schedule a mentorship session",
+        "reserve a 30 minute session with Meera",
+        "arrange a mentor appointment for tomorrow morning",
+        "when is mentor Kavya available on Thursday",
+    ],
+    "chat": [
+        "how do I explain a career gap in interviews",
+        "should I switch from teaching to data science",
+        "I feel stuck in my career, what should I do",
+        "how can I grow into a leadership role",
+        "what skills do I need to become a product manager",
+        "help me plan my return to work after maternity leave",
+        "is it a good idea to do an MBA now",
+        "how do I ask my manager for a promotion",
+        "give me advice on building confidence at work",
+        "what career suits someone who likes working with people",
+        "can you review my career goals",
+        "tell me about jobs in the renewable energy sector",
+    ],
+}
+
+CITIES = ("bangalore", "bengaluru", "mumbai", "delhi", "new delhi", "pune", "hyderabad", "chennai",
+          "kolkata", "noida", "gurgaon", "gurugram", "ahmedabad", "jaipur", "kochi", "remote")
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+
+_JOB_QUERY_RE = re.compile(
+    r"(?:find|search(?: for)?|show(?: me)?|list|get(?: me)?|looking for|any|are there(?: any)?|openings? for|"
+    r"vacanc(?:y|ies) for|jobs? for|hiring)\s+(?:some |any |me |all |the )*(?P<query>[a-z0-9+#./ -]+?)\s*"
+    r"(?:jobs?|roles?|positions?|openings?|vacanc(?:y|ies)|opportunit(?:y|ies))?(?:\s+(?:in|at|near|around)\s|$)")
+_LOCATION_RE = re.compile(r"\b(?:in|at|near|around)\s+(?P<location>[a-z][a-z ]{1,30}?)(?:[?.!,]|$)")
+_MENTOR_RE = re.compile(r"\bwith\s+(?:my\s+|the\s+)?(?:mentor\s+)?(?P<name>[A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)?)")
+_MENTOR_ALT_RE = re.compile(r"\bmentor\s+(?P<name>[A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)?)")
+_ISO_DATE_RE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+_DAY_MONTH_RE = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(" + "|".join(MONTHS) + r")[a-z]*\b")
+_MONTH_DAY_RE = re.compile(r"\b(" + "|".join(MONTHS) + r")[a-z]*\s+(\d{1,2})(?:st|nd|rd|th)?\b")
+_TIME_RE = re.compile(r"\b(?:at\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b|\b(\d{1,2}):(\d{2})\b")
+_DURATION_RE = re.compile(r"\b(\d{1,3})\s*(?:min|mins|minutes)\b|\b(an?|one|\d)\s*(?:hour|hr)s?\b")
+
+# Words that follow "with" but are not a mentor's name
+_NOT_NAMES = {"My", "The", "A", "An", "Mentor", "Someone", "Anyone", "You"}
+
+
+def extract_job_slots(text: str) -> Dict[str, str]:
+    # Drop sentence punctuation but keep the dots and symbols in "node.js" or "c++"
+    lowered = " ".join(re.sub(r"[?!,;]|\.(?=\s|$)", " ", text.lower()).split())
+    slots: Dict[str, str] = {}
+    location = next((city for city in CITIES if re.search(rf"\b{city}\b", lowered)), None)
+    if location is None:
+        match = _LOCATION_RE.search(lowered)
+        if match:
+            location = match.group("location").strip()
+    if location:
+        slots["location"] = location
+        lowered = re.sub(rf"\s*\b(?:in|at|near|around)?\s*{re.escape(location)}\b", " ", lowered).strip()
+
+    match = _JOB_QUERY_RE.search(lowered)
+    if match:
+        query = re.sub(r"\b(?:jobs?|roles?|positions?|openings?|remote|new|latest)\b", " ", match.group("query"))
+        query = re.sub(r"^(?:for|of)\s+", "", " ".join(query.split()))
+        if query:
+            slots["query"] = query
+    return slots
+
+
+def _next_weekday(today: date, weekday: int) -> date:
+    """The coming occurrence of weekday ("Friday" and "next Friday" both mean this)"""
+    return today + timedelta(days=(weekday - today.weekday()) % 7 or 7)
+
+
+def extract_schedule_slots(text: str, today: Optional[date] = None) -> Dict[str, Any]:
+    today = today or date.today()
+    lowered = text.lower()
+    slots: Dict[str, Any] = {}
+
+    for regex in (_MENTOR_RE, _MENTOR_ALT_RE):
+        match = regex.search(text)
+        if match:
+            words = [w for w in match.group("name").split() if w not in _NOT_NAMES]
+            if words and words[0].lower() not in WEEKDAYS + ("tomorrow", "today", "next"):
+                slots["mentor"] = " ".join(words)
+                break
+
+    match = _ISO_DATE_RE.search(lowered)
+    if match:
+        slots["date"] = match.group(1)
+    elif "day after tomorrow" in lowered:
+        slots["date"] = (today + timedelta(days=2)).isoformat()
+    elif "tomorrow" in lowered:
+        slots["date"] = (today + timedelta(days=1)).isoformat()
+    elif "today" in lowered:
+        slots["date"] = today.isoformat()
+    else:
+        for index, name in enumerate(WEEKDAYS):
+            if re.search(rf"\b{name}\b", lowered):
+                slots["date"] = _next_weekday(today, index).isoformat()
+                break
+        else:
+            match = _DAY_MONTH_RE.search(lowered)
+            day_month = (int(match.group(1)), MONTHS.index(match.group(2)[:3]) + 1) if match else None
+            if day_month is None:
+                match = _MONTH_DAY_RE.search(lowered)
+                if match:
+                    day_month = (int(match.group(2)), MONTHS.index(match.group(1)[:3]) + 1)
+            if day_month:
+                try:
+                    candidate = date(today.year, day_month[1], day_month[0])
+                    if candidate < today:
+                        candidate = date(today.year + 1, day_month[1], day_month[0])
+                    slots["date"] = candidate.isoformat()
+                except ValueError:
+                    pass
+
+    match = _TIME_RE.search(lowered)
+    if match:
+        if match.group(3):
+            hour, minute = int(match.group(1)) % 12, int(match.group(2) or 0)
+            if match.group(3) == "pm":
+                hour += 12
+        else:
+            hour, minute = int(match.group(4)), int(match.group(5))
+        if 0 <= hour < 24 and 0 <= minute < 60:
+            slots["time"] = f"{hour:02d}:{minute:02d}"
+
+    match = _DURATION_RE.search(lowered)
+    if match:
+        if match.group(1):
+            slots["duration"] = int(match.group(1))
+        else:
+            count = match.group(2)
+            slots["duration"] = 60 * (int(count) if count.isdigit() else 1)
+    return slots
+
+
+def _salary_text(job) -> str:
+    """", INR 600,000 to 800,000" with whichever bounds the listing has, or nothing"""
+    currency = f"{job.salary_currency} " if job.salary_currency else ""
+    if job.salary_min and job.salary_max:
+        return f", {currency}{job.salary_min:,.0f} to {job.salary_max:,.0f}"
+    if job.salary_min:
+        return f", from {currency}{job.salary_min:,.0f}"
+    if job.salary_max:
+        return f", up to {currency}{job.salary_max:,.0f}"
+    return ""
+
+
+class IntentRouter:
+    def __init__(self, job_scraper=None, session_store=None, faq_index=None, embedding_service=None,
+                 threshold: float = None, margin: float = None):
+        self.job_scraper = job_scraper
+        self.session_store = session_store
+        self.faq_index = faq_index
+        self.embedding_service = embedding_service or get_embedding_service()
+        default_threshold, default_margin = getattr(self.embedding_service, "intent_thresholds", (0.5, 0.05))
+        self.threshold = threshold if threshold is not None else float(
+            os.getenv("INTENT_ROUTER_THRESHOLD", default_threshold))
+        self.margin = margin if margin is not None else default_margin
+        self.intents = list(INTENT_EXAMPLES)
+        centroids = []
+        for intent in self.intents:
+            vectors = np.asarray(self.embedding_service.get_embeddings(INTENT_EXAMPLES[intent]), dtype=np.float32)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+            centroid = vectors.mean(axis=0)
+            centroids.append(centroid / max(np.linalg.norm(centroid), 1e-9))
+        self.centroids = np.vstack(centroids)
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """Closest intent and its similarity; "chat" unless the winner is confident"""
+        vector = np.asarray(self.embedding_service.get_embedding(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return "chat", 0.0
+        scores = self.centroids @ (vector / norm)
+        order = np.argsort(scores)[::-1]
+        best, runner_up = float(scores[order[0]]), float(scores[order[1]])
+        if best < self.threshold or best - runner_up < self.margin:
+            return "chat", best
+        return self.intents[order[0]], best
+
+    def route(self, text: str) -> Optional[Dict[str, Any]]:
+        """A reply from a local tool ({"response", "source"}), or None to use the LLM"""
+        return self.route_with_intent(text)[0]
+
+    def route_with_intent(self, text: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """route() plus the intent the message was classified as ("faq" for FAQ answers)"""
+        if not text or not text.strip():
+            return None, "chat"
+        if self.faq_index is not None:
+            faq = self.faq_index.match(text)
+            if faq:
+                return {"response": faq["answer"], "source": {"type": "faq", **faq}}, "faq"
+
+        intent, score = self.classify(text)
+        if intent == "job_search" and self.job_scraper is not None:
+            slots = extract_job_slots(text)
+            if slots.get("query") or slots.get("location"):
+                return self._jobs_reply(slots, score), intent
+        elif intent == "schedule_session" and self.session_store is not None:
+            return self._schedule_reply(extract_schedule_slots(text), score), intent
+        return None, intent
+
+    def _source(self, intent: str, score: float, slots: Dict[str, Any], **extra) -> Dict[str, Any]:
+        return {"type": "tool", "intent": intent, "score": round(score, 4), "slots": slots, **extra}
+
+    def _jobs_reply(self, slots: Dict[str, str], score: float) -> Dict[str, Any]:
+        records, _ = self.job_scraper.search_jobs_versioned(slots.get("query"), slots.get("location"))
+        what = slots.get("query", "matching")
+        where = f" in {slots['location'].title()}" if slots.get("location") else ""
+        if not records:
+            response = (f"I couldn't find any {what} jobs{where} right now. "
+                        "Try a broader title or a nearby city, or ask me how to approach the search.")
+        else:
+            lines = [f"Here are the top {min(5, len(records))} {what} jobs{where} I found:"]
+            for index, job in enumerate(records[:5], 1):
+                lines.append(f"{index}. {job.title} at {job.company} ({job.location}{_salary_text(job)}) "
+                             f"{job.redirect_url}")
+            lines.append("Would you like tips on tailoring your resume for any of these roles?")
+            response = "\n".join(lines)
+        return {"response": response,
+                "source": self._source("job_search", score, slots, job_ids=[job.id for job in records[:5]])}
+
+    def _schedule_reply(self, slots: Dict[str, Any], score: float) -> Dict[str, Any]:
+        missing = [name for name in ("mentor", "date", "time") if name not in slots]
+        if "mentor" not in slots or "date" not in slots:
+            response = ("I can book that for you. Which mentor would you like to meet, and on what date and time? "
+                        "For example: book a session with Priya on 2026-11-03 at 15:00.")
+            return {"response": response, "source": self._source("schedule_session", score, slots, missing=missing)}
+
+        duration = slots.get("duration", DEFAULT_DURATION)
+        # The same range POST /api/schedule-session accepts, so a proposal can always be booked
+        if not MIN_DURATION <= duration <= MAX_DURATION:
+            response = (f"Sessions can last from {MIN_DURATION} minutes to {MAX_DURATION // 60} hours. "
+                        "How long would you like it to be?")
+            return {"response": response, "source": self._source("schedule_session", score, slots, missing=["duration"])}
+        try:
+            start = datetime.strptime(f"{slots['date']} {slots.get('time', '23:59')}", "%Y-%m-%d %H:%M")
+        except ValueError:
+            return None
+        if start < datetime.now():
+            when = f"{slots['date']} at {slots['time']}" if "time" in slots else slots["date"]
+            response = f"{when} has already passed. Which upcoming date and time would suit you?"
+            return {"response": response, "source": self._source("schedule_session", score, slots, past=True)}
+
+        if "time" not in slots:
+            free = self.session_store.free_slots(slots["mentor"], slots["date"], duration)
+            times = ", ".join(free[:8]) if free else "no free slots"
+            response = f"{slots['mentor']} has {times} on {slots['date']}. Which time works for you?"
+            return {"response": response,
+                    "source": self._source("schedule_session", score, slots, missing=missing, free_slots=free)}
+
+        if not self.session_store.is_free(slots["mentor"], slots["date"], slots["time"], duration):
+            free = self.session_store.free_slots(slots["mentor"], slots["date"], duration)
+            alternatives = ", ".join(free[:5]) if free else "no other free slots that day"
+            response = (f"{slots['mentor']} is already booked at {slots['time']} on {slots['date']}. "
+                        f"Free times that day: {alternatives}.")
+            return {"response": response,
+                    "source": self._source("schedule_session", score, slots, conflict=True, free_slots=free)}
+        # Free text is not consent: the client books this with POST /api/schedule-session once the user confirms
+        proposal = {"mentorName": slots["mentor"], "date": slots["date"], "time": slots["time"], "duration": duration}
+        response = (f"{slots['mentor']} is free for a {duration} minute session on {slots['date']} at "
+                    f"{slots['time']}. Shall I book it?")
+        return {"response": response, "source": self._source("schedule_session", score, slots, proposal=proposal)}
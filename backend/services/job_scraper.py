@@ -1,56 +1,396 @@
-import requests
-from typing import List, Dict, Any
-from datetime import datetime
-
-class JobScraper:
-    def __init__(self):
-        self.base_url = "https://api.adzuna.com/v1/api/jobs"
-        self.app_id = "1e9046a1"  # Replace with your actual app ID
-        self.app_key = "d43f8b1c7c5e8a9b0f1d2e3c4b5a6d7e"  # Replace with your actual app key
-        
-    def search_jobs(self, query: str = None, location: str = None) -> List[Dict[str, Any]]:
-        """Search for jobs using the Adzuna API"""
-        try:
-            params = {
-                "app_id": self.app_id,
-                "app_key": self.app_key,
-                "results_per_page": 50,
-                "content-type": "application/json"
-            }
-            
-            if query:
-                params["what"] = query
-            if location:
-                params["where"] = location
-                
-            response = requests.get(self.base_url, params=params)
-            
-            if response.status_code == 200:
-                data = response.json()
-                jobs = data.get("results", [])
-                
-                # Format the jobs data
-                formatted_jobs = []
-                for job in jobs:
-                    formatted_job = {
-                        "title": job.get("title", ""),
-                        "company": job.get("company", {}).get("display_name", ""),
-                        "location": job.get("location", {}).get("display_name", ""),
-                        "description": job.get("description", ""),
-                        "salary_min": job.get("salary_min", 0),
-                        "salary_max": job.get("salary_max", 0),
-                        "salary_currency": job.get("salary_currency", ""),
-                        "created": job.get("created", ""),
-                        "redirect_url": job.get("redirect_url", ""),
-                        "contract_type": job.get("contract_type", ""),
-                        "category": job.get("category", {}).get("label", "")
-                    }
-                    formatted_jobs.append(formatted_job)
-                    
-                return formatted_jobs
-            else:
-                return []
-                
-        except Exception as e:
-            print(f"Error searching jobs: {str(e)}")
-            return [] 
\ No newline at end of file
+import requests
+from abc import ABC, abstractmethod
+from typing import Iterable, List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from data_storage import atomic_write_json
+from structured_logging import get_logger, stage
+
+logger = get_logger("jobs")
+
+JOB_FIELDS = ("id", "title", "company", "location", "description", "salary_min", "salary_max",
+              "salary_currency", "created", "redirect_url", "contract_type", "category", "source")
+# The compact list view, fields=list
+LIST_FIELDS = ("id", "title", "company", "location", "salary_min", "salary_max", "created")
+DESCRIPTION_PREVIEW_CHARS = 160
+# One file per job seen in a search, so the detail endpoint works on every worker
+JOB_RECORDS_DIR = os.path.join("data", "job_records")
+
+def preview(text: str, limit: int = DESCRIPTION_PREVIEW_CHARS) -> str:
+    """Cut text at a word boundary so it fits in limit characters"""
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(" ", 0, limit - 1)
+    return text[:cut if cut > 0 else limit - 1].rstrip(" ,.;:") + "…"
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """Validate a comma-separated fields= parameter ("list" for the list view); raises ValueError on unknown names"""
+    if not fields or fields.strip() == "list":
+        return LIST_FIELDS
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in JOB_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown job fields: {', '.join(unknown)}")
+    return names or LIST_FIELDS
+
+class JobRecord:
+    """One job posting; slotted so a cached page of results stays small"""
+    __slots__ = JOB_FIELDS + ("description_preview",)
+
+    def __init__(self, id, title, company, location, description, salary_min, salary_max,
+                 salary_currency, created, redirect_url, contract_type, category, source="adzuna"):
+        self.id = id
+        self.title = title
+        self.company = company
+        self.location = location
+        self.description = description
+        self.salary_min = salary_min
+        self.salary_max = salary_max
+        self.salary_currency = salary_currency
+        self.created = created
+        self.redirect_url = redirect_url
+        self.contract_type = contract_type
+        self.category = category
+        self.source = source
+        self.description_preview = preview(description)
+
+    @classmethod
+    def from_adzuna(cls, job: Dict[str, Any]) -> "JobRecord":
+        redirect_url = job.get("redirect_url", "")
+        job_id = str(job.get("id") or hashlib.sha1(redirect_url.encode("utf-8")).hexdigest()[:16])
+        return cls(
+            job_id,
+            job.get("title", ""),
+            (job.get("company") or {}).get("display_name", ""),
+            (job.get("location") or {}).get("display_name", ""),
+            job.get("description", ""),
+            job.get("salary_min", 0),
+            job.get("salary_max", 0),
+            job.get("salary_currency", ""),
+            job.get("created", ""),
+            redirect_url,
+            job.get("contract_type", ""),
+            (job.get("category") or {}).get("label", ""),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """All fields, with the full description"""
+        return {field: getattr(self, field) for field in JOB_FIELDS}
+
+def project_jobs(records: Iterable[JobRecord], fields: Tuple[str, ...] = LIST_FIELDS) -> List[Dict[str, Any]]:
+    """List-view dicts with only the requested fields; descriptions are shortened"""
+    attributes = [(field, "description_preview" if field == "description" else field) for field in fields]
+    return [{field: getattr(record, attribute) for field, attribute in attributes} for record in records]
+
+def project_rows(records: Iterable[JobRecord], fields: Tuple[str, ...] = LIST_FIELDS) -> Dict[str, Any]:
+    """Same as project_jobs, but keys are sent once and each job is a list of values"""
+    attributes = ["description_preview" if field == "description" else field for field in fields]
+    return {"fields": list(fields), "rows": [[getattr(record, a) for a in attributes] for record in records]}
+
+def _lookup(item: Any, path: str) -> Any:
+    """Value at a dotted path such as "company.display_name", or None"""
+    for part in path.split("."):
+        if not isinstance(item, dict):
+            return None
+        item = item.get(part)
+    return item
+
+def _normalize(text: Optional[str]) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", (text or "").lower()))
+
+def dedup_key(record: JobRecord) -> str:
+    """The same posting syndicated to several boards shares title, company and location"""
+    key = "\x1f".join(_normalize(value) for value in (record.title, record.company, record.location))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def merge_jobs(result_lists: List[List[JobRecord]], query: Optional[str] = None) -> List[JobRecord]:
+    """De-duplicate jobs from several providers (earlier lists win) and rank them.
+
+    Jobs whose titles contain more of the query's words come first; ties keep
+    each provider's own relevance order, interleaving the providers.
+    """
+    seen: Dict[str, Tuple[int, JobRecord]] = {}
+    for records in result_lists:
+        for position, record in enumerate(records):
+            seen.setdefault(dedup_key(record), (position, record))
+    terms = set(_normalize(query).split())
+
+    def rank(item: Tuple[int, JobRecord]):
+        position, record = item
+        return -len(terms.intersection(_normalize(record.title).split())), position
+    return [record for _, record in sorted(seen.values(), key=rank)]
+
+class ProviderError(Exception):
+    """A job provider answered, but not with usable results"""
+
+class JobProvider(ABC):
+    """One upstream job board; search() returns its jobs and a version of the raw response"""
+    name = "provider"
+
+    def __init__(self, timeout: float = 5.0):
+        self.timeout = timeout
+
+    @abstractmethod
+    def search(self, query: str = None, location: str = None) -> Tuple[List[JobRecord], str]:
+        """Jobs matching the query and a version that changes when the upstream results do"""
+
+class AdzunaProvider(JobProvider):
+    name = "adzuna"
+
+    def __init__(self, timeout: float = None):
+        super().__init__(timeout if timeout is not None else float(os.getenv("ADZUNA_TIMEOUT", "5")))
+        self.base_url = os.getenv("ADZUNA_API_URL", "https://api.adzuna.com/v1/api/jobs")
+        self.app_id = "1e9046a1"  # Replace with your actual app ID
+        self.app_key = "d43f8b1c7c5e8a9b0f1d2e3c4b5a6d7e"  # Replace with your actual app key
+
+    def search(self, query: str = None, location: str = None) -> Tuple[List[JobRecord], str]:
+        params = {
+            "app_id": self.app_id,
+            "app_key": self.app_key,
+            "results_per_page": 50,
+            "content-type": "application/json"
+        }
+        if query:
+            params["what"] = query
+        if location:
+            params["where"] = location
+
+        response = requests.get(self.base_url, params=params, timeout=self.timeout)
+        if response.status_code != 200:
+            raise ProviderError(f"HTTP {response.status_code}")
+        jobs = [JobRecord.from_adzuna(job) for job in response.json().get("results", [])]
+        return jobs, hashlib.sha1(response.content).hexdigest()
+
+class JSONProvider(JobProvider):
+    """Any job board with a JSON search endpoint, described by where its fields live.
+
+    ``fields`` maps JobRecord fields to dotted paths in each result, e.g.
+    {"company": "company_name", "location": "candidate_required_location"};
+    fields left out are read from a key of the same name.
+    """
+
+    def __init__(self, name: str, url: str, results: str = "results", fields: Dict[str, str] = None,
+                 query_param: str = "q", location_param: Optional[str] = None,
+                 params: Dict[str, Any] = None, timeout: float = 5.0):
+        super().__init__(timeout)
+        self.name = name
+        self.url = url
+        self.results = results
+        self.fields = fields or {}
+        self.query_param = query_param
+        self.location_param = location_param
+        self.params = params or {}
+
+    def _record(self, item: Dict[str, Any]) -> JobRecord:
+        values = {field: _lookup(item, self.fields.get(field, field)) for field in JOB_FIELDS if field != "source"}
+        redirect_url = values["redirect_url"] or ""
+        raw_id = values["id"] or hashlib.sha1(redirect_url.encode("utf-8")).hexdigest()[:16]
+        text = {field: str(values[field] or "") for field in values if field not in ("salary_min", "salary_max")}
+        return JobRecord(
+            f"{self.name}-{raw_id}", text["title"], text["company"], text["location"], text["description"],
+            values["salary_min"] or 0, values["salary_max"] or 0, text["salary_currency"], text["created"],
+            redirect_url, text["contract_type"], text["category"], source=self.name,
+        )
+
+    def search(self, query: str = None, location: str = None) -> Tuple[List[JobRecord], str]:
+        params = dict(self.params)
+        if query:
+            params[self.query_param] = query
+        if location and self.location_param:
+            params[self.location_param] = location
+        response = requests.get(self.url, params=params, timeout=self.timeout)
+        if response.status_code != 200:
+            raise ProviderError(f"HTTP {response.status_code}")
+        items = _lookup(response.json(), self.results) if self.results else response.json()
+        if not isinstance(items, list):
+            raise ProviderError(f"no result list at {self.results!r}")
+        return [self._record(item) for item in items if isinstance(item, dict)], \
+            hashlib.sha1(response.content).hexdigest()
+
+def load_providers(config: Optional[str] = None) -> List[JobProvider]:
+    """Adzuna plus the JSON providers in JOB_PROVIDERS, a JSON list of JSONProvider settings.
+
+    A malformed setting is logged and skipped rather than stopping the app from starting.
+    """
+    config = config if config is not None else os.getenv("JOB_PROVIDERS", "")
+    providers: List[JobProvider] = []
+    if os.getenv("ADZUNA_ENABLED", "1") != "0":
+        providers.append(AdzunaProvider())
+    try:
+        entries = json.loads(config) if config.strip() else []
+    except ValueError as e:
+        logger.error("JOB_PROVIDERS is not valid JSON; using no extra providers", extra={"error": str(e)})
+        return providers
+    if not isinstance(entries, list):
+        logger.error("JOB_PROVIDERS must be a JSON list; using no extra providers")
+        return providers
+    for index, settings in enumerate(entries):
+        try:
+            if not isinstance(settings, dict):
+                raise TypeError("expected an object")
+            providers.append(JSONProvider(**settings))
+        except TypeError as e:
+            logger.error("skipping invalid JOB_PROVIDERS entry", extra={"index": index, "error": str(e)})
+    return providers
+
+class JobScraper:
+    """Job search fanned out to every provider at once.
+
+    Each provider call is bounded by its own timeout and the whole search by
+    ``deadline`` seconds; whatever has arrived by then is merged, de-duplicated
+    and ranked, and the providers that did not answer are reported as missing.
+    A call that misses the deadline cannot be interrupted, so provider timeouts
+    are capped at the deadline and every provider has its own threads: one
+    that hangs only delays later searches of that provider.
+    """
+
+    def __init__(self, cache_ttl: float = None, cache_size: int = 256, detail_cache_size: int = 5000,
+                 providers: List[JobProvider] = None, deadline: float = None, records_dir: str = JOB_RECORDS_DIR):
+        self.providers = providers if providers is not None else load_providers()
+        self.deadline = deadline if deadline is not None else float(os.getenv("JOBS_SEARCH_DEADLINE", "4"))
+        for provider in self.providers:
+            provider.timeout = min(provider.timeout, self.deadline)
+        # Calls that overrun the deadline keep their thread until their own timeout,
+        # so leave room for a few searches in flight at once
+        self._pools = [ThreadPoolExecutor(max_workers=4, thread_name_prefix=f"job-search-{provider.name}")
+                       for provider in self.providers]
+        # Successful searches are reused for cache_ttl seconds so polling clients
+        # can be answered (or sent a 304) without another upstream call
+        self.cache_ttl = cache_ttl if cache_ttl is not None else float(os.getenv("JOBS_CACHE_TTL", "300"))
+        # A search some provider missed is only reused briefly, so the gap closes soon
+        self.partial_cache_ttl = min(self.cache_ttl, 30.0)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[float, float, List[JobRecord], str, List[str]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Every job seen in a recent search, by ID, for the detail endpoint
+        self.detail_cache_size = detail_cache_size
+        self._records: "OrderedDict[str, JobRecord]" = OrderedDict()
+        # ...and on disk, shared with the other workers, which may not have run that search
+        self.records_dir = records_dir
+        self._records_written = 0
+        os.makedirs(records_dir, exist_ok=True)
+
+    def search_jobs(self, query: str = None, location: str = None) -> List[Dict[str, Any]]:
+        """Search for jobs using the Adzuna API"""
+        return [record.to_dict() for record in self.search_jobs_versioned(query, location)[0]]
+
+    def get_job(self, job_id: str) -> Optional[JobRecord]:
+        """A job from a recent search by any worker, or None once it has been evicted"""
+        with self._cache_lock:
+            record = self._records.get(job_id)
+            if record is not None:
+                self._records.move_to_end(job_id)
+                return record
+        record = self._load_record(job_id)
+        if record is not None:
+            with self._cache_lock:
+                self._remember([record])
+        return record
+
+    def _record_path(self, job_id: str) -> str:
+        return os.path.join(self.records_dir, hashlib.sha1(job_id.encode("utf-8")).hexdigest() + ".json")
+
+    def _load_record(self, job_id: str) -> Optional[JobRecord]:
+        path = self._record_path(job_id)
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            # Mark as recently used for eviction
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        return JobRecord(**data) if data.get("id") == job_id else None
+
+    def _remember(self, records: List[JobRecord]):
+        # Caller holds _cache_lock
+        for record in records:
+            self._records[record.id] = record
+            self._records.move_to_end(record.id)
+        while len(self._records) > self.detail_cache_size:
+            self._records.popitem(last=False)
+
+    def _store_records(self, records: List[JobRecord]):
+        """Write jobs this worker has not seen yet to the shared store, keeping its newest detail_cache_size files"""
+        # Not fsynced: a lost record only means the job has to be searched for again
+        for record in records:
+            atomic_write_json(self._record_path(record.id), record.to_dict(), indent=None, fsync=False)
+        self._records_written += len(records)
+        if self._records_written < self.detail_cache_size // 10 + 1:
+            return
+        self._records_written = 0
+        entries = []
+        for entry in os.scandir(self.records_dir):
+            try:
+                entries.append((entry.stat().st_mtime_ns, entry.path))
+            except FileNotFoundError:
+                continue
+        entries.sort(reverse=True)
+        for _, path in entries[self.detail_cache_size:]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def search_jobs_versioned(self, query: str = None, location: str = None) -> Tuple[List[JobRecord], str]:
+        """Search for jobs and return them with a version that changes when the results do"""
+        jobs, version, _ = self.search(query, location)
+        return jobs, version
+
+    def search(self, query: str = None, location: str = None) -> Tuple[List[JobRecord], str, List[str]]:
+        """Jobs, their version and the names of providers missing from the results"""
+        key = ((query or "").strip().lower(), (location or "").strip().lower())
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None and time.monotonic() - cached[0] < cached[1]:
+                self._cache.move_to_end(key)
+                return cached[2], cached[3], cached[4]
+
+        with stage("job_providers"):
+            jobs, version, missing = self._fetch_jobs(query, location)
+        if version is not None:
+            ttl = self.partial_cache_ttl if missing else self.cache_ttl
+            with self._cache_lock:
+                self._cache[key] = (time.monotonic(), ttl, jobs, version, missing)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+                new = [record for record in jobs if record.id not in self._records]
+                self._remember(jobs)
+            self._store_records(new)
+        return jobs, version or "empty", missing
+
+    def _fetch_jobs(self, query: str = None, location: str = None) -> Tuple[List[JobRecord], Optional[str], List[str]]:
+        """Ask every provider at once; the version hashes the providers' versions (None if none answered)"""
+        futures = [(provider, pool.submit(provider.search, query, location))
+                   for provider, pool in zip(self.providers, self._pools)]
+        wait([future for _, future in futures], timeout=self.deadline)
+
+        results, versions, missing = [], [], []
+        for provider, future in futures:
+            if not future.done():
+                future.cancel()
+                logger.warning("job provider missed the search deadline",
+                               extra={"provider": provider.name, "deadline_s": self.deadline})
+                missing.append(provider.name)
+                continue
+            try:
+                jobs, version = future.result()
+            except Exception as e:
+                logger.warning("job provider failed", extra={"provider": provider.name, "error": str(e)})
+                missing.append(provider.name)
+                continue
+            results.append(jobs)
+            versions.append(f"{provider.name}:{version}")
+
+        if not results:
+            return [], None, missing
+        version = hashlib.sha1("\n".join(versions).encode("utf-8")).hexdigest()
+        return merge_jobs(results, query), version, missing
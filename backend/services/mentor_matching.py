@@ -0,0 +1,410 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from data_storage import atomic_write_json, file_lock, file_signature
+from embeddings import get_embedding_service
+from structured_logging import get_logger
+
+# Curated catalogue that ships with the code, resolved like the FAQ file; MENTORS_FILE
+# points a deployment at its own copy. Changes made through the API are kept in a
+# separate file next to it (mentors.changes.json), so the checked-in seed is never rewritten.
+logger = get_logger("mentors")
+
+MENTORS_FILE = os.getenv("MENTORS_FILE") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "mentors.json")
+
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+HOURS_PER_WEEK = 7 * 24
+AVAILABILITY_WORDS = -(-HOURS_PER_WEEK // 64)
+
+_RANGE_RE = re.compile(r"^(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})$")
+
+
+def normalize_skill(skill: str) -> str:
+    return " ".join(skill.split()).casefold()
+
+
+def pack_bits(bits: Iterable[int], words: int) -> np.ndarray:
+    packed = np.zeros(words, dtype=np.uint64)
+    for bit in bits:
+        packed[bit // 64] |= np.uint64(1 << (bit % 64))
+    return packed
+
+
+def availability_hours(availability: Dict[str, List[str]]) -> List[int]:
+    """Hours of the week (0 = Monday 00:00) covered by {"mon": ["18:00-20:00"], ...}"""
+    hours = set()
+    for day, ranges in (availability or {}).items():
+        day_key = day[:3].lower()
+        if day_key not in DAYS:
+            raise ValueError(f"Unknown day {day!r}")
+        for spec in ranges:
+            found = _RANGE_RE.match(spec.strip())
+            if not found:
+                raise ValueError(f"Invalid time range {spec!r} (expected HH:MM-HH:MM)")
+            start = int(found[1]) * 60 + int(found[2])
+            end = int(found[3]) * 60 + int(found[4])
+            if not 0 <= start < end <= 24 * 60:
+                raise ValueError(f"Invalid time range {spec!r}")
+            offset = DAYS.index(day_key) * 24
+            # A partly covered hour counts, so 18:30-20:00 still offers the 18:00 slot
+            hours.update(offset + hour for hour in range(start // 60, -(-end // 60)))
+    return sorted(hours)
+
+
+def hours_mask(days: Iterable[str], start_hour: int = 0, end_hour: int = 24) -> np.ndarray:
+    """Bitset of the given hours on each of the given weekdays"""
+    bits = []
+    for day in days:
+        day_key = day[:3].lower()
+        if day_key not in DAYS:
+            raise ValueError(f"Unknown day {day!r}")
+        bits.extend(DAYS.index(day_key) * 24 + hour for hour in range(max(start_hour, 0), min(end_hour, 24)))
+    return pack_bits(bits, AVAILABILITY_WORDS)
+
+
+def slot_mask(date: str, time: str, duration: int) -> np.ndarray:
+    """Bitset of the weekly hours a session on a concrete date occupies"""
+    moment = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
+    start = moment.weekday() * 24 * 60 + moment.hour * 60 + moment.minute
+    last = (start + max(int(duration), 1) - 1) // 60
+    # A session running past Sunday midnight wraps round to Monday
+    return pack_bits({hour % HOURS_PER_WEEK for hour in range(start // 60, last + 1)}, AVAILABILITY_WORDS)
+
+
+def profile_text(profile: Dict[str, Any]) -> str:
+    skills = ", ".join(profile.get("skills", []))
+    return f"{profile.get('headline', '')}. {profile.get('bio', '')} Skills: {skills}".strip()
+
+
+class MentorCatalogue:
+    """Mentor profiles held in contiguous arrays for one-pass matching.
+
+    Row i of every array describes one mentor: a normalised profile embedding
+    (float16, used to re-rank), a random projection of it to ``coarse_dim``
+    dimensions (float32, scanned for every query), a skill bitset and a
+    weekly availability bitset with one bit per hour. A match filters all rows
+    with bitwise ANDs, scores them with one matrix-vector product over the
+    projected vectors, and re-ranks a small candidate pool with the full
+    vectors. Updating a profile re-embeds only that mentor; a reload after
+    another worker changed the files reuses the vectors of unchanged profiles,
+    and vectors are cached next to the data file across restarts.
+
+    The data file is read-only here. Updates and removals are recorded by
+    mentor ID in ``changes_file`` (a profile, or null for a removed mentor)
+    and applied over the data file on every load.
+    """
+
+    def __init__(self, data_file: str = MENTORS_FILE, embedding_service=None, coarse_dim: int = 128,
+                 check_interval: float = 2.0, changes_file: str = None):
+        self.data_file = data_file
+        self.changes_file = changes_file or os.path.splitext(data_file)[0] + ".changes.json"
+        self.cache_file = os.path.splitext(data_file)[0] + ".embeddings.npz"
+        self.embedding_service = embedding_service or get_embedding_service()
+        self.model_name = getattr(self.embedding_service, "model_name", type(self.embedding_service).__name__)
+        self.coarse_dim = coarse_dim
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._last_check = 0.0
+        self._projection: Optional[np.ndarray] = None
+        self._clear()
+        self.reload()
+
+    # --- Storage ---
+    def _clear(self):
+        self._size = 0
+        self._profiles: List[Optional[Dict[str, Any]]] = []
+        self._digests: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._skill_bits: Dict[str, int] = {}
+        self._full = np.zeros((0, 0), dtype=np.float16)
+        self._coarse = np.zeros((0, 0), dtype=np.float32)
+        self._skills = np.zeros((1, 0), dtype=np.uint64)
+        self._availability = np.zeros((AVAILABILITY_WORDS, 0), dtype=np.uint64)
+        self._active = np.zeros(0, dtype=bool)
+        self._signature = None
+
+    @staticmethod
+    def _read_json(path: str) -> Dict[str, Any]:
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _read_changes(self) -> Dict[str, Optional[Dict[str, Any]]]:
+        return self._read_json(self.changes_file).get("mentors", {})
+
+    def _read_file(self) -> List[Dict[str, Any]]:
+        """The data file's mentors with the recorded changes applied"""
+        changes = self._read_changes()
+        mentors = [m for m in self._read_json(self.data_file).get("mentors", []) if str(m.get("id")) not in changes]
+        return mentors + [profile for profile in changes.values() if profile is not None]
+
+    def _files_signature(self) -> Tuple[Any, Any]:
+        return file_signature(self.data_file), file_signature(self.changes_file)
+
+    def _digest(self, profile: Dict[str, Any]) -> str:
+        return hashlib.sha1(f"{self.model_name}\x1f{profile_text(profile)}".encode("utf-8")).hexdigest()
+
+    def _project(self, full: np.ndarray) -> np.ndarray:
+        """Coarse vectors for the scan; a fixed Gaussian projection roughly preserves cosine similarity"""
+        full = full.astype(np.float32)
+        dim = full.shape[1]
+        if dim <= self.coarse_dim:
+            return full
+        if self._projection is None or self._projection.shape[0] != dim:
+            rng = np.random.default_rng(0)
+            self._projection = rng.standard_normal((dim, self.coarse_dim)).astype(np.float32)
+        coarse = full @ self._projection
+        norms = np.linalg.norm(coarse, axis=1, keepdims=True)
+        return coarse / np.where(norms == 0, 1, norms)
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        matrix = np.asarray(self.embedding_service.get_embeddings(texts), dtype=np.float32).reshape(len(texts), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    def _known_vectors(self) -> Dict[str, np.ndarray]:
+        """Vectors we can reuse: the rows in memory, then the on-disk cache"""
+        known = {}
+        if os.path.exists(self.cache_file):
+            try:
+                cached = np.load(self.cache_file)
+                known.update(zip((str(d) for d in cached["digests"]), cached["matrix"]))
+            except (OSError, KeyError, ValueError):
+                pass
+        for row, digest in enumerate(self._digests):
+            if digest is not None:
+                known[digest] = self._full[row]
+        return known
+
+    def _save_cache(self):
+        live = [row for row, digest in enumerate(self._digests) if digest is not None]
+        tmp_path = self.cache_file + ".tmp.npz"
+        try:
+            np.savez(tmp_path, matrix=self._full[live], digests=np.array([self._digests[r] for r in live]))
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            logger.warning("could not cache mentor embeddings", extra={"error": str(e)})
+
+    def _grow(self, needed: int, dim: int):
+        capacity = len(self._active)
+        if needed <= capacity and self._full.shape[1] == dim:
+            return
+        capacity = max(needed, capacity * 2, 64)
+
+        def resized(array: np.ndarray, shape: Tuple[int, ...], axis: int) -> np.ndarray:
+            grown = np.zeros(shape, dtype=array.dtype)
+            if axis == 0:
+                grown[:self._size] = array[:self._size]
+            else:
+                grown[:, :self._size] = array[:, :self._size]
+            return grown
+
+        self._full = resized(self._full, (capacity, dim), 0) if self._full.shape[1] == dim \
+            else np.zeros((capacity, dim), dtype=np.float16)
+        coarse_dim = min(dim, self.coarse_dim)
+        self._coarse = resized(self._coarse, (capacity, coarse_dim), 0) if self._coarse.shape[1] == coarse_dim \
+            else np.zeros((capacity, coarse_dim), dtype=np.float32)
+        self._skills = resized(self._skills, (self._skills.shape[0], capacity), 1)
+        self._availability = resized(self._availability, (AVAILABILITY_WORDS, capacity), 1)
+        self._active = resized(self._active, (capacity,), 0)
+
+    def _skill_bitset(self, skills: List[str]) -> np.ndarray:
+        for skill in skills:
+            if skill not in self._skill_bits:
+                self._skill_bits[skill] = len(self._skill_bits)
+        words = -(-len(self._skill_bits) // 64) or 1
+        if words > self._skills.shape[0]:
+            extra = np.zeros((words - self._skills.shape[0], self._skills.shape[1]), dtype=np.uint64)
+            self._skills = np.vstack([self._skills, extra])
+        return pack_bits((self._skill_bits[s] for s in skills), self._skills.shape[0])
+
+    def _write_rows(self, rows: List[int], profiles: List[Dict[str, Any]], vectors: np.ndarray):
+        self._full[rows] = vectors
+        self._coarse[rows] = self._project(vectors)
+        for row, profile in zip(rows, profiles):
+            self._skills[:, row] = self._skill_bitset(profile["skills"])
+            self._availability[:, row] = pack_bits(availability_hours(profile["availability"]), AVAILABILITY_WORDS)
+            self._active[row] = True
+            self._profiles[row] = profile
+            self._digests[row] = self._digest(profile)
+            self._rows[profile["id"]] = row
+
+    @staticmethod
+    def validate(profile: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalised copy of a profile; raises ValueError if it is unusable"""
+        if not str(profile.get("id", "")).strip() or not str(profile.get("name", "")).strip():
+            raise ValueError("Mentor id and name are required")
+        clean = dict(profile)
+        clean["id"] = str(profile["id"]).strip()
+        clean["name"] = " ".join(str(profile["name"]).split())
+        clean["skills"] = list(dict.fromkeys(normalize_skill(s) for s in profile.get("skills", []) if s.strip()))
+        availability_hours(profile.get("availability") or {})
+        clean["availability"] = {day[:3].lower(): list(ranges)
+                                 for day, ranges in (profile.get("availability") or {}).items()}
+        return clean
+
+    # --- Loading ---
+    def reload(self) -> int:
+        """Rebuild from the data file, embedding only profiles not seen before; returns the mentor count"""
+        with self._lock:
+            signature = self._files_signature()
+            profiles = []
+            for profile in self._read_file():
+                try:
+                    profiles.append(self.validate(profile))
+                except ValueError as e:
+                    logger.warning("skipping mentor profile", extra={"error": str(e)})
+            profiles = list({p["id"]: p for p in profiles}.values())
+            known = self._known_vectors()
+            digests = [self._digest(p) for p in profiles]
+            missing = [i for i, d in enumerate(digests) if d not in known]
+            if missing:
+                fresh = self._embed([profile_text(profiles[i]) for i in missing])
+                known.update((digests[i], vector) for i, vector in zip(missing, fresh))
+
+            self._clear()
+            if profiles:
+                vectors = np.vstack([known[d] for d in digests]).astype(np.float32)
+                self._grow(len(profiles), vectors.shape[1])
+                self._size = len(profiles)
+                self._profiles = [None] * len(profiles)
+                self._digests = [None] * len(profiles)
+                self._write_rows(list(range(len(profiles))), profiles, vectors)
+            self._signature = signature
+            self._last_check = time.monotonic()
+            if missing:
+                self._save_cache()
+            return len(self._rows)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        if self._files_signature() != self._signature:
+            self.reload()
+
+    # --- Updates ---
+    def _record_change(self, mentor_id: str, profile: Optional[Dict[str, Any]]):
+        """Record one mentor's new profile (None: removed) in the changes file; caller holds its lock"""
+        changes = dict(self._read_changes())
+        changes[mentor_id] = profile
+        atomic_write_json(self.changes_file, {"mentors": changes})
+
+    def upsert(self, profile: Dict[str, Any]) -> Dict[str, Any]:
+        """Add or update one mentor, re-embedding only that profile"""
+        profile = self.validate(profile)
+        digest = self._digest(profile)
+        with self._lock:
+            row = self._rows.get(profile["id"])
+            unchanged = row is not None and self._digests[row] == digest
+        # Embed before taking the file lock; model inference is the slow part
+        vector = None if unchanged else self._embed([profile_text(profile)])
+        with self._lock, file_lock(self.changes_file):
+            if self._files_signature() != self._signature:
+                self.reload()
+            row = self._rows.get(profile["id"])
+            if vector is None:
+                if row is not None and self._digests[row] == digest:
+                    vector = self._full[row:row + 1].astype(np.float32)
+                else:
+                    # Another worker changed the stored profile in the meantime
+                    vector = self._embed([profile_text(profile)])
+            self._record_change(profile["id"], profile)
+            if row is None:
+                row = self._size
+                self._grow(row + 1, vector.shape[1])
+                self._size += 1
+                self._profiles.append(None)
+                self._digests.append(None)
+            self._write_rows([row], [profile], vector)
+            self._signature = self._files_signature()
+        return profile
+
+    def remove(self, mentor_id: str) -> bool:
+        with self._lock, file_lock(self.changes_file):
+            if self._files_signature() != self._signature:
+                self.reload()
+            row = self._rows.pop(mentor_id, None)
+            if row is None:
+                return False
+            self._record_change(mentor_id, None)
+            # The row stays allocated until the next reload compacts the arrays
+            self._active[row] = False
+            self._profiles[row] = None
+            self._digests[row] = None
+            self._signature = self._files_signature()
+        return True
+
+    # --- Queries ---
+    def get(self, mentor_id: str) -> Optional[Dict[str, Any]]:
+        self._maybe_reload()
+        with self._lock:
+            row = self._rows.get(mentor_id)
+            return dict(self._profiles[row]) if row is not None else None
+
+    def match(self, goals: str, skills: Iterable[str] = (), availability: Optional[np.ndarray] = None,
+              require_all_hours: bool = False, top_k: int = 5,
+              accept: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[Dict[str, Any]]:
+        """Best mentors for the goals that have every skill and overlap (or, with require_all_hours,
+        cover) the availability bitset; ``accept`` can veto candidates, e.g. already booked ones"""
+        self._maybe_reload()
+        query = self._embed([goals or ""])[0]
+        with self._lock:
+            n = self._size
+            if not self._rows:
+                return []
+            mask = self._active[:n].copy()
+
+            required = [normalize_skill(s) for s in skills if s.strip()]
+            if any(s not in self._skill_bits for s in required):
+                return []
+            wanted = pack_bits((self._skill_bits[s] for s in required), self._skills.shape[0])
+            for word in np.flatnonzero(wanted):
+                mask &= (self._skills[word, :n] & wanted[word]) == wanted[word]
+
+            if availability is not None and availability.any():
+                if require_all_hours:
+                    for word in np.flatnonzero(availability):
+                        mask &= (self._availability[word, :n] & availability[word]) == availability[word]
+                else:
+                    overlap = np.zeros(n, dtype=bool)
+                    for word in np.flatnonzero(availability):
+                        overlap |= (self._availability[word, :n] & availability[word]) != 0
+                    mask &= overlap
+
+            pool = max(top_k * 10, 100)
+            candidates = np.flatnonzero(mask)
+            if len(candidates) > pool:
+                coarse_query = self._project(query[None, :])[0]
+                # Selective filters make gathering the passing rows cheaper than scanning them all
+                if len(candidates) * 4 < n:
+                    scores = self._coarse[candidates] @ coarse_query
+                else:
+                    scores = (self._coarse[:n] @ coarse_query)[candidates]
+                candidates = candidates[np.argpartition(scores, -pool)[-pool:]]
+            exact = self._full[candidates].astype(np.float32) @ query
+            order = np.argsort(-exact, kind="stable")
+            ranked = [(self._profiles[candidates[i]], float(exact[i])) for i in order]
+
+        results = []
+        for profile, score in ranked:
+            if accept is not None and not accept(profile):
+                continue
+            results.append(dict(profile, score=round(score, 4)))
+            if len(results) == top_k:
+                break
+        return results
+
+    def __len__(self) -> int:
+        return len(self._rows)
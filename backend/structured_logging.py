@@ -0,0 +1,332 @@
+"""Non-blocking JSON-lines logging.
+
+Request handlers only put a record on a bounded in-memory queue; a
+background thread formats it as one JSON object per line and writes it out.
+When the queue is full the record is dropped and counted instead of making
+the caller wait, and the writer reports the count once it catches up.
+
+Every record carries the current request ID (set by the request middleware
+in main.py) and fields passed with ``extra=``. Repeats of the same message
+are rate-limited per logger, template and exception, string fields are
+truncated, and fields or text that look like credentials are redacted before
+writing. Access records are not rate-limited; LOG_ACCESS_SAMPLE_RATE controls
+their volume.
+
+Configuration (environment):
+
+    LOG_LEVEL          minimum level (default INFO)
+    LOG_QUEUE_SIZE     records buffered before dropping (default 10000)
+    LOG_RATE_LIMIT     "count/seconds" allowed per message template and exception (default 20/10)
+    LOG_MAX_FIELD_CHARS  longest string kept in a field (default 512)
+    LOG_ACCESS_SAMPLE_RATE  share of fast successful requests given an access record (default 1)
+    LOG_SLOW_MS        requests at least this slow are always logged (default 1000)
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional, Tuple
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+
+ROOT_LOGGER = "asha"
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+# Stage name -> milliseconds for the current request; a dict so threadpool code can add to it
+stage_timings_var: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+SENSITIVE_KEY_RE = re.compile(r"pass(word)?|secret|token|authorization|api[_-]?key|cookie", re.IGNORECASE)
+SENSITIVE_TEXT_RE = re.compile(r"(Bearer\s+)[A-Za-z0-9._~+/=-]+|\bsk-[A-Za-z0-9-]{8,}")
+# Attributes every LogRecord has; anything else was passed with extra=
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the application namespace, e.g. get_logger("chatbot") -> "asha.chatbot" """
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def truncate(text: str, limit: Optional[int] = None) -> str:
+    limit = limit if limit is not None else int(os.getenv("LOG_MAX_FIELD_CHARS", "512"))
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}…[{len(text) - limit} more chars]"
+
+
+def redact(text: str) -> str:
+    return SENSITIVE_TEXT_RE.sub(lambda m: f"{m.group(1) or ''}[redacted]", text)
+
+
+def _clean(key: str, value: Any, limit: int) -> Any:
+    if SENSITIVE_KEY_RE.search(key):
+        return "[redacted]"
+    if isinstance(value, str):
+        return truncate(redact(value), limit)
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    if isinstance(value, dict):
+        return {str(k): _clean(str(k), v, limit) for k, v in list(value.items())[:50]}
+    if isinstance(value, (list, tuple)):
+        return [_clean(key, v, limit) for v in value[:50]]
+    return truncate(redact(str(value)), limit)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block and record it under name in the current request's stage timings"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = stage_timings_var.get()
+        if timings is not None:
+            timings[name] = round(timings.get(name, 0.0) + (time.perf_counter() - started) * 1000, 2)
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record; runs on the writer thread, never in a request"""
+
+    def __init__(self, max_field_chars: int = 512):
+        super().__init__()
+        self.max_field_chars = max_field_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": truncate(redact(record.getMessage()), self.max_field_chars),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = _clean(key, value, self.max_field_chars)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            # Tracebacks are kept a little longer than other fields, but never unbounded
+            entry["exception"] = truncate(redact(record.exc_text), self.max_field_chars * 8)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Let at most ``burst`` records per logger and message template through every ``interval`` seconds.
+
+    Records logged with an exception are counted per exception type and
+    message, so one failing dependency cannot hide a different error logged
+    under the same template. Loggers in ``exempt`` are never limited. The first
+    record after a suppressed stretch carries ``suppressed`` with the number
+    that were dropped, so floods stay visible without flooding.
+    """
+
+    def __init__(self, burst: int = 20, interval: float = 10.0, max_keys: int = 10000,
+                 exempt: Tuple[str, ...] = (f"{ROOT_LOGGER}.access",)):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.max_keys = max_keys
+        self.exempt = exempt
+        self._windows: Dict[Tuple[str, Any], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.name in self.exempt:
+            return True
+        key: Tuple[Any, ...] = (record.name, record.msg)
+        if record.exc_info and record.exc_info[0] is not None:
+            key += (record.exc_info[0].__name__, str(record.exc_info[1])[:200])
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                if window is None and len(self._windows) >= self.max_keys:
+                    self._windows.clear()
+                suppressed = window[2] if window is not None else 0
+                window = self._windows[key] = [now, 0, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+            if window[1] >= self.burst:
+                window[2] += 1
+                return False
+            window[1] += 1
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue: "queue.Queue", max_field_chars: int = 512):
+        super().__init__(log_queue)
+        self.max_field_chars = max_field_chars
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Bind the message and request context now; formatting to JSON happens on the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        request_id = request_id_var.get()
+        if request_id is not None and not hasattr(record, "request_id"):
+            record.request_id = request_id
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def take_dropped(self) -> int:
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+class _DropReportingHandler(logging.StreamHandler):
+    """Writes records; after each one, reports how many the queue handler had to drop"""
+
+    def __init__(self, stream, queue_handler: DroppingQueueHandler):
+        super().__init__(stream)
+        self.queue_handler = queue_handler
+        self.total_dropped = 0
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        handled = super().handle(record)
+        dropped = self.queue_handler.take_dropped()
+        if dropped:
+            self.total_dropped += dropped
+            report = logging.LogRecord(f"{ROOT_LOGGER}.logging", logging.WARNING, __file__, 0,
+                                       "log records dropped: queue full", None, None)
+            report.dropped = dropped
+            super().handle(report)
+        return handled
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room rather than fail to stop when the queue is full at shutdown
+        self.queue.put(self._sentinel)
+
+
+_configured: Optional[Tuple[DroppingQueueHandler, logging.handlers.QueueListener, _DropReportingHandler]] = None
+_configure_lock = threading.Lock()
+
+
+def configure_logging(stream=None, level: Optional[str] = None, queue_size: Optional[int] = None,
+                      rate_limit: Optional[str] = None) -> DroppingQueueHandler:
+    """Route the "asha" loggers through the queue and writer thread (idempotent)"""
+    global _configured
+    with _configure_lock:
+        if _configured is not None:
+            return _configured[0]
+        max_field_chars = int(os.getenv("LOG_MAX_FIELD_CHARS", "512"))
+        burst, _, interval = (rate_limit or os.getenv("LOG_RATE_LIMIT", "20/10")).partition("/")
+
+        log_queue: "queue.Queue" = queue.Queue(maxsize=queue_size or int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+        queue_handler = DroppingQueueHandler(log_queue, max_field_chars)
+        queue_handler.addFilter(RateLimitFilter(int(burst), float(interval or 10)))
+        writer = _DropReportingHandler(stream or sys.stdout, queue_handler)
+        writer.setFormatter(JSONFormatter(max_field_chars))
+        listener = _Listener(log_queue, writer)
+        listener.start()
+        atexit.register(shutdown_logging)
+
+        logger = logging.getLogger(ROOT_LOGGER)
+        logger.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+        logger.addHandler(queue_handler)
+        # Records stay out of the root logger, so uvicorn's own handlers don't print them again
+        logger.propagate = False
+        _configured = (queue_handler, listener, writer)
+        return queue_handler
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _configured
+    with _configure_lock:
+        if _configured is None:
+            return
+        queue_handler, listener, _ = _configured
+        listener.stop()
+        logging.getLogger(ROOT_LOGGER).removeHandler(queue_handler)
+        _configured = None
+
+
+def logging_stats() -> Dict[str, int]:
+    if _configured is None:
+        return {"queued": 0, "dropped": 0}
+    queue_handler, _, writer = _configured
+    return {"queued": queue_handler.queue.qsize(), "dropped": writer.total_dropped + queue_handler.dropped}
+
+
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class RequestLoggingMiddleware:
+    """ASGI middleware: request IDs, stage timings and one access record per request.
+
+    An incoming X-Request-ID is reused when it looks sane, otherwise a new
+    one is made; either way it is echoed in the response. Fast successful
+    requests are logged with probability ``sample_rate`` (LOG_ACCESS_SAMPLE_RATE);
+    errors and requests slower than ``slow_ms`` (LOG_SLOW_MS) always are.
+    """
+
+    def __init__(self, app, logger: Optional[logging.Logger] = None, sample_rate: Optional[float] = None,
+                 slow_ms: Optional[float] = None):
+        self.app = app
+        self.logger = logger or get_logger("access")
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("LOG_ACCESS_SAMPLE_RATE", "1"))
+        self.slow_ms = slow_ms if slow_ms is not None else float(os.getenv("LOG_SLOW_MS", "1000"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        request_id = incoming if _REQUEST_ID_RE.match(incoming) else new_request_id()
+        timings: Dict[str, float] = {}
+        id_token = request_id_var.set(request_id)
+        timings_token = stage_timings_var.set(timings)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        except Exception:
+            self.logger.exception("unhandled error", extra={"method": scope["method"], "path": scope["path"]})
+            raise
+        finally:
+            duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            if status >= 400 or duration_ms >= self.slow_ms or random.random() < self.sample_rate:
+                self.logger.log(
+                    logging.ERROR if status >= 500 else logging.INFO, "request",
+                    extra={"method": scope["method"], "path": scope["path"], "status": status,
+                           "duration_ms": duration_ms, "stages": timings},
+                )
+            request_id_var.reset(id_token)
+            stage_timings_var.reset(timings_token)
+
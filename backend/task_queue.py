@@ -0,0 +1,363 @@
+"""In-process background jobs for work that should not hold a request open.
+
+A fixed pool of worker threads takes jobs from a priority heap. Submitting a
+job that is identical (same kind and parameters) to one that is queued,
+running or recently finished returns that job instead of starting another;
+kinds registered with ``reuse_results=False`` (jobs whose inputs can change
+under the same parameters) only share queued or running jobs.
+Job state (without its parameters) is persisted under a file lock on every
+transition, so any uvicorn worker can report on, or request cancellation of,
+a job another worker runs. Progress reports are written at most once per
+``progress_interval`` seconds. Finished jobs are kept for ``result_ttl`` seconds.
+
+The process that owns a queued or running job refreshes its heartbeat every
+``heartbeat_interval`` seconds. A job whose heartbeat is older than
+``stale_after`` belonged to a worker that crashed or was restarted; it is
+reported as failed and no longer absorbs identical submissions.
+"""
+from typing import Any, Callable, Dict, List, Optional
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+
+try:
+    from .data_storage import FileCache, atomic_write_json, file_lock
+    from .structured_logging import get_logger
+except ImportError:  # imported as a top-level module from the backend directory
+    from data_storage import FileCache, atomic_write_json, file_lock
+    from structured_logging import get_logger
+
+logger = get_logger("tasks")
+
+TASKS_FILE = os.path.join("data", "tasks.json")
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+ACTIVE_STATUSES = ("queued", "running")
+FINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+class QueueFull(Exception):
+    pass
+
+
+class TaskCancelled(Exception):
+    """Raised by handlers (via TaskContext.check_cancelled) to stop early"""
+
+
+class TaskContext:
+    """Handed to a running handler so it can report progress and honour cancellation"""
+
+    def __init__(self, queue: "TaskQueue", task_id: str, user: Optional[str] = None):
+        self._queue = queue
+        self.task_id = task_id
+        # Who submitted the task, for charging its work to them
+        self.user = user
+
+    def cancelled(self) -> bool:
+        return self._queue._cancel_requested(self.task_id)
+
+    def check_cancelled(self):
+        if self.cancelled():
+            raise TaskCancelled()
+
+    def progress(self, done: int, total: int):
+        self._queue._progress(self.task_id, done, total)
+
+
+def task_key(kind: str, params: Dict[str, Any], user: Optional[str] = None) -> str:
+    """Deduplication key: identical kind and parameters from the same submitter are the same job"""
+    payload = json.dumps({"kind": kind, "params": params, "user": user}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class TaskQueue:
+    def __init__(self, workers: int = None, max_queued: int = 1000, result_ttl: float = None,
+                 tasks_file: str = TASKS_FILE, heartbeat_interval: float = 10.0, stale_after: float = None,
+                 progress_interval: float = 1.0):
+        self.workers = workers or int(os.getenv("TASK_WORKERS", "2"))
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl if result_ttl is not None else float(os.getenv("TASK_RESULT_TTL", "3600"))
+        self.tasks_file = tasks_file
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after if stale_after is not None else 6 * heartbeat_interval
+        self.progress_interval = progress_interval
+        # Identifies this process's jobs in the shared file
+        self.owner = uuid.uuid4().hex
+        self._progress_written: Dict[str, float] = {}
+        self._handlers: Dict[str, Callable[[Dict[str, Any], TaskContext], Any]] = {}
+        self._reuse_results: Dict[str, bool] = {}
+        self._heap: List = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._local: Dict[str, Dict[str, Any]] = {}  # tasks owned by this process
+        self._cancelled = set()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._cache = FileCache()
+        os.makedirs(os.path.dirname(tasks_file) or ".", exist_ok=True)
+
+    # --- registration and lifecycle ---
+    def register(self, kind: str, handler: Callable[[Dict[str, Any], TaskContext], Any], reuse_results: bool = True):
+        self._handlers[kind] = handler
+        self._reuse_results[kind] = reuse_results
+
+    def start(self):
+        with self._cond:
+            if self._threads:
+                return
+            self._stopping = False
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"task-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._heartbeat, name="task-heartbeat", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def shutdown(self, timeout: float = 5.0):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    # --- persistence ---
+    def _read_all(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.tasks_file):
+            return {}
+
+        def read(path):
+            with open(path, "r") as f:
+                return json.load(f)
+        return self._cache.load(self.tasks_file, read)
+
+    def _expired(self, task: Dict[str, Any], now: float) -> bool:
+        return task["status"] in FINAL_STATUSES and now - task.get("finished_at", now) > self.result_ttl
+
+    def _resolve(self, task: Dict[str, Any], now: float) -> Dict[str, Any]:
+        """The task as persisted, or as failed if its owner stopped sending heartbeats"""
+        if task["status"] not in ACTIVE_STATUSES or task.get("owner") == self.owner:
+            return task
+        last_seen = task.get("heartbeat_at", task["created_at"])
+        if now - last_seen <= self.stale_after:
+            return task
+        return dict(task, status="failed", error="The worker running this task stopped before it finished",
+                    finished_at=last_seen + self.stale_after)
+
+    def _write(self, *tasks: Dict[str, Any]):
+        with file_lock(self.tasks_file):
+            self._write_locked(*tasks)
+
+    def _write_locked(self, *tasks: Dict[str, Any]):
+        # Caller holds file_lock(self.tasks_file); flock is not re-entrant across handles
+        now = time.time()
+        stored = (self._resolve(t, now) for t in self._read_all().values())
+        current = {t["id"]: t for t in stored if not self._expired(t, now)}
+        for task in tasks:
+            if current.get(task["id"], {}).get("cancel_requested"):
+                task["cancel_requested"] = True
+            # Parameters only matter to the owning process, and can be large (documents to ingest)
+            current[task["id"]] = {k: v for k, v in task.items() if k != "params"}
+        atomic_write_json(self.tasks_file, current, indent=None)
+        self._cache.invalidate(self.tasks_file)
+
+    def _update(self, task_id: str, **changes):
+        with self._cond:
+            task = self._local.get(task_id)
+            if task is None:
+                return
+            task.update(changes, heartbeat_at=time.time())
+            snapshot = dict(task)
+        self._write(snapshot)
+
+    def _progress(self, task_id: str, done: int, total: int):
+        now = time.monotonic()
+        with self._cond:
+            task = self._local.get(task_id)
+            if task is None:
+                return
+            task["progress"] = {"done": done, "total": total}
+            # Other processes see it at the next write or heartbeat; the last report always goes out
+            if done < total and now - self._progress_written.get(task_id, 0.0) < self.progress_interval:
+                return
+            self._progress_written[task_id] = now
+        self._update(task_id)
+
+    def _heartbeat(self):
+        while True:
+            with self._cond:
+                if self._cond.wait_for(lambda: self._stopping, timeout=self.heartbeat_interval):
+                    return
+                now = time.time()
+                snapshots = []
+                for task in self._local.values():
+                    task["heartbeat_at"] = now
+                    snapshots.append(dict(task))
+            if snapshots:
+                self._write(*snapshots)
+
+    # --- public API ---
+    def submit(self, kind: str, params: Dict[str, Any] = None, priority: str = "normal",
+               dedupe: bool = True, user: Optional[str] = None) -> Dict[str, Any]:
+        """Queue a job, or return the identical job that is already queued, running or finished"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown task kind: {kind}")
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        params = params or {}
+        key = task_key(kind, params, user)
+
+        shared = ACTIVE_STATUSES + (("succeeded",) if self._reuse_results[kind] else ())
+        with file_lock(self.tasks_file):
+            if dedupe:
+                now = time.time()
+                for stored in self._read_all().values():
+                    task = self._resolve(stored, now)
+                    if task["key"] == key and not self._expired(task, now) and task["status"] in shared:
+                        return dict(task, deduplicated=True)
+
+            with self._cond:
+                if len(self._heap) >= self.max_queued:
+                    raise QueueFull("Too many queued tasks")
+                task = {
+                    "id": uuid.uuid4().hex,
+                    "kind": kind,
+                    "key": key,
+                    "user": user,
+                    "params": params,
+                    "priority": priority,
+                    "status": "queued",
+                    "created_at": time.time(),
+                    "result": None,
+                    "error": None,
+                    "owner": self.owner,
+                    "heartbeat_at": time.time(),
+                }
+                self._local[task["id"]] = task
+                heapq.heappush(self._heap, (PRIORITIES[priority], next(self._seq), task["id"]))
+                snapshot = dict(task)
+            self._write_locked(snapshot)
+            with self._cond:
+                self._cond.notify()
+        return snapshot
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            task = self._local.get(task_id)
+            if task is not None:
+                return dict(task)
+        task = self._read_all().get(task_id)
+        if task is None:
+            return None
+        now = time.time()
+        task = self._resolve(task, now)
+        return None if self._expired(task, now) else dict(task)
+
+    def wait(self, task_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Block until the task is finished or the timeout passes, then return it"""
+        deadline = time.monotonic() + timeout
+        while True:
+            task = self.get(task_id)
+            remaining = deadline - time.monotonic()
+            if task is None or task["status"] in FINAL_STATUSES or remaining <= 0:
+                return task
+            with self._cond:
+                if task_id in self._local:
+                    self._cond.wait(remaining)
+                    continue
+            time.sleep(min(0.2, remaining))
+
+    def cancel(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued task, or ask a running one to stop at its next check"""
+        with self._cond:
+            task = self._local.get(task_id)
+            if task is not None:
+                if task["status"] == "queued":
+                    task.update(status="cancelled", finished_at=time.time())
+                    # Its heap entry is skipped once it is no longer in _local
+                    self._local.pop(task_id, None)
+                elif task["status"] == "running":
+                    task["cancel_requested"] = True
+                    self._cancelled.add(task_id)
+                snapshot = dict(task)
+                self._cond.notify_all()
+        if task is not None:
+            self._write(snapshot)
+            return snapshot
+
+        # Owned by another process: flag it in the shared file for the owner to see
+        with file_lock(self.tasks_file):
+            tasks = dict(self._read_all())
+            task = tasks.get(task_id)
+            if task is None:
+                return None
+            task = self._resolve(task, time.time())
+            if task["status"] in ACTIVE_STATUSES:
+                task = dict(task, cancel_requested=True)
+                tasks[task_id] = task
+                atomic_write_json(self.tasks_file, tasks, indent=None)
+                self._cache.invalidate(self.tasks_file)
+            return dict(task)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            statuses = [t["status"] for t in self._local.values()]
+        return {
+            "workers": self.workers,
+            "queued": statuses.count("queued"),
+            "running": statuses.count("running"),
+        }
+
+    # --- workers ---
+    def _cancel_requested(self, task_id: str) -> bool:
+        if task_id in self._cancelled:
+            return True
+        task = self._read_all().get(task_id)
+        return bool(task and task.get("cancel_requested"))
+
+    def _next(self) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            while True:
+                if self._stopping:
+                    return None
+                while self._heap:
+                    _, _, task_id = heapq.heappop(self._heap)
+                    task = self._local.get(task_id)
+                    if task is not None and task["status"] == "queued":
+                        return task
+                self._cond.wait()
+
+    def _run(self):
+        while True:
+            task = self._next()
+            if task is None:
+                return
+            task_id = task["id"]
+            context = TaskContext(self, task_id, task.get("user"))
+            if context.cancelled():
+                self._finish(task_id, status="cancelled")
+                continue
+            self._update(task_id, status="running", started_at=time.time())
+            try:
+                result = self._handlers[task["kind"]](task["params"], context)
+                self._finish(task_id, status="succeeded", result=result)
+            except TaskCancelled:
+                self._finish(task_id, status="cancelled")
+            except Exception as e:
+                logger.exception("task failed", extra={"task_id": task_id, "kind": task["kind"]})
+                self._finish(task_id, status="failed", error=str(e))
+
+    def _finish(self, task_id: str, **changes):
+        self._update(task_id, finished_at=time.time(), **changes)
+        with self._cond:
+            # The persisted copy now answers for this task
+            self._local.pop(task_id, None)
+            self._cancelled.discard(task_id)
+            self._progress_written.pop(task_id, None)
+            self._cond.notify_all()
@@ -0,0 +1,77 @@
+import asyncio
+
+import httpx
+from aiohttp import web
+
+from benchmarks.compare import compare_results
+from benchmarks.loadtest import percentile, parse_mix, free_port
+from benchmarks.stubs import StubConfig, create_openrouter_app, create_adzuna_app
+
+
+def _result(throughput, p95, error_rate=0.0, rss=100_000):
+    block = {"throughput_rps": throughput, "p50_ms": p95 / 2, "p95_ms": p95, "p99_ms": p95 * 1.5,
+             "error_rate": error_rate, "count": 100}
+    return {
+        "summary": dict(block),
+        "endpoints": {"chat": dict(block)},
+        "workers": [{"pid": 1, "role": "worker", "rss_peak_kb": rss}],
+    }
+
+
+def test_percentile_interpolates():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50.5
+    assert percentile(values, 99) == 99.01
+    assert percentile([], 95) == 0.0
+
+
+def test_parse_mix_rejects_unknown_operation():
+    assert parse_mix("chat=3,jobs=1") == {"chat": 3.0, "jobs": 1.0}
+    try:
+        parse_mix("chat=1,bogus=2")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown operation should be rejected")
+
+
+def test_compare_flags_regressions_only_past_tolerance():
+    baseline = _result(throughput=100, p95=200)
+    assert not any(r["regression"] for r in compare_results(baseline, _result(96, 210)))
+
+    rows = compare_results(baseline, _result(throughput=70, p95=300, error_rate=0.05, rss=150_000))
+    regressed = {(r["scope"], r["metric"]) for r in rows if r["regression"]}
+    assert ("overall", "throughput_rps") in regressed
+    assert ("chat", "p95_ms") in regressed
+    assert ("overall", "error_rate") in regressed
+    assert ("workers", "rss_peak_kb") in regressed
+
+
+def test_stubs_emulate_rate_limits_and_job_search():
+    async def scenario():
+        config = StubConfig(latency_ms=0, jitter_ms=0, error_429_rate=1.0, jobs_latency_ms=0, jobs_per_page=5)
+        runners = []
+        ports = []
+        for app in (create_openrouter_app(config), create_adzuna_app(config)):
+            runner = web.AppRunner(app)
+            await runner.setup()
+            port = free_port()
+            await web.TCPSite(runner, "127.0.0.1", port).start()
+            runners.append(runner)
+            ports.append(port)
+        try:
+            async with httpx.AsyncClient() as client:
+                chat = await client.post(f"http://127.0.0.1:{ports[0]}/api/v1/chat/completions",
+                                         json={"messages": [{"role": "user", "content": "hi"}]})
+                jobs = await client.get(f"http://127.0.0.1:{ports[1]}/v1/api/jobs",
+                                        params={"what": "analyst", "results_per_page": 50})
+        finally:
+            for runner in runners:
+                await runner.cleanup()
+        return chat, jobs
+
+    chat, jobs = asyncio.run(scenario())
+    assert chat.status_code == 429
+    results = jobs.json()["results"]
+    assert len(results) == 5
+    assert results[0]["title"].startswith("Analyst")
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from chat_replay import ChatReplay
+
+
+class FakePipeline:
+    """Echoes the input after a short delay; fails inputs containing "boom" """
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.in_flight = self.peak = 0
+        self.calls = []
+
+    async def __call__(self, messages, user_input):
+        self.calls.append((user_input, len(messages)))
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        status = "error" if "boom" in user_input else "success"
+        history = messages + [{"role": "user", "content": user_input},
+                              {"role": "assistant", "content": f"re: {user_input}"}]
+        return {"response": f"re: {user_input}", "status": status, "conversation_history": history}
+
+
+class Interrupted(Exception):
+    pass
+
+
+def write_input(path, items):
+    path.write_text("".join((item if isinstance(item, str) else json.dumps(item)) + "\n" for item in items))
+
+
+def read_output(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_replays_conversations_with_bounded_concurrency(tmp_path):
+    conversations = tmp_path / "conversations.jsonl"
+    items = [{"id": f"q{i}", "messages": [{"role": "user", "content": "hi"}], "user_input": f"question {i}"}
+             for i in range(20)]
+    items += [{"id": "scripted", "turns": ["I am an analyst", "What next?"]}, "not json", {"id": "bad", "turns": []}]
+    write_input(conversations, items)
+    pipeline = FakePipeline()
+    output = tmp_path / "results.jsonl"
+
+    result = asyncio.run(ChatReplay(pipeline, str(conversations), str(output), concurrency=4).run())
+
+    assert pipeline.peak == 4
+    assert (result["total"], result["succeeded"], result["failed"], result["skipped"]) == (23, 21, 2, 0)
+    records = {record["id"]: record for record in read_output(output)}
+    assert records["q3"]["status"] == "success" and records["q3"]["turns"][0]["response"] == "re: question 3"
+    assert records["q3"]["latency_ms"] >= 20
+    # Each scripted turn sees the replies to the earlier ones
+    assert [turn["response"] for turn in records["scripted"]["turns"]] == ["re: I am an analyst", "re: What next?"]
+    assert ("What next?", 2) in pipeline.calls
+    assert records["line-22"]["status"] == "error" and "invalid input line" in records["line-22"]["error"]
+    assert records["bad"]["status"] == "error"
+
+
+def test_interrupted_run_resumes_from_its_output(tmp_path):
+    conversations = tmp_path / "conversations.jsonl"
+    write_input(conversations, [{"id": f"q{i}", "user_input": "boom" if i == 1 else f"question {i}"}
+                                for i in range(10)])
+    output = tmp_path / "results.jsonl"
+
+    def stop_after_four(done, total):
+        if done == 4:
+            raise Interrupted
+
+    first = FakePipeline()
+    with pytest.raises(Interrupted):
+        asyncio.run(ChatReplay(first, str(conversations), str(output), concurrency=2).run(on_progress=stop_after_four))
+    assert len(read_output(output)) == 4
+    with open(output, "a") as f:
+        f.write('{"id": "q9", "sta')  # torn by a crash mid-write
+
+    second = FakePipeline()
+    result = asyncio.run(ChatReplay(second, str(conversations), str(output), concurrency=2).run())
+
+    # Succeeded conversations are skipped; the failed one is retried with the rest
+    assert result["skipped"] == 3 and result["succeeded"] + result["failed"] == 7
+    assert {call[0] for call in second.calls} == {"boom"} | {f"question {i}" for i in range(4, 10)}
+    final = {}
+    for record in read_output(output):
+        final[record["id"]] = record["status"]
+    assert len(final) == 10 and [i for i, status in final.items() if status != "success"] == ["q1"]
+
+
+def test_rate_limit_spaces_calls(tmp_path):
+    conversations = tmp_path / "conversations.jsonl"
+    write_input(conversations, [{"id": "a", "user_input": "one"}, {"id": "b", "turns": ["two", "three"]},
+                                {"id": "c", "user_input": "four"}])
+
+    pipeline = FakePipeline(delay=0)
+    started = time.perf_counter()
+    asyncio.run(ChatReplay(pipeline, str(conversations), str(tmp_path / "out.jsonl"), concurrency=4,
+                           rate_limit=20).run())
+    # Four calls at most 20 per second: the last one starts at least 0.15 s after the first
+    assert time.perf_counter() - started >= 0.15
+    assert sorted(user_input for user_input, _ in pipeline.calls) == ["four", "one", "three", "two"]
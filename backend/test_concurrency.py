@@ -0,0 +1,49 @@
+import threading
+
+from benchmarks.stress import run_stress
+from data_storage import atomic_write_json, create_user, file_lock, get_user, load_data
+import data_storage
+
+
+def test_workers_do_not_lose_updates(tmp_path):
+    result = run_stress(workers=4, ops=15, bcrypt_rounds=4, data_dir=str(tmp_path))
+    check = result["verification"]
+    assert check["users"] == check["expected"] == 60
+    assert check["sessions"] == 60
+    assert check["contested_sessions"] == check["contested_wins"] == 15
+    assert check["memory_turns"] == 60 and check["duplicate_turns"] == 0
+    assert check["indexed_turns"] == 60 and check["aligned_indexes"] == 5
+    assert check["ok"]
+
+
+def test_user_cache_sees_writes_from_other_writers(tmp_path, monkeypatch):
+    users_file = str(tmp_path / "users.json")
+    monkeypatch.setattr(data_storage, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(data_storage, "USERS_FILE", users_file)
+
+    assert create_user("a@example.com", {"email": "a@example.com"})
+    assert get_user("a@example.com") is not None
+    assert not create_user("a@example.com", {"email": "a@example.com"})
+
+    # Simulate another process replacing the file behind our cache
+    with file_lock(users_file):
+        users = load_data(users_file)
+        users["b@example.com"] = {"email": "b@example.com"}
+        atomic_write_json(users_file, users)
+    assert get_user("b@example.com") == {"email": "b@example.com"}
+
+
+def test_concurrent_threads_register_each_user_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_storage, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(data_storage, "USERS_FILE", str(tmp_path / "users.json"))
+    outcomes = []
+
+    def register():
+        outcomes.append(create_user("same@example.com", {"email": "same@example.com"}))
+
+    threads = [threading.Thread(target=register) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert outcomes.count(True) == 1
@@ -0,0 +1,51 @@
+import json
+import os
+import shutil
+
+from embeddings import HashingEmbeddingService
+from services.faq_index import FAQ_FILE, FAQIndex
+
+
+def make_index(tmp_path, **kwargs):
+    data_file = str(tmp_path / "faq.json")
+    shutil.copy(FAQ_FILE, data_file)
+    return FAQIndex(data_file, embedding_service=HashingEmbeddingService(), **kwargs)
+
+
+def test_matches_exact_and_paraphrased_questions(tmp_path):
+    index = make_index(tmp_path)
+    exact = index.match("How can I improve my resume for tech jobs?")
+    assert exact["id"] == "resume-tech-jobs" and exact["score"] == 1.0
+
+    paraphrase = index.match("how should i prepare for a coding interview at google")
+    assert paraphrase["id"] == "technical-interview-prep"
+    assert paraphrase["answer"]
+    assert index.match("What's the weather like in Mumbai today?") is None
+    assert index.match("   ") is None
+
+
+def test_embeddings_are_cached_on_disk(tmp_path):
+    make_index(tmp_path)
+    cache_file = str(tmp_path / "faq.embeddings.npz")
+    assert os.path.exists(cache_file)
+
+    class NoEmbeddings(HashingEmbeddingService):
+        def get_embeddings(self, texts):
+            raise AssertionError("cached embeddings should have been reused")
+
+    FAQIndex(str(tmp_path / "faq.json"), embedding_service=NoEmbeddings())
+
+
+def test_reloads_when_the_file_changes(tmp_path):
+    index = make_index(tmp_path, check_interval=0)
+    question = "Do you offer mentorship for women returning to work?"
+    assert index.match(question) is None
+
+    with open(index.data_file) as f:
+        data = json.load(f)
+    data["faqs"].append({"id": "returnship", "question": question, "answer": "Yes."})
+    with open(index.data_file, "w") as f:
+        json.dump(data, f, indent=4)
+
+    assert index.match(question)["id"] == "returnship"
+    assert len(index) == len(data["faqs"])
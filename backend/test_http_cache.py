@@ -0,0 +1,74 @@
+import gzip
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import http_cache
+from http_cache import cached_json_response, etag_matches, make_etag, negotiate_encoding
+from scheduling import SessionStore
+
+
+def _app(store, builds):
+    app = FastAPI()
+
+    @app.get("/sessions")
+    async def sessions(request: Request):
+        def build():
+            builds.append(1)
+            return store.list_sessions(limit=500)
+        return cached_json_response(request, build, make_etag("sessions", store.version))
+
+    return app
+
+
+def test_negotiation_respects_quality_values():
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0, identity") is None
+    assert negotiate_encoding(None) is None
+    if http_cache.brotli is not None:
+        assert negotiate_encoding("gzip, br") == "br"
+        assert negotiate_encoding("br;q=0.5, gzip;q=0.8") == "gzip"
+
+
+def test_etag_matching_accepts_weak_and_encoded_variants():
+    etag = make_etag("v1")
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag[:-1]}-gzip"', etag)
+    assert not etag_matches(make_etag("v2"), etag)
+
+
+def test_conditional_requests_skip_serialization(tmp_path):
+    store = SessionStore(log_file=str(tmp_path / "sessions.jsonl"), legacy_file=str(tmp_path / "sessions.json"))
+    for hour in range(8, 18):
+        store.book("Anita Rao", "2026-03-02", f"{hour:02d}:00")
+    builds = []
+    client = TestClient(_app(store, builds))
+
+    first = client.get("/sessions", headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.json()["total"] == 10
+    etag = first.headers["etag"]
+
+    again = client.get("/sessions", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    plain = client.get("/sessions", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert builds == [1]  # the identity body was reused, the 304 built nothing
+
+    store.book("Anita Rao", "2026-03-03", "10:00")
+    changed = client.get("/sessions", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json()["total"] == 11
+
+
+def test_small_bodies_are_not_compressed():
+    app = FastAPI()
+
+    @app.get("/tiny")
+    async def tiny(request: Request):
+        return cached_json_response(request, lambda: {"ok": True}, make_etag("tiny"))
+
+    response = TestClient(app).get("/tiny", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"ok": True}
+    assert gzip.decompress(http_cache.compress(b"x" * 2000, "gzip")) == b"x" * 2000
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from idempotency import IdempotencyKeyReused, IdempotencyStore, fingerprint
+
+
+def test_concurrent_duplicates_share_one_computation(tmp_path):
+    store = IdempotencyStore(str(tmp_path / "idempotency"))
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"status": "success", "response": "hello"}
+
+    async def main():
+        return await asyncio.gather(*(store.run("chat:k1", fingerprint("hi"), compute) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert [replayed for _, replayed in results].count(False) == 1
+    assert all(result == {"status": "success", "response": "hello"} for result, _ in results)
+
+    # A later retry, even from another worker process, is replayed from the store
+    other_worker = IdempotencyStore(str(tmp_path / "idempotency"))
+    result, replayed = asyncio.run(other_worker.run("chat:k1", fingerprint("hi"), compute))
+    assert replayed and result["response"] == "hello" and len(calls) == 1
+
+    with pytest.raises(IdempotencyKeyReused):
+        asyncio.run(other_worker.run("chat:k1", fingerprint("something else"), compute))
+
+
+def test_failures_and_unstored_results_are_recomputed(tmp_path):
+    store = IdempotencyStore(str(tmp_path / "idempotency"))
+    outcomes = [RuntimeError("upstream down"), {"status": "error"}, {"status": "success"}]
+
+    async def compute():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def run():
+        return asyncio.run(store.run("chat:k2", fingerprint("hi"), compute,
+                                     should_store=lambda reply: reply["status"] == "success"))
+
+    with pytest.raises(RuntimeError):
+        run()
+    assert run() == ({"status": "error"}, False)
+    assert run() == ({"status": "success"}, False)
+    assert run() == ({"status": "success"}, True)
+
+
+def test_store_is_bounded(tmp_path):
+    store = IdempotencyStore(str(tmp_path / "idempotency"), max_entries=3)
+
+    async def compute():
+        return {"status": "success"}
+
+    for i in range(6):
+        asyncio.run(store.run(f"chat:{i}", fingerprint(i), compute))
+        time.sleep(0.01)  # distinct modification times
+    assert store.entries() == 3
+    for i in range(3, 6):
+        assert asyncio.run(store.run(f"chat:{i}", fingerprint(i), compute)) == ({"status": "success"}, True)
+
+
+def test_only_the_packed_result_is_stored(tmp_path):
+    store = IdempotencyStore(str(tmp_path / "idempotency"))
+
+    async def compute():
+        return {"reply": "hello", "history": ["a very long conversation"] * 100}
+
+    packed = {"pack": lambda result: result["reply"], "unpack": lambda reply: {"reply": reply, "history": []}}
+    assert asyncio.run(store.run("chat:k3", fingerprint("hi"), compute, **packed))[0]["history"]
+    assert asyncio.run(store.run("chat:k3", fingerprint("hi"), compute, **packed)) == \
+        ({"reply": "hello", "history": []}, True)
+    with open(store._path("chat:k3")) as f:
+        assert json.load(f)["result"] == "hello"
@@ -0,0 +1,71 @@
+from datetime import date
+
+import pytest
+
+from embeddings import HashingEmbeddingService
+from scheduling import SessionStore
+from services.intent_router import IntentRouter, extract_job_slots, extract_schedule_slots
+from services.job_scraper import JobRecord
+
+
+class FakeScraper:
+    def __init__(self):
+        self.calls = []
+        self.salary = (600000, 800000)
+
+    def search_jobs_versioned(self, query=None, location=None):
+        self.calls.append((query, location))
+        job = JobRecord("1", "Data Analyst", "Acme Corp", "Bangalore", "Analyse data.", *self.salary,
+                        "INR", "2026-01-01", "https://jobs.example.com/1", "permanent", "IT Jobs")
+        return [job], "v1"
+
+
+@pytest.fixture
+def router(tmp_path):
+    store = SessionStore(log_file=str(tmp_path / "sessions.jsonl"), legacy_file=str(tmp_path / "sessions.json"))
+    return IntentRouter(FakeScraper(), store, embedding_service=HashingEmbeddingService())
+
+
+def test_slot_extraction():
+    assert extract_job_slots("Find data analyst jobs in Bangalore") == {"query": "data analyst", "location": "bangalore"}
+    assert extract_job_slots("any openings for nurses in Kochi?") == {"query": "nurses", "location": "kochi"}
+    slots = extract_schedule_slots("book mentor Priya tomorrow at 3:30 pm for 30 minutes", today=date(2026, 10, 19))
+    assert slots == {"mentor": "Priya", "date": "2026-10-20", "time": "15:30", "duration": 30}
+    assert extract_schedule_slots("session with Anita Rao on Friday at 10:00", today=date(2026, 10, 19))["date"] == "2026-10-23"
+
+
+def test_routes_job_searches_and_bookings_locally(router):
+    reply = router.route("find data analyst jobs in Bangalore")
+    assert reply["source"]["intent"] == "job_search" and reply["source"]["job_ids"] == ["1"]
+    assert "Data Analyst at Acme Corp (Bangalore, INR 600,000 to 800,000)" in reply["response"]
+    assert router.job_scraper.calls == [("data analyst", "bangalore")]
+    # Listings often give only one salary bound, or none
+    for salary, shown in (((None, 900000), "(Bangalore, up to INR 900,000)"),
+                          ((500000, None), "(Bangalore, from INR 500,000)"), ((None, None), "(Bangalore)")):
+        router.job_scraper.salary = salary
+        assert shown in router.route("find data analyst jobs in Bangalore")["response"]
+
+    proposed = router.route("Book a session with Anita Rao on 2030-03-04 at 10:00")
+    assert proposed["source"]["proposal"] == {"mentorName": "Anita Rao", "date": "2030-03-04", "time": "10:00",
+                                              "duration": 60}
+    # Nothing is booked until the client confirms the proposal
+    assert router.session_store.list_sessions()["total"] == 0
+    router.session_store.book("Anita Rao", "2030-03-04", "10:00")
+    clash = router.route("schedule a session with Anita Rao on 2030-03-04 at 10:30")
+    assert clash["source"]["conflict"] and "11:00" in clash["source"]["free_slots"]
+    past = router.route("book a session with Anita Rao on 2020-03-04 at 10:00")
+    assert past["source"]["past"] and "proposal" not in past["source"]
+
+    too_long = router.route("book a session with Anita Rao on 2030-03-05 at 10:00 for 9 hours")
+    assert too_long["source"]["missing"] == ["duration"] and "proposal" not in too_long["source"]
+
+    follow_up = router.route("book a session with my mentor")
+    assert follow_up["source"]["missing"] == ["mentor", "date", "time"]
+
+
+def test_open_ended_questions_go_to_the_llm(router):
+    for text in ("I feel stuck in my career, what should I do?",
+                 "how do I negotiate a raise with my manager",
+                 "what is the future of AI jobs",
+                 "hi"):
+        assert router.route(text) is None, text
@@ -0,0 +1,128 @@
+import json
+import time
+
+import pytest
+
+from benchmarks.stubs import StubConfig, _job
+from services import job_scraper as job_scraper_module
+from services.job_scraper import (
+    DESCRIPTION_PREVIEW_CHARS, LIST_FIELDS, JobProvider, JobRecord, JobScraper, load_providers, parse_fields,
+    project_jobs, project_rows,
+)
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self.content = json.dumps(payload).encode("utf-8")
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+@pytest.fixture
+def scraper(monkeypatch, tmp_path):
+    config = StubConfig()
+    payload = {"results": [_job(config, i, "", "") for i in range(50)]}
+    monkeypatch.setattr(job_scraper_module.requests, "get", lambda url, params=None, **kwargs: FakeResponse(payload))
+    return JobScraper(detail_cache_size=60, records_dir=str(tmp_path / "job_records"))
+
+
+def test_list_view_is_an_order_of_magnitude_smaller(scraper):
+    records, _ = scraper.search_jobs_versioned("analyst", "pune")
+    full = json.dumps({"jobs": scraper.search_jobs("analyst", "pune")})
+    listing = json.dumps({"jobs": project_jobs(records)})
+    rows = json.dumps(project_rows(records))
+    assert len(listing) * 5 <= len(full)
+    assert len(rows) * 10 <= len(full)
+    assert set(project_jobs(records)[0]) == set(LIST_FIELDS)
+
+
+def test_fields_projection_and_truncated_descriptions(scraper):
+    records, _ = scraper.search_jobs_versioned()
+    jobs = project_jobs(records, parse_fields("id, title,description"))
+    assert list(jobs[0]) == ["id", "title", "description"]
+    assert parse_fields("list") == LIST_FIELDS
+    assert all(len(job["description"]) <= DESCRIPTION_PREVIEW_CHARS for job in jobs)
+    with pytest.raises(ValueError):
+        parse_fields("title,password")
+
+
+def test_detail_serves_full_description_from_bounded_cache(scraper):
+    records, _ = scraper.search_jobs_versioned()
+    job = scraper.get_job(records[0].id)
+    assert job.description == records[0].description
+    assert len(job.description) > DESCRIPTION_PREVIEW_CHARS
+    assert scraper.get_job("missing") is None
+
+    scraper.search_jobs_versioned("other query")
+    assert len(scraper._records) <= 60
+
+    # Another worker that never ran the search finds the job in the shared store
+    other_worker = JobScraper(providers=[], records_dir=scraper.records_dir)
+    assert other_worker.get_job(records[1].id).to_dict() == records[1].to_dict()
+    assert other_worker.get_job("missing") is None
+
+
+class StubProvider(JobProvider):
+    def __init__(self, name, delay, titles, fail=False):
+        super().__init__(timeout=5)
+        self.name = name
+        self.delay = delay
+        self.titles = titles
+        self.fail = fail
+
+    def search(self, query=None, location=None):
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        jobs = [JobRecord(f"{self.name}-{i}", title, company, "Pune", "", 0, 0, "INR", "", "", "", "", self.name)
+                for i, (title, company) in enumerate(self.titles)]
+        return jobs, self.name
+
+
+def test_providers_are_merged_by_the_deadline(tmp_path):
+    providers = [
+        StubProvider("fast", 0.01, [("Nurse", "City Hospital"), ("Data Analyst", "Acme Corp")]),
+        StubProvider("medium", 0.1, [("data  analyst", "ACME corp."), ("Senior Data Analyst", "Globex")]),
+        StubProvider("slow", 3.0, [("Data Analyst", "Initech")]),
+        StubProvider("broken", 0.01, [], fail=True),
+    ]
+    scraper = JobScraper(providers=providers, deadline=0.5, records_dir=str(tmp_path))
+    started = time.monotonic()
+    jobs, version, missing = scraper.search("data analyst")
+    assert time.monotonic() - started < 1.5
+    assert missing == ["slow", "broken"]
+    # No provider call is allowed to outlive the search by more than the deadline
+    assert all(provider.timeout == 0.5 for provider in providers)
+    # The syndicated Acme posting is kept once, from the provider listed first
+    assert [job.id for job in jobs] == ["fast-1", "medium-1", "fast-0"]
+    assert scraper.search("data analyst") == (jobs, version, missing)
+
+
+def test_json_provider_maps_fields(monkeypatch, tmp_path):
+    payload = {"data": {"jobs": [{"slug": "ux-1", "title": "UX Researcher", "company_name": "Initech",
+                                  "where": "Remote", "url": "https://boards.example.com/ux-1"}]}}
+    calls = []
+
+    def fake_get(url, params=None, **kwargs):
+        calls.append((url, params, kwargs["timeout"]))
+        return FakeResponse(payload)
+
+    monkeypatch.setattr(job_scraper_module.requests, "get", fake_get)
+    monkeypatch.setenv("ADZUNA_ENABLED", "0")
+    config = json.dumps([{"name": "boards", "url": "https://boards.example.com/search", "results": "data.jobs",
+                          "fields": {"id": "slug", "company": "company_name", "location": "where",
+                                     "redirect_url": "url"}, "query_param": "search", "timeout": 2}])
+    providers = load_providers(config)
+    jobs, _, missing = JobScraper(providers=providers, records_dir=str(tmp_path)).search("ux", "remote")
+    assert missing == [] and calls == [("https://boards.example.com/search", {"search": "ux"}, 2)]
+    assert jobs[0].to_dict()["id"] == "boards-ux-1" and jobs[0].company == "Initech"
+    assert jobs[0].source == "boards" and jobs[0].salary_min == 0
+
+    # Bad settings are skipped instead of stopping the app at import
+    assert load_providers("[{'name': 'boards'}]") == []
+    mixed = json.loads(config) + [{"name": "no-url"}, "boards", {"name": "x", "url": "u", "colour": "red"}]
+    assert [provider.name for provider in load_providers(json.dumps(mixed))] == ["boards"]
@@ -0,0 +1,77 @@
+import pytest
+
+from embeddings import HashingEmbeddingService
+from generate_pdfs import build_all, render_pdf
+from knowledge_sync import KnowledgeSync, chunk_text
+from vector_db import ServiceEmbeddingFunction, VectorDB
+
+
+@pytest.fixture
+def sync(tmp_path):
+    source = tmp_path / "resources"
+    build_all(str(source), workers=1)
+    (source / "returnship.md").write_text("Returnships\n\nPaid programmes for women restarting careers.\n")
+    db = VectorDB(str(tmp_path / "db"), embedding_function=ServiceEmbeddingFunction(HashingEmbeddingService()))
+    return KnowledgeSync(db, str(source), workers=2)
+
+
+def test_chunks_respect_the_size_limit():
+    text = "Heading\n" + "\n".join(f"line {i} " * 10 for i in range(40)) + "\n\nNext section"
+    chunks = chunk_text(text, max_chars=200)
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert chunks[-1] == "Next section"
+
+
+def test_only_changed_chunks_are_synced(sync):
+    first = sync.sync()
+    assert first["files"] == 6 and first["upserted"] > 6 and first["deleted"] == 0
+    total = sync.vector_db.count()
+    assert total == first["upserted"]
+
+    second = sync.sync()
+    assert second["upserted"] == 0 and second["deleted"] == 0 and second["unchanged_files"] == 6
+
+    note = sync.source_dir + "/returnship.md"
+    with open(note, "a") as f:
+        f.write("Many run for six months and convert to full-time roles.\n")
+    third = sync.sync()
+    assert third["upserted"] == 1 and third["deleted"] == 1 and third["unchanged_files"] == 5
+    assert sync.vector_db.count() == total
+    assert "six months" in sync.vector_db.get_context("run for six months", n_results=3)
+
+
+class Cancelled(Exception):
+    pass
+
+
+def test_cancelling_stops_between_batches(sync):
+    embedded = []
+    embed_batch = sync._embed_batch
+    sync._embed_batch = lambda batch: embedded.append(len(batch)) or embed_batch(batch)
+    sync.batch_size = 1
+
+    def cancel(done, total):
+        raise Cancelled
+
+    with pytest.raises(Cancelled):
+        sync.sync(on_progress=cancel)
+    # Only the batches already handed to the two workers were embedded
+    assert len(embedded) <= 3 and sync.vector_db.count() == 1
+
+    # Nothing was recorded as done, so the next sync picks up every chunk
+    embedded.clear()
+    result = sync.sync()
+    assert result["upserted"] == len(embedded) > 3
+
+
+def test_removed_files_and_plain_pdfs(sync):
+    pytest.importorskip("pypdf")
+    render_pdf(sync.source_dir + "/networking.pdf", "Networking Guide",
+               [{"type": "text", "text": "Attend meetups and contribute to open source."}])
+    sync.sync()
+    assert "open source" in sync.vector_db.get_context("meetups open source", n_results=1)
+
+    import os
+    os.remove(sync.source_dir + "/networking.pdf")
+    result = sync.sync()
+    assert result["deleted"] >= 1 and result["upserted"] == 0
@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+from embeddings import HashingEmbeddingService
+from memory import ConversationMemory, estimate_tokens
+
+FILLER = [
+    "Can you suggest a morning routine?", "Try planning your day the evening before.",
+    "How do I stay motivated?", "Set small weekly goals and track them.",
+    "Any good podcasts?", "Career-focused podcasts can help during commutes.",
+]
+
+
+class CountingEmbeddings(HashingEmbeddingService):
+    def __init__(self):
+        super().__init__()
+        self.embedded = []
+
+    def get_embeddings(self, texts):
+        self.embedded.extend(texts)
+        return super().get_embeddings(texts)
+
+
+@pytest.fixture
+def memory_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def long_conversation(memory):
+    memory.add_message("c1", "user", "I work as a data analyst in Pune and my target salary is 18 LPA")
+    memory.add_message("c1", "assistant", "Great, 18 LPA is realistic for a data analyst with your experience.")
+    memory.add_message("c1", "system", "Profile updated")
+    for i in range(30):
+        memory.add_message("c1", "user" if i % 2 == 0 else "assistant", FILLER[i % len(FILLER)])
+
+
+def test_recalls_early_facts_beyond_the_window(memory_dir):
+    memory = ConversationMemory(embedding_service=HashingEmbeddingService(), token_budget=40)
+    long_conversation(memory)
+    assert "18 LPA" not in memory.get_context("c1")
+
+    context = memory.get_context("c1", query="What salary should I ask for?")
+    assert "target salary is 18 LPA" in context and "Profile updated" not in context
+    earlier = context.split("\n\nRecent messages:\n")[0]
+    assert estimate_tokens(earlier) <= 40 + 10
+    # Turns already in the recent window are not repeated
+    assert context.count(FILLER[5]) == 1
+
+    assert memory.get_context("c1", query="quantum chromodynamics") == memory.get_context("c1")
+
+
+def test_each_turn_is_embedded_once(memory_dir):
+    embeddings = CountingEmbeddings()
+    memory = ConversationMemory(embedding_service=embeddings)
+    long_conversation(memory)
+    # Turns are indexed in the background; flush waits for them
+    memory.flush()
+    assert len(embeddings.embedded) == 32
+
+    embeddings.embedded.clear()
+    for _ in range(3):
+        memory.get_context("c1", query="salary")
+    assert embeddings.embedded == ["salary"] * 3
+
+    # Another worker reads the same index without re-embedding the turns
+    other = ConversationMemory(embedding_service=CountingEmbeddings())
+    assert "18 LPA" in other.get_context("c1", query="salary")
+    assert other.embedding_service.embedded == ["salary"]
+
+
+def test_index_repairs_itself_after_a_torn_write(memory_dir):
+    memory = ConversationMemory(embedding_service=HashingEmbeddingService())
+    long_conversation(memory)
+    memory.flush()
+    turns_file, vectors_file = memory._index_paths("c1")
+    # A worker died after appending the turn but before appending its vector
+    os.truncate(vectors_file, os.path.getsize(vectors_file) - 4 * 1024)
+    memory.add_message("c1", "user", "I also speak fluent German")
+    memory.flush()
+
+    assert os.path.getsize(vectors_file) == 33 * 4 * 1024
+    assert "fluent German" in memory.get_context("c1", n_messages=1, query="which languages do I speak")
+    assert "18 LPA" in memory.get_context("c1", n_messages=1, query="target salary")
+
+
+def test_clearing_and_retention_bound_the_index(memory_dir):
+    memory = ConversationMemory(embedding_service=HashingEmbeddingService(), max_indexed_turns=20)
+    long_conversation(memory)
+    memory.flush()
+    turns_file, vectors_file = memory._index_paths("c1")
+    # 32 turns were indexed; each time the index passed 20 it was cut back to the newest 15
+    with open(turns_file) as f:
+        indexed = len(f.read().splitlines())
+    assert 15 <= indexed <= 20
+    assert os.path.getsize(vectors_file) == indexed * 4 * 1024
+    assert "18 LPA" not in memory.get_context("c1", n_messages=1, query="target salary")
+
+    memory.add_message("c2", "user", "My target salary is 18 LPA")
+    memory.clear("c2")
+    assert "18 LPA" not in memory.get_context("c2", n_messages=1, query="target salary")
+    memory.add_message("c2", "user", "I moved to Chennai")
+    memory.add_message("c2", "assistant", "Noted.")
+    assert "Chennai" in memory.get_context("c2", n_messages=1, query="where did I move to Chennai")
+
+    # Indexes of conversations idle past the retention period are deleted
+    os.utime(turns_file, (0, 0))
+    ConversationMemory(embedding_service=HashingEmbeddingService(), retention_days=1)._sweep()
+    assert not os.path.exists(turns_file) and not os.path.exists(vectors_file)
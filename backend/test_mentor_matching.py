@@ -0,0 +1,128 @@
+import fcntl
+import json
+import re
+import shutil
+
+import numpy as np
+
+from embeddings import HashingEmbeddingService
+from scheduling import SessionStore
+from services.mentor_matching import MENTORS_FILE, MentorCatalogue, hours_mask, slot_mask
+
+
+class CountingEmbeddings(HashingEmbeddingService):
+    def __init__(self):
+        super().__init__()
+        self.embedded = []
+
+    def get_embeddings(self, texts):
+        self.embedded.extend(texts)
+        return super().get_embeddings(texts)
+
+
+def make_catalogue(tmp_path, **kwargs):
+    data_file = str(tmp_path / "mentors.json")
+    shutil.copy(MENTORS_FILE, data_file)
+    return MentorCatalogue(data_file, embedding_service=kwargs.pop("embedding_service", HashingEmbeddingService()),
+                           **kwargs)
+
+
+def test_matches_goals_within_skills_and_availability(tmp_path):
+    catalogue = make_catalogue(tmp_path)
+    assert catalogue.match("move from analytics into data science")[0]["id"] == "anita-rao"
+
+    evenings = catalogue.match("return to tech after a career break", availability=hours_mask(["mon"], 18, 22))
+    assert [m["id"] for m in evenings][:1] == ["priya-sharma"]
+    assert all("mon" in m["availability"] for m in evenings)
+
+    with_python = catalogue.match("data career", skills=["Python", "SQL"])
+    assert [m["id"] for m in with_python] == ["neha-gupta"]
+    assert catalogue.match("data career", skills=["underwater welding"]) == []
+
+    # A concrete Tuesday 18:30 session: Neha is only free from 20:00, and a booked Anita is vetoed
+    tuesday = slot_mask("2026-10-20", "18:30", 60)
+    assert [m["id"] for m in catalogue.match("data", availability=tuesday, require_all_hours=True)] == ["anita-rao"]
+    store = SessionStore(log_file=str(tmp_path / "sessions.jsonl"), legacy_file=str(tmp_path / "sessions.json"))
+    store.book("Anita Rao", "2026-10-20", "18:00", 60)
+    booked = catalogue.match("data", availability=tuesday, require_all_hours=True,
+                             accept=lambda m: store.is_free(m["name"], "2026-10-20", "18:30", 60))
+    assert booked == []
+
+
+def test_updates_re_embed_only_the_changed_profile(tmp_path):
+    embeddings = CountingEmbeddings()
+    catalogue = make_catalogue(tmp_path, embedding_service=embeddings, check_interval=0)
+    assert len(embeddings.embedded) == len(catalogue) == 12
+
+    # A second worker starts from the on-disk vector cache
+    other = MentorCatalogue(catalogue.data_file, embedding_service=CountingEmbeddings(), check_interval=0)
+    assert other.embedding_service.embedded == []
+
+    embeddings.embedded.clear()
+    catalogue.upsert({"id": "kavya-nair", "name": "Kavya Nair", "headline": "Marine biologist",
+                      "bio": "Coral reef research and ocean conservation.", "skills": ["Marine Biology"],
+                      "availability": {"sat": ["08:00-10:00"]}})
+    assert len(embeddings.embedded) == 1
+
+    # Profiles are embedded before the changes file is locked, so other workers are not held up
+    lock_free = []
+
+    def probe(texts):
+        with open(catalogue.changes_file + ".lock", "a+") as handle:
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                lock_free.append(True)
+            except BlockingIOError:
+                lock_free.append(False)
+        return HashingEmbeddingService.get_embeddings(embeddings, texts)
+    embeddings.get_embeddings = probe
+    catalogue.upsert({"id": "kavya-nair", "name": "Kavya Nair", "headline": "Marine biologist and diver",
+                      "bio": "Coral reef research and ocean conservation.", "skills": ["Marine Biology"],
+                      "availability": {"sat": ["08:00-10:00"]}})
+    del embeddings.get_embeddings
+    assert lock_free == [True]
+    assert catalogue.match("coral reefs and ocean conservation", top_k=1)[0]["id"] == "kavya-nair"
+    assert catalogue.match("reef", skills=["marine biology"], availability=hours_mask(["sat"], 8, 9))
+
+    other.embedding_service.embedded.clear()
+    assert other.match("coral reefs and ocean conservation", top_k=1)[0]["id"] == "kavya-nair"
+    # The reload embedded the query and the one changed profile, nothing else
+    assert len(other.embedding_service.embedded) == 2
+
+    assert catalogue.remove("kavya-nair") and catalogue.get("kavya-nair") is None
+    assert "kavya-nair" not in [m["id"] for m in catalogue.match("cybersecurity", top_k=12)]
+    # The seed file is left as it was; the changes live next to it
+    with open(catalogue.data_file) as f:
+        assert len(json.load(f)["mentors"]) == 12
+    with open(catalogue.changes_file) as f:
+        assert json.load(f)["mentors"] == {"kavya-nair": None}
+    assert len(MentorCatalogue(catalogue.data_file, embedding_service=CountingEmbeddings())) == 11
+
+
+def test_projected_scan_finds_the_exact_best_match(tmp_path):
+    rng = np.random.default_rng(7)
+    vectors = rng.standard_normal((5000, 384)).astype(np.float32)
+
+    class TableEmbeddings:
+        """Embeds "mentor 17" to row 17 and "near 17" to a noisy copy of it"""
+        model_name = "table"
+
+        def get_embeddings(self, texts):
+            rows = []
+            for text in texts:
+                kind, index = re.search(r"(mentor|near) (\d+)", text).groups()
+                noise = 0.8 * rng.standard_normal(384) if kind == "near" else 0
+                rows.append(vectors[int(index)] + noise)
+            return np.array(rows, dtype=np.float32)
+
+    mentors = [{"id": str(i), "name": f"Mentor {i}", "headline": f"mentor {i}", "skills": ["odd"] if i % 2 else [],
+                "availability": {"mon": ["09:00-10:00"] if i % 3 else ["14:00-15:00"]}} for i in range(5000)]
+    data_file = tmp_path / "mentors.json"
+    data_file.write_text(json.dumps({"mentors": mentors}))
+    catalogue = MentorCatalogue(str(data_file), embedding_service=TableEmbeddings())
+
+    for target in (17, 1001, 4999):
+        best = catalogue.match(f"near {target}", skills=["odd"], availability=hours_mask(["mon"], 9, 10), top_k=3)
+        assert best[0]["id"] == str(target)
+        assert all(int(m["id"]) % 2 and int(m["id"]) % 3 for m in best)
+    assert catalogue.match("near 18", skills=["odd"], top_k=1)[0]["id"] != "18"
@@ -0,0 +1,42 @@
+import os
+
+from generate_pdfs import DOCUMENTS, build_all, personalize
+from pdf_cache import PDFCache, iter_file
+
+
+def test_build_skips_unchanged_documents(tmp_path):
+    output_dir = str(tmp_path)
+    first = build_all(output_dir, workers=2)
+    assert sorted(first["built"]) == sorted(DOCUMENTS) and first["skipped"] == []
+    with open(tmp_path / "salary_tips.pdf", "rb") as f:
+        original = f.read()
+
+    second = build_all(output_dir)
+    assert second["built"] == [] and sorted(second["skipped"]) == sorted(DOCUMENTS)
+
+    documents = dict(DOCUMENTS)
+    title, content = documents["salary_tips.pdf"]
+    documents["salary_tips.pdf"] = (title, content + [{"type": "bullet", "text": "• Get the offer in writing"}])
+    third = build_all(output_dir, documents=documents)
+    assert third["built"] == ["salary_tips.pdf"]
+    with open(tmp_path / "salary_tips.pdf", "rb") as f:
+        assert f.read() != original
+
+
+def test_pdf_cache_reuses_renders_and_stays_bounded(tmp_path):
+    cache = PDFCache(str(tmp_path), max_bytes=8 * 1024)
+    title, content = personalize(*DOCUMENTS["interview_guide.pdf"], full_name="Asha", target_role="Data Analyst")
+
+    f, key, size = cache.open(title, content)
+    body = b"".join(iter_file(f))
+    assert body.startswith(b"%PDF") and len(body) == size
+    mtime = os.stat(cache.path_for(key)).st_mtime_ns
+
+    f, again, _ = cache.open(title, content)
+    f.close()
+    assert again == key and os.stat(cache.path_for(key)).st_mtime_ns >= mtime
+
+    for i in range(10):
+        f, _, _ = cache.open(*personalize(*DOCUMENTS["salary_tips.pdf"], full_name=f"User {i}"))
+        f.close()
+    assert cache.size() <= 8 * 1024
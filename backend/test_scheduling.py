@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from scheduling import SessionStore, SchedulingConflict
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(log_file=str(tmp_path / "sessions.jsonl"), legacy_file=str(tmp_path / "sessions.json"))
+
+
+def test_overlapping_bookings_are_rejected(store):
+    store.book("Anita Rao", "2026-03-02", "10:00", 60)
+    store.book("Anita Rao", "2026-03-02", "11:00", 30)  # back-to-back is fine
+    store.book("Meera Iyer", "2026-03-02", "10:30", 60)  # other mentor is fine
+
+    with pytest.raises(SchedulingConflict) as excinfo:
+        store.book("anita  rao", "2026-03-02", "10:30", 15)
+    assert excinfo.value.session["time"] == "10:00"
+    with pytest.raises(SchedulingConflict):
+        store.book("Anita Rao", "2026-03-02", "09:30", 45)
+
+
+def test_cancelled_session_frees_the_slot(store):
+    session = store.book("Anita Rao", "2026-03-02", "10:00", booked_by="a@example.com")
+    assert "bookedBy" not in session
+    # Only the user who booked it can cancel it; without booked_by anyone's booking can be
+    assert store.cancel(session["id"], booked_by="b@example.com") is None
+    assert store.cancel(session["id"], booked_by="a@example.com")["status"] == "cancelled"
+    store.book("Anita Rao", "2026-03-02", "10:00")
+    with pytest.raises(SchedulingConflict):
+        store.set_status(session["id"], "scheduled")
+
+
+def test_listing_filters_and_paginates(store):
+    for day in range(1, 11):
+        store.book("Anita Rao", f"2026-03-{day:02d}", "10:00")
+        store.book("Meera Iyer", f"2026-03-{day:02d}", "10:00")
+    cancelled = store.book("Anita Rao", "2026-03-05", "15:00")
+    store.cancel(cancelled["id"])
+
+    page = store.list_sessions(mentor="Anita Rao", date_from="2026-03-03", date_to="2026-03-06", limit=2)
+    assert page["total"] == 4
+    assert [s["date"] for s in page["sessions"]] == ["2026-03-03", "2026-03-04"]
+
+    assert store.list_sessions(status="cancelled")["total"] == 1
+    assert store.list_sessions(mentor="Anita Rao", status="cancelled")["sessions"][0]["time"] == "15:00"
+    everything = store.list_sessions(offset=18, limit=10)
+    assert everything["total"] == 21 and len(everything["sessions"]) == 3
+
+
+def test_free_slots_skip_busy_blocks(store):
+    store.book("Anita Rao", "2026-03-02", "08:30", 60)
+    store.book("Anita Rao", "2026-03-02", "11:15", 45)
+    slots = store.free_slots("Anita Rao", "2026-03-02", duration=60, day_start="09:00", day_end="13:00")
+    assert slots == ["09:30", "10:00", "12:00"]
+
+
+def test_log_is_replayed_and_legacy_sessions_imported(tmp_path):
+    legacy = tmp_path / "sessions.json"
+    legacy.write_text(json.dumps({"sessions": [
+        {"mentorName": "Anita Rao", "date": "2026-03-02", "time": "10:00", "status": "scheduled"},
+    ]}))
+    log_file = str(tmp_path / "sessions.jsonl")
+    store = SessionStore(log_file=log_file, legacy_file=str(legacy))
+    booked = store.book("Anita Rao", "2026-03-02", "12:00")
+    store.cancel(booked["id"])
+
+    reloaded = SessionStore(log_file=log_file, legacy_file=str(legacy))
+    assert len(reloaded) == 2
+    assert reloaded.get(booked["id"])["status"] == "cancelled"
+    with pytest.raises(SchedulingConflict):
+        reloaded.book("Anita Rao", "2026-03-02", "10:30")
+
+    # A line torn by a crash mid-append is cut off before the next event is written
+    with open(log_file, "a") as f:
+        f.write('{"op": "book", "sess')
+    torn = SessionStore(log_file=log_file, legacy_file=str(legacy))
+    later = torn.book("Anita Rao", "2026-03-03", "10:00")
+    assert SessionStore(log_file=log_file, legacy_file=str(legacy)).get(later["id"])["status"] == "scheduled"
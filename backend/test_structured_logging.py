@@ -0,0 +1,142 @@
+import io
+import json
+import logging
+import logging.handlers
+import queue
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from structured_logging import (DroppingQueueHandler, JSONFormatter, RateLimitFilter, RequestLoggingMiddleware,
+                                _DropReportingHandler, _Listener, get_logger, stage)
+
+
+def isolated_logger(name, *handlers):
+    logger = get_logger(name)
+    logger.handlers = list(handlers)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def records(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_requests_are_logged_as_json_lines_with_id_and_stage_timings():
+    stream = io.StringIO()
+    log_queue = queue.Queue(maxsize=100)
+    queue_handler = DroppingQueueHandler(log_queue)
+    writer = _DropReportingHandler(stream, queue_handler)
+    writer.setFormatter(JSONFormatter())
+    listener = logging.handlers.QueueListener(log_queue, writer)
+    logger = isolated_logger("test.access", queue_handler)
+
+    app = FastAPI()
+
+    @app.get("/work")
+    def work():
+        with stage("lookup"):
+            time.sleep(0.01)
+        logger.info("looked up %s", "thing", extra={"authorization": "Bearer abc.def"})
+        return {"ok": True}
+
+    app.add_middleware(RequestLoggingMiddleware, logger=logger, sample_rate=1.0)
+    client = TestClient(app)
+    listener.start()
+    try:
+        response = client.get("/work", headers={"X-Request-ID": "req-123"})
+        generated = client.get("/work", headers={"X-Request-ID": "bad id\n"}).headers["x-request-id"]
+        client.get("/missing")
+    finally:
+        listener.stop()
+
+    assert response.headers["x-request-id"] == "req-123"
+    assert generated != "bad id\n" and len(generated) == 16
+    lines = records(stream)
+    looked_up, access = lines[0], lines[1]
+    assert looked_up["message"] == "looked up thing" and looked_up["request_id"] == "req-123"
+    assert looked_up["authorization"] == "[redacted]"
+    assert access["message"] == "request" and access["request_id"] == "req-123"
+    assert access["status"] == 200 and access["path"] == "/work"
+    assert access["stages"]["lookup"] >= 10 and access["duration_ms"] >= access["stages"]["lookup"]
+    assert lines[-1]["status"] == 404 and lines[-1]["request_id"] != "req-123"
+
+
+def test_repeated_messages_are_rate_limited_and_fields_truncated():
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JSONFormatter(max_field_chars=40))
+    rate_limit = RateLimitFilter(burst=3, interval=0.2)
+    handler.addFilter(rate_limit)
+    logger = isolated_logger("test.noisy", handler)
+
+    for i in range(50):
+        logger.warning("provider %s timed out", i)
+    logger.warning("something else", extra={"body": "x" * 100, "note": "key sk-abcdef1234567890"})
+    time.sleep(0.25)
+    logger.warning("provider %s timed out", 99)
+
+    lines = records(stream)
+    assert [line["message"] for line in lines[:3]] == [f"provider {i} timed out" for i in range(3)]
+    assert lines[3]["body"].startswith("x" * 40) and "60 more chars" in lines[3]["body"]
+    assert "sk-abcdef" not in lines[3]["note"]
+    assert lines[4]["message"] == "provider 99 timed out" and lines[4]["suppressed"] == 47
+
+
+def test_access_records_and_distinct_errors_are_not_rate_limited():
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JSONFormatter())
+    handler.addFilter(RateLimitFilter(burst=3, interval=10))
+    access = isolated_logger("access", handler)
+    errors = isolated_logger("test.errors", handler)
+
+    app = FastAPI()
+
+    @app.get("/items/{n}")
+    def item(n: int):
+        return {"n": n}
+
+    app.add_middleware(RequestLoggingMiddleware, logger=access, sample_rate=1.0)
+    client = TestClient(app)
+    for n in range(10):
+        client.get(f"/items/{n}")
+
+    for n in range(10):
+        try:
+            raise ValueError(f"bad input {n % 2}")
+        except ValueError:
+            errors.exception("chat request failed")
+
+    lines = records(stream)
+    assert [line["path"] for line in lines if line["message"] == "request"] == [f"/items/{n}" for n in range(10)]
+    # Each distinct exception gets its own allowance under the shared template
+    failures = [line for line in lines if line["message"] == "chat request failed"]
+    assert len(failures) == 6 and sum("bad input 1" in line["exception"] for line in failures) == 3
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    stream = io.StringIO()
+    log_queue = queue.Queue(maxsize=5)
+    queue_handler = DroppingQueueHandler(log_queue)
+    writer = _DropReportingHandler(stream, queue_handler)
+    writer.setFormatter(JSONFormatter())
+    logger = isolated_logger("test.flood", queue_handler)
+
+    # No writer thread is running yet, so the queue fills up and stays full
+    started = time.perf_counter()
+    for i in range(1000):
+        logger.info("event %d", i)
+    assert time.perf_counter() - started < 1
+    assert queue_handler.dropped == 995
+
+    listener = _Listener(log_queue, writer)
+    listener.start()
+    listener.stop()
+    lines = records(stream)
+    assert [line["message"] for line in lines if line["logger"] == "asha.test.flood"] == \
+        [f"event {i}" for i in range(5)]
+    assert [line["dropped"] for line in lines if line["message"] == "log records dropped: queue full"] == [995]
+    assert writer.total_dropped == 995
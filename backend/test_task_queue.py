@@ -0,0 +1,118 @@
+import threading
+import time
+
+from task_queue import TaskQueue
+
+
+def make_queue(tmp_path, **kwargs):
+    return TaskQueue(workers=1, tasks_file=str(tmp_path / "tasks.json"), **kwargs)
+
+
+def test_runs_by_priority_and_deduplicates(tmp_path):
+    queue = make_queue(tmp_path)
+    order = []
+    queue.register("echo", lambda params, context: order.append(params["n"]) or params["n"])
+
+    low = queue.submit("echo", {"n": "low"}, priority="low")
+    queue.submit("echo", {"n": "normal"})
+    high = queue.submit("echo", {"n": "high"}, priority="high")
+    duplicate = queue.submit("echo", {"n": "low"}, priority="low")
+    assert duplicate["id"] == low["id"] and duplicate["deduplicated"]
+
+    queue.start()
+    try:
+        assert queue.wait(low["id"], timeout=5)["result"] == "low"
+        assert order == ["high", "normal", "low"]
+        # A finished result is reused until it expires
+        assert queue.submit("echo", {"n": "high"}, priority="high")["id"] == high["id"]
+
+        # ...unless the kind opted out: then only a job still in progress is shared
+        queue.register("replay", lambda params, context: time.sleep(0.1) or "replayed", reuse_results=False)
+        first = queue.submit("replay", {"input": "a.jsonl"})
+        assert queue.submit("replay", {"input": "a.jsonl"})["id"] == first["id"]
+        queue.wait(first["id"], timeout=5)
+        assert queue.submit("replay", {"input": "a.jsonl"})["id"] != first["id"]
+
+        # Jobs are only shared between submissions from the same user, who the handler can see
+        queue.register("whoami", lambda params, context: context.user)
+        mine = queue.submit("whoami", {}, user="a@example.com")
+        theirs = queue.submit("whoami", {}, user="b@example.com")
+        assert mine["id"] != theirs["id"] and mine["user"] == "a@example.com"
+        assert queue.wait(theirs["id"], timeout=5)["result"] == "b@example.com"
+    finally:
+        queue.shutdown()
+
+
+def test_cancel_queued_and_running_tasks(tmp_path):
+    queue = make_queue(tmp_path)
+    started = threading.Event()
+
+    def slow(params, context):
+        started.set()
+        while True:
+            context.check_cancelled()
+            time.sleep(0.01)
+
+    queue.register("slow", slow)
+    running = queue.submit("slow", {"n": 1})
+    queued = queue.submit("slow", {"n": 2})
+    queue.start()
+    try:
+        assert started.wait(5)
+        assert queue.cancel(queued["id"])["status"] == "cancelled"
+        queue.cancel(running["id"])
+        assert queue.wait(running["id"], timeout=5)["status"] == "cancelled"
+    finally:
+        queue.shutdown()
+
+
+def test_results_are_shared_between_workers_and_expire(tmp_path):
+    queue = make_queue(tmp_path, result_ttl=0.5)
+    other_worker = make_queue(tmp_path, result_ttl=0.5)
+
+    def fail(params, context):
+        raise RuntimeError("model unavailable")
+
+    queue.register("fail", fail)
+    queue.start()
+    try:
+        task = queue.submit("fail")
+        queue.wait(task["id"], timeout=5)
+        seen = other_worker.wait(task["id"], timeout=5)
+        assert seen["status"] == "failed" and seen["error"] == "model unavailable"
+
+        time.sleep(0.6)
+        assert other_worker.get(task["id"]) is None
+    finally:
+        queue.shutdown()
+
+
+def test_tasks_of_a_stopped_worker_fail_and_progress_writes_are_throttled(tmp_path):
+    crashed = make_queue(tmp_path, heartbeat_interval=60, progress_interval=60)
+    survivor = make_queue(tmp_path, stale_after=0.2)
+    release = threading.Event()
+
+    def slow(params, context):
+        for i in range(5):
+            context.progress(i, 10)
+        release.wait(5)
+        return "done"
+
+    for queue in (crashed, survivor):
+        queue.register("slow", slow)
+    crashed.start()
+    try:
+        task = crashed.submit("slow", {"document": "x" * 1000})
+        time.sleep(0.1)
+        seen = survivor.get(task["id"])
+        # Only the first progress report was written, and the parameters never are
+        assert seen["status"] == "running" and seen["progress"] == {"done": 0, "total": 10}
+        assert "params" not in seen and crashed.get(task["id"])["progress"]["done"] == 4
+
+        # No heartbeat arrives in time, as if the owner had crashed
+        time.sleep(0.3)
+        assert survivor.get(task["id"])["status"] == "failed"
+        assert survivor.submit("slow", {"document": "x" * 1000})["id"] != task["id"]
+    finally:
+        release.set()
+        crashed.shutdown()
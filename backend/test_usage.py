@@ -0,0 +1,85 @@
+import json
+
+from services import chatbot
+from services.chatbot import ChatbotService
+from usage import UsageTracker, conversation_stage, today
+
+
+def test_usage_is_aggregated_per_user_and_route_and_shared_on_flush(tmp_path):
+    path = str(tmp_path / "usage.json")
+    tracker = UsageTracker(path, daily_budget=1000, flush_interval=3600)
+    tracker.record("a@example.com", "chat", 300, 200)
+    tracker.record("a@example.com", "chat", 100, 50)
+    tracker.record(None, "summary", 400, 100)
+
+    # Counted at once in this worker, visible to others after the flush
+    assert tracker.usage("a@example.com") == {"prompt_tokens": 400, "completion_tokens": 250, "requests": 2}
+    assert tracker.remaining("a@example.com") == 350
+    other = UsageTracker(path, daily_budget=1000, flush_interval=3600)
+    assert other.remaining("a@example.com") == 1000
+
+    tracker.flush()
+    other.record("a@example.com", "chat", 300, 100)
+    assert other.remaining("a@example.com") == 0 and tracker.remaining("a@example.com") == 350
+    other.flush()
+    assert tracker.remaining("a@example.com") == 0
+    assert tracker.remaining(None) is None and UsageTracker(path, daily_budget=0).remaining("a@example.com") is None
+
+    with open(path) as f:
+        day = json.load(f)["days"][today()]
+    assert day["routes"] == {"chat": {"prompt_tokens": 700, "completion_tokens": 350, "requests": 3},
+                             "summary": {"prompt_tokens": 400, "completion_tokens": 100, "requests": 1}}
+
+
+def test_max_tokens_follows_observed_reply_lengths(tmp_path):
+    tracker = UsageTracker(str(tmp_path / "usage.json"), flush_interval=0, min_samples=20, min_max_tokens=64)
+    assert tracker.max_tokens_for("chat:opening") == 1000
+    for i in range(40):
+        tracker.record("u", "chat", 50, 80 + i % 20, bucket="chat:opening")
+    # 95th percentile of 80..99 (twice each) is 98, plus 25% headroom
+    assert tracker.max_tokens_for("chat:opening") == 122
+    assert tracker.max_tokens_for("chat:ongoing") == 1000
+    assert tracker.max_tokens_for("chat:opening", remaining=60) == 60
+    assert tracker.max_tokens_for("chat:opening", remaining=100, prompt_tokens=70) == 30
+
+    # Replies cut off at the limit push it back up
+    for _ in range(10):
+        tracker.record("u", "chat", 50, 123, bucket="chat:opening", truncated=True)
+    assert tracker.max_tokens_for("chat:opening") == 1000
+
+    assert [conversation_stage(h) for h in ([], [{"role": "user"}, {"role": "assistant"}],
+                                            [{"role": "assistant"}] * 3)] == ["opening", "early", "ongoing"]
+
+
+def test_chatbot_sends_max_tokens_and_records_usage(tmp_path, monkeypatch):
+    sent = []
+
+    class Reply:
+        status_code = 200
+
+        def __init__(self, body):
+            self.body = body
+
+        def json(self):
+            return self.body
+
+    def post(url, headers, json, timeout):
+        sent.append(json)
+        body = {"choices": [{"message": {"content": "Update your resume."}, "finish_reason": "stop"}]}
+        if len(sent) == 1:
+            body["usage"] = {"prompt_tokens": 120, "completion_tokens": 6}
+        return Reply(body)
+
+    monkeypatch.setattr(chatbot.requests, "post", post)
+    tracker = UsageTracker(str(tmp_path / "usage.json"), flush_interval=3600)
+    service = ChatbotService(tracker)
+    service.api_key = "test"
+
+    result = service.generate_response([], "What should I do first?", max_tokens=150, user="u", bucket="chat:opening")
+    assert sent[0]["max_tokens"] == 150
+    assert result["usage"] == {"prompt_tokens": 120, "completion_tokens": 6, "max_tokens": 150}
+
+    # Without a usage block the counts are estimated from the text
+    assert service.summarize([{"role": "user", "content": "hi"}], user="u") == "Update your resume."
+    used = tracker.usage("u")
+    assert used["requests"] == 2 and used["prompt_tokens"] > 120 and used["completion_tokens"] > 6
@@ -0,0 +1,170 @@
+"""Token accounting for LLM calls, adaptive max_tokens and per-user daily budgets.
+
+Every completion's prompt and completion tokens (from the ``usage`` block
+OpenRouter returns) are added to in-memory aggregates per user and per route
+for the current UTC day, and the completion length is kept as a sample for
+its bucket, the intent and conversation stage of the request. The pending
+counts are merged into a shared JSON file under a file lock at most every
+``flush_interval`` seconds, so uvicorn workers see each other's usage with
+that much lag; days older than ``retention_days`` are dropped.
+
+max_tokens_for() sizes a generation from its bucket's samples: the 95th
+percentile plus headroom, between ``min_max_tokens`` and ``default_max_tokens``.
+A reply cut off at its limit is recorded as if it had needed the default, so
+a bucket whose limit turns out too tight grows back. Until a bucket has
+``min_samples`` samples it gets the default. With a budget, the limit is also
+kept within what is left of it once the prompt is paid for.
+
+Configuration (environment):
+
+    USER_DAILY_TOKEN_BUDGET  tokens per user per UTC day, 0 for no limit (default 50000)
+    USAGE_FLUSH_INTERVAL     seconds between flushes to the usage file (default 30)
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+import json
+import os
+import threading
+import time
+
+try:
+    from .data_storage import FileCache, atomic_write_json, file_lock
+except ImportError:  # imported as a top-level module from the backend directory
+    from data_storage import FileCache, atomic_write_json, file_lock
+
+USAGE_FILE = os.path.join("data", "usage.json")
+COUNTERS = ("prompt_tokens", "completion_tokens", "requests")
+
+
+def today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def seconds_until_tomorrow() -> int:
+    now = datetime.now(timezone.utc)
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), timezone.utc)
+    return int((tomorrow - now).total_seconds()) + 1
+
+
+def conversation_stage(conversation_history: List[Dict[str, Any]]) -> str:
+    """"opening" before the assistant has replied, "early" for the next couple of turns, then "ongoing" """
+    replies = sum(1 for message in conversation_history if message.get("role") == "assistant")
+    if replies == 0:
+        return "opening"
+    return "early" if replies < 3 else "ongoing"
+
+
+def _add(totals: Dict[str, Dict[str, int]], name: str, prompt_tokens: int, completion_tokens: int, requests: int = 1):
+    entry = totals.setdefault(name, dict.fromkeys(COUNTERS, 0))
+    entry["prompt_tokens"] += prompt_tokens
+    entry["completion_tokens"] += completion_tokens
+    entry["requests"] += requests
+
+
+class UsageTracker:
+    def __init__(self, path: str = USAGE_FILE, daily_budget: int = None, flush_interval: float = None,
+                 default_max_tokens: int = 1000, min_max_tokens: int = 128, min_samples: int = 20,
+                 max_samples: int = 200, headroom: float = 1.25, retention_days: int = 7):
+        self.path = path
+        self.daily_budget = daily_budget if daily_budget is not None else int(
+            os.getenv("USER_DAILY_TOKEN_BUDGET", "50000"))
+        self.flush_interval = flush_interval if flush_interval is not None else float(
+            os.getenv("USAGE_FLUSH_INTERVAL", "30"))
+        self.default_max_tokens = default_max_tokens
+        self.min_max_tokens = min_max_tokens
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.headroom = headroom
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._pending = self._empty()
+        self._last_flush = time.monotonic()
+        self._cache = FileCache()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    @staticmethod
+    def _empty() -> Dict[str, Any]:
+        return {"days": {}, "buckets": {}}
+
+    def _read(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return self._empty()
+
+        def read(path):
+            with open(path, "r") as f:
+                return json.load(f)
+        return self._cache.load(self.path, read)
+
+    def record(self, user: Optional[str], route: str, prompt_tokens: int, completion_tokens: int,
+               bucket: Optional[str] = None, truncated: bool = False):
+        """Count one completion; user None (e.g. background work) is only counted per route"""
+        with self._lock:
+            day = self._pending["days"].setdefault(today(), {"users": {}, "routes": {}})
+            if user is not None:
+                _add(day["users"], user, prompt_tokens, completion_tokens)
+            _add(day["routes"], route, prompt_tokens, completion_tokens)
+            if bucket is not None:
+                sample = self.default_max_tokens if truncated else completion_tokens
+                self._pending["buckets"].setdefault(bucket, []).append(sample)
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Merge pending counts into the usage file"""
+        with self._lock:
+            pending, self._pending = self._pending, self._empty()
+            self._last_flush = time.monotonic()
+        if not pending["days"] and not pending["buckets"]:
+            return
+        with file_lock(self.path):
+            stored = self._read()
+            # Copied rather than updated in place: the cached parse is shared with readers
+            data = {"days": {day: {kind: {name: dict(entry) for name, entry in totals.items()}
+                                   for kind, totals in counts.items()}
+                             for day, counts in stored["days"].items()},
+                    "buckets": {bucket: list(samples) for bucket, samples in stored["buckets"].items()}}
+            for day, counts in pending["days"].items():
+                merged = data["days"].setdefault(day, {"users": {}, "routes": {}})
+                for kind in ("users", "routes"):
+                    for name, entry in counts[kind].items():
+                        _add(merged[kind], name, entry["prompt_tokens"], entry["completion_tokens"], entry["requests"])
+            for bucket, samples in pending["buckets"].items():
+                data["buckets"][bucket] = (data["buckets"].get(bucket, []) + samples)[-self.max_samples:]
+            oldest = (datetime.now(timezone.utc).date() - timedelta(days=self.retention_days)).isoformat()
+            data["days"] = {day: counts for day, counts in data["days"].items() if day >= oldest}
+            atomic_write_json(self.path, data, indent=None)
+            self._cache.invalidate(self.path)
+
+    def usage(self, user: str, day: str = None) -> Dict[str, int]:
+        """A user's counters for a day (default today), including counts not flushed yet"""
+        day = day or today()
+        totals = dict.fromkeys(COUNTERS, 0)
+        stored = self._read()["days"].get(day, {}).get("users", {}).get(user)
+        with self._lock:
+            pending = self._pending["days"].get(day, {}).get("users", {}).get(user)
+            for entry in (stored, pending):
+                if entry:
+                    for counter in COUNTERS:
+                        totals[counter] += entry[counter]
+        return totals
+
+    def remaining(self, user: Optional[str]) -> Optional[int]:
+        """Tokens the user may still spend today; None when there is no budget to enforce"""
+        if user is None or self.daily_budget <= 0:
+            return None
+        used = self.usage(user)
+        return max(0, self.daily_budget - used["prompt_tokens"] - used["completion_tokens"])
+
+    def max_tokens_for(self, bucket: str, remaining: Optional[int] = None, prompt_tokens: int = 0) -> int:
+        with self._lock:
+            samples = self._read()["buckets"].get(bucket, []) + self._pending["buckets"].get(bucket, [])
+        samples = samples[-self.max_samples:]
+        limit = self.default_max_tokens
+        if len(samples) >= self.min_samples:
+            p95 = sorted(samples)[int(0.95 * (len(samples) - 1))]
+            limit = max(self.min_max_tokens, min(self.default_max_tokens, int(p95 * self.headroom)))
+        if remaining is not None:
+            # The prompt is charged too, so only the rest of the budget is left for the reply
+            limit = max(1, min(limit, remaining - prompt_tokens))
+        return limit
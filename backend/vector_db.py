@@ -1,20 +1,52 @@
 import chromadb
-from chromadb.config import Settings
-from typing import List, Dict, Any
+from chromadb.api.types import EmbeddingFunction
+from typing import Callable, List, Dict, Any, Optional
+import hashlib
 import os
 from dotenv import load_dotenv
 
+try:
+    from .embeddings import get_embedding_service
+except ImportError:  # imported as a top-level module from the backend directory
+    from embeddings import get_embedding_service
+
 load_dotenv()
 
+class ServiceEmbeddingFunction(EmbeddingFunction):
+    """Chroma embedding function backed by the shared embedding service"""
+
+    def __init__(self, service=None):
+        self.service = service or get_embedding_service()
+
+    def __call__(self, input):
+        return [list(map(float, vector)) for vector in self.service.get_embeddings(list(input))]
+
+    @staticmethod
+    def name() -> str:
+        return "asha-embedding-service"
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self.service, "model_name", type(self.service).__name__)
+
+def document_id(doc: Dict[str, Any]) -> str:
+    """Stable ID derived from the document, so ingesting it again updates rather than duplicates"""
+    if doc.get("id"):
+        return str(doc["id"])
+    key = f"{doc.get('source', 'unknown')}\x1f{doc['content']}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
 class VectorDB:
-    def __init__(self):
-        self.client = chromadb.Client(Settings(
-            chroma_db_impl="duckdb+parquet",
-            persist_directory="data/vector_db"
-        ))
+    def __init__(self, persist_directory: str = "data/vector_db", embedding_function=None):
+        self.persist_directory = persist_directory
+        # Queries and ingestion must embed with the same model, so both go through this function
+        self.embedding_function = embedding_function or ServiceEmbeddingFunction()
+        # The duckdb+parquet Settings were removed in chromadb 0.4; PersistentClient replaces them
+        self.client = chromadb.PersistentClient(path=persist_directory)
         self.collection = self.client.get_or_create_collection(
             name="asha_knowledge",
-            metadata={"hnsw:space": "cosine"}
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=self.embedding_function
         )
 
     def add_documents(self, documents: List[Dict[str, Any]]):
@@ -31,6 +63,34 @@ class VectorDB:
             ids=ids
         )
 
+    def upsert_documents(self, documents: List[Dict[str, Any]], batch_size: int = 64,
+                         on_batch: Optional[Callable[[int, int], None]] = None) -> int:
+        """Insert or update documents in batches; on_batch(done, total) runs after each batch"""
+        total = len(documents)
+        for start in range(0, total, batch_size):
+            batch = documents[start:start + batch_size]
+            self.collection.upsert(
+                documents=[doc["content"] for doc in batch],
+                metadatas=[{"source": doc.get("source", "unknown"),
+                            "type": doc.get("type", "text")} for doc in batch],
+                ids=[document_id(doc) for doc in batch]
+            )
+            if on_batch:
+                on_batch(min(start + batch_size, total), total)
+        return total
+
+    def upsert_embedded(self, ids: List[str], texts: List[str], embeddings: List[List[float]],
+                        metadatas: List[Dict[str, Any]]):
+        """Upsert documents whose embeddings were computed by the caller"""
+        self.collection.upsert(ids=ids, documents=texts, embeddings=embeddings, metadatas=metadatas)
+
+    def delete_ids(self, ids: List[str]):
+        if ids:
+            self.collection.delete(ids=ids)
+
+    def count(self) -> int:
+        return self.collection.count()
+
     def search(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
         """Search for relevant documents"""
         results = self.collection.query(
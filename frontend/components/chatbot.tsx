@@ -12,6 +12,7 @@ import { Menu, Sun, Moon } from "lucide-react"
 import { Button } from "@/components/ui/button"
 import { motion, AnimatePresence } from "framer-motion"
 import { useTheme } from "next-themes"
+import { useAuth } from "@/context/AuthContext"
 
 // Analytics tracking function (replace with real endpoint as needed)
 function trackAnalytics(event: string, data: any) {
@@ -40,6 +41,7 @@ export default function Chatbot() {
   const [typingIndicator, setTypingIndicator] = useState(false)
   const isMobile = useMediaQuery("(max-width: 768px)")
   const { theme, setTheme } = useTheme()
+  const { token } = useAuth()
   const [mounted, setMounted] = useState(false)
   const [biasWarning, setBiasWarning] = useState<string | null>(null)
 
@@ -161,11 +163,17 @@ export default function Chatbot() {
     setIsLoading(true)
     setTypingIndicator(true)
 
+    // One key per message: if the request is retried, the backend replays the first answer
+    const idempotencyKey = crypto.randomUUID()
+
     try {
       const response = await fetch("http://localhost:8000/api/chat", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
+          "Idempotency-Key": idempotencyKey,
+          // Signed-in chats count against the user's own daily token budget
+          ...(token ? { Authorization: `Bearer ${token}` } : {}),
         },
         body: JSON.stringify({
           messages: messages.map(msg => ({
@@ -7,6 +7,7 @@ import { Calendar } from "@/components/ui/calendar"
 import { format } from "date-fns"
 import { Calendar as CalendarIcon } from "lucide-react"
 import { cn } from "@/lib/utils"
+import { useAuth } from "@/context/AuthContext"
 
 interface SchedulingModalProps {
   open: boolean
@@ -19,6 +20,7 @@ export default function SchedulingModal({ open, onOpenChange, mentorName, mentor
   const [date, setDate] = useState<Date | undefined>(new Date())
   const [selectedTime, setSelectedTime] = useState<string | null>(null)
   const [isSubmitting, setIsSubmitting] = useState(false)
+  const { token } = useAuth()
 
   // Generate time slots (9 AM to 5 PM)
   const timeSlots = Array.from({ length: 17 }, (_, i) => {
@@ -36,6 +38,8 @@ export default function SchedulingModal({ open, onOpenChange, mentorName, mentor
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          // Signed-in bookings can be cancelled by their owner later
+          ...(token ? { Authorization: `Bearer ${token}` } : {}),
         },
         body: JSON.stringify({
           mentorName,